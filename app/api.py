@@ -0,0 +1,365 @@
+"""HTTP endpoints mounted on the Reflex backend.
+
+Besides the metrics endpoint, this exposes the expert system as a stateless
+JSON API, so partner apps can classify answers without a browser session:
+
+    POST /api/classify        {"answers": {"odor": "n"}, "locale": "en"}
+    POST /api/classify/batch  {"cases": [{"odor": "f"}, ...], "locale": "en"}
+
+Both answer with the verdict and matching rule once the answers decide the
+case, or with the next question (text and options in the requested locale)
+while they do not. Nothing is kept between requests, so any number of
+backend replicas can serve them.
+
+The answers can also be given in the URL, as a cacheable GET:
+
+    GET /api/classify?odor=n&stalk_root=e&locale=tr
+
+The response is a pure function of the URL, so it is sent with Cache-Control
+and ETag headers and repeated URLs can be served by a reverse proxy or CDN.
+Each option of the next question links to the URL with that answer added.
+URLs that are not in canonical form (attributes in name order, locale last
+and left out when it is the default) are redirected to it, so equal answer
+sets share one cache entry.
+
+LocaleRedirectMiddleware sends browsers that ask for the root page "/" to
+the page of the locale their Accept-Language header prefers, before the
+default-locale page is served. Both the redirect and the page served in its
+place vary on Accept-Language, and say so, so shared caches keep them apart.
+The middleware only sees the request where the backend serves the compiled
+pages (REFLEX_MOUNT_FRONTEND_COMPILED_APP=1, as in single-port
+deployments). Where a separate frontend server serves them (reflex run in
+development, two-port deployments), "/" is first painted in the default
+locale and I18nState.on_load_i18n redirects once the page has loaded.
+
+Configuration via environment variables:
+    CLASSIFY_BATCH_MAX: Most cases accepted by one batch request (default: 100)
+    CLASSIFY_MAX_BODY_BYTES: Largest accepted request body (default: 1 MiB)
+    CLASSIFY_CACHE_SECONDS: max-age of GET responses (default: 3600)
+    CLASSIFY_CACHE_ENTRIES: GET responses kept in memory (default: 4096)
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Literal, Mapping
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+from starlette.applications import Starlette
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, RedirectResponse, Response
+from starlette.routing import Route
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .i18n import (
+    AVAILABLE_LANGUAGES,
+    DEFAULT_LOCALE,
+    get_attribute_catalog,
+    locale_route,
+    negotiate_locale,
+)
+from .metrics import CONTENT_TYPE, HANDLER_LATENCY, REGISTRY, cache_lookup, timed
+from .services.classification import (
+    Classification,
+    InvalidAnswersError,
+    answers_from_query,
+    answers_query,
+    classify,
+    classify_batch,
+    validate_answers,
+)
+from .tracing import traced
+
+CLASSIFY_BATCH_MAX = int(os.getenv("CLASSIFY_BATCH_MAX", "100"))
+CLASSIFY_MAX_BODY_BYTES = int(os.getenv("CLASSIFY_MAX_BODY_BYTES", str(1024 * 1024)))
+CLASSIFY_CACHE_SECONDS = int(os.getenv("CLASSIFY_CACHE_SECONDS", "3600"))
+CLASSIFY_CACHE_ENTRIES = int(os.getenv("CLASSIFY_CACHE_ENTRIES", "4096"))
+
+# Canonical URL -> (catalog it was rendered with, body, ETag) of GET responses
+_query_responses: OrderedDict[str, tuple[Mapping, bytes, str]] = OrderedDict()
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Expose all in-process metrics in the Prometheus text format."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+def _validate_locale(locale: str) -> str:
+    if locale not in AVAILABLE_LANGUAGES:
+        raise ValueError(f"unsupported locale, expected one of {sorted(AVAILABLE_LANGUAGES)}")
+    return locale
+
+
+class ClassifyRequest(BaseModel):
+    """Answers given so far, as attribute -> option code."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    answers: dict[str, str] = {}
+    locale: str = DEFAULT_LOCALE
+
+    @field_validator("answers")
+    @classmethod
+    def _check_answers(cls, answers: dict[str, str]) -> dict[str, str]:
+        return validate_answers(answers)
+
+    @field_validator("locale")
+    @classmethod
+    def _check_locale(cls, locale: str) -> str:
+        return _validate_locale(locale)
+
+
+class BatchClassifyRequest(BaseModel):
+    """Several independent answer sets, classified together."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    cases: list[dict[str, str]] = Field(min_length=1, max_length=CLASSIFY_BATCH_MAX)
+    locale: str = DEFAULT_LOCALE
+
+    @field_validator("cases")
+    @classmethod
+    def _check_cases(cls, cases: list[dict[str, str]]) -> list[dict[str, str]]:
+        problems = []
+        for index, answers in enumerate(cases):
+            try:
+                validate_answers(answers)
+            except InvalidAnswersError as e:
+                problems.extend(f"cases[{index}]: {problem}" for problem in e.problems)
+        if problems:
+            raise InvalidAnswersError(problems)
+        return cases
+
+    @field_validator("locale")
+    @classmethod
+    def _check_locale(cls, locale: str) -> str:
+        return _validate_locale(locale)
+
+
+class QuestionOption(BaseModel):
+    code: str
+    label: str
+    # URL with this answer added (GET responses only)
+    href: str | None = None
+
+
+class Question(BaseModel):
+    """The next question to ask, translated."""
+
+    attribute: str
+    question: str
+    description: str
+    options: list[QuestionOption]
+
+
+class ClassifyResponse(BaseModel):
+    """A verdict when the answers decide the case, otherwise the next question."""
+
+    complete: bool
+    verdict: Literal["edible", "poisonous", "unknown"] | None
+    rule: str | None
+    description: str | None
+    next_question: Question | None
+
+
+class BatchClassifyResponse(BaseModel):
+    results: list[ClassifyResponse]
+
+
+def _to_response(
+    classification: Classification,
+    locale: str,
+    option_href=None,
+) -> ClassifyResponse:
+    question = None
+    if classification.next_attribute is not None:
+        attr_name = classification.next_attribute
+        entry = get_attribute_catalog(locale)[attr_name]
+        question = Question(
+            attribute=attr_name,
+            question=entry.question,
+            description=entry.description,
+            options=[
+                QuestionOption(
+                    code=code,
+                    label=label,
+                    href=option_href(attr_name, code) if option_href else None,
+                )
+                for code, label in entry.options
+            ],
+        )
+    return ClassifyResponse(
+        complete=classification.is_complete,
+        verdict=classification.verdict,
+        rule=classification.rule,
+        description=classification.description,
+        next_question=question,
+    )
+
+
+def _error(status_code: int, detail) -> JSONResponse:
+    return JSONResponse({"detail": detail}, status_code=status_code)
+
+
+async def _read_request(request: Request, model: type[BaseModel]) -> BaseModel | JSONResponse:
+    """Parse and validate a JSON body, or build the error response."""
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > CLASSIFY_MAX_BODY_BYTES:
+        return _error(413, "request body too large")
+    body = await request.body()
+    if len(body) > CLASSIFY_MAX_BODY_BYTES:
+        return _error(413, "request body too large")
+
+    try:
+        return model.model_validate_json(body)
+    except ValidationError as e:
+        return _error(422, json.loads(e.json(include_url=False)))
+
+
+@timed(HANDLER_LATENCY.labels("api_classify"))
+@traced("api.classify")
+async def classify_endpoint(request: Request) -> Response:
+    """Classify one answer set."""
+    payload = await _read_request(request, ClassifyRequest)
+    if isinstance(payload, Response):
+        return payload
+
+    response = _to_response(classify(payload.answers), payload.locale)
+    return JSONResponse(response.model_dump())
+
+
+@timed(HANDLER_LATENCY.labels("api_classify_batch"))
+@traced("api.classify_batch")
+async def classify_batch_endpoint(request: Request) -> Response:
+    """Classify up to CLASSIFY_BATCH_MAX answer sets in one engine run."""
+    payload = await _read_request(request, BatchClassifyRequest)
+    if isinstance(payload, Response):
+        return payload
+
+    results = [
+        _to_response(classification, payload.locale)
+        for classification in classify_batch(payload.cases)
+    ]
+    return JSONResponse(BatchClassifyResponse(results=results).model_dump())
+
+
+def _canonical_query(answers: Mapping[str, str], locale: str) -> str:
+    query = answers_query(answers)
+    if locale != DEFAULT_LOCALE:
+        query = f"{query}&locale={locale}" if query else f"locale={locale}"
+    return query
+
+
+def _cache_headers(etag: str | None = None) -> dict[str, str]:
+    headers = {"Cache-Control": f"public, max-age={CLASSIFY_CACHE_SECONDS}"}
+    if etag is not None:
+        headers["ETag"] = etag
+    return headers
+
+
+def _render_query(path: str, answers: dict[str, str], locale: str) -> tuple[bytes, str]:
+    """Body and ETag of the GET response for canonical answers, memoized."""
+    url = f"{path}?{_canonical_query(answers, locale)}"
+    catalog = get_attribute_catalog(locale)
+    cached = _query_responses.get(url)
+    # Translations can be reloaded, which replaces the catalog
+    hit = cached is not None and cached[0] is catalog
+    cache_lookup("classify_query", hit=hit)
+    if hit:
+        _query_responses.move_to_end(url)
+        return cached[1], cached[2]
+
+    def option_href(attr_name: str, code: str) -> str:
+        return f"{path}?{_canonical_query({**answers, attr_name: code}, locale)}"
+
+    response = _to_response(classify(answers), locale, option_href)
+    body = json.dumps(response.model_dump(), separators=(",", ":")).encode()
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    if CLASSIFY_CACHE_ENTRIES > 0:
+        _query_responses[url] = (catalog, body, etag)
+        if len(_query_responses) > CLASSIFY_CACHE_ENTRIES:
+            _query_responses.popitem(last=False)
+    return body, etag
+
+
+@timed(HANDLER_LATENCY.labels("api_classify_query"))
+@traced("api.classify_query")
+async def classify_query_endpoint(request: Request) -> Response:
+    """Classify the answers in the URL, with HTTP caching."""
+    locale = DEFAULT_LOCALE
+    params = []
+    for name, value in request.query_params.multi_items():
+        if name == "locale":
+            locale = value
+        else:
+            params.append((name, value))
+    try:
+        answers = answers_from_query(params)
+        _validate_locale(locale)
+    except InvalidAnswersError as e:
+        return _error(422, e.problems)
+    except ValueError as e:
+        return _error(422, [str(e)])
+
+    query = _canonical_query(answers, locale)
+    if request.url.query != query:
+        return RedirectResponse(
+            f"{request.url.path}?{query}" if query else request.url.path,
+            status_code=308,
+            headers=_cache_headers(),
+        )
+
+    body, etag = _render_query(request.url.path, answers, locale)
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    return Response(body, media_type="application/json", headers=_cache_headers(etag))
+
+
+class LocaleRedirectMiddleware:
+    """Redirect the root page to the browser's preferred locale page."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] == "/" and scope["method"] in ("GET", "HEAD"):
+            locale = negotiate_locale(Headers(scope=scope).get("accept-language"))
+            if locale != DEFAULT_LOCALE:
+                # Keep the query, which may carry answers
+                target = locale_route(locale)
+                if scope["query_string"]:
+                    target = f"{target}?{scope['query_string'].decode('latin-1')}"
+                response = RedirectResponse(
+                    target, status_code=307, headers={"Vary": "Accept-Language"}
+                )
+                await response(scope, receive, send)
+                return
+            # The default-locale page is only served to some Accept-Language values
+            send = _vary_on_language(send)
+        await self.app(scope, receive, send)
+
+
+def _vary_on_language(send: Send) -> Send:
+    """Wrap send so the response carries Vary: Accept-Language."""
+
+    async def send_with_vary(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            MutableHeaders(scope=message).add_vary_header("Accept-Language")
+        await send(message)
+
+    return send_with_vary
+
+
+# Mounted in front of the Reflex backend via ``rx.App(api_transformer=api)``
+api = Starlette(
+    routes=[
+        Route("/metrics", metrics_endpoint, methods=["GET"]),
+        Route("/api/classify", classify_endpoint, methods=["POST"]),
+        Route("/api/classify", classify_query_endpoint, methods=["GET"]),
+        Route("/api/classify/batch", classify_batch_endpoint, methods=["POST"]),
+    ],
+    middleware=[Middleware(LocaleRedirectMiddleware)],
+)
@@ -1,25 +1,29 @@
 import reflex as rx
 
+from .api import api
+from .components import client_flow
 from .components.image_upload import image_upload_section
 from .components.question_form import question_form
 from .components.result_display import result_display
-from .i18n import AVAILABLE_LANGUAGES
+from .i18n import AVAILABLE_LANGUAGES, DEFAULT_LOCALE, locale_route, static_t
+from .log import configure_logging
 from .state import MushroomExpertState
+from .tracing import configure_tracing
 
+configure_logging()
+configure_tracing()
 
-def language_selector() -> rx.Component:
-    """Language selector dropdown."""
+
+def language_selector(locale: str) -> rx.Component:
+    """Language selector dropdown; choosing a language opens its page."""
     return rx.hstack(
         rx.text("Language:", size="2", weight="medium"),
         rx.select.root(
-            rx.select.trigger(placeholder=MushroomExpertState.locale.upper()),
+            rx.select.trigger(placeholder=locale.upper()),
             rx.select.content(
-                rx.foreach(
-                    MushroomExpertState.get_available_languages,
-                    lambda lang: rx.select.item(lang[1], value=lang[0]),
-                ),
+                *[rx.select.item(name, value=code) for code, name in AVAILABLE_LANGUAGES.items()],
             ),
-            value=MushroomExpertState.locale,
+            value=locale,
             on_change=MushroomExpertState.set_locale,
         ),
         spacing="2",
@@ -27,12 +31,12 @@ def language_selector() -> rx.Component:
     )
 
 
-def index() -> rx.Component:
-    """Main page of the mushroom expert system."""
+def index(locale: str) -> rx.Component:
+    """Main page of the mushroom expert system, compiled for one locale."""
     return rx.container(
         rx.hstack(
             rx.color_mode.button(position="top-right"),
-            language_selector(),
+            language_selector(locale),
             position="absolute",
             top="20px",
             right="20px",
@@ -40,22 +44,22 @@ def index() -> rx.Component:
             z_index="100",
         ),
         rx.vstack(
-            rx.heading(MushroomExpertState.ui_app_title, size="9"),
+            rx.heading(static_t(locale, "app.title"), size="9"),
             rx.text(
-                MushroomExpertState.ui_app_subtitle,
+                static_t(locale, "app.subtitle"),
                 size="4",
                 color="gray",
                 margin_bottom="30px",
             ),
             # Show question form or result based on completion status
             rx.cond(
-                MushroomExpertState.is_complete,
-                result_display(),
+                client_flow.verdict(),
+                result_display(locale),
                 rx.vstack(
                     # Optional AI-powered image upload
-                    image_upload_section(),
+                    image_upload_section(locale),
                     # Question form
-                    question_form(),
+                    question_form(locale),
                     spacing="5",
                     width="100%",
                     align="center",
@@ -70,5 +74,21 @@ def index() -> rx.Component:
     )
 
 
-app = rx.App()
-app.add_page(index, on_load=MushroomExpertState.on_load, title="Can I Eat The Mushroom")
+app = rx.App(api_transformer=api)
+
+# The root page is compiled in the default locale and redirects browsers that
+# prefer another language; every locale also gets its own compiled page, so
+# the first paint is already translated
+app.add_page(
+    index(DEFAULT_LOCALE),
+    route="/",
+    on_load=MushroomExpertState.on_load,
+    title=static_t(DEFAULT_LOCALE, "app.page_title"),
+)
+for _locale in AVAILABLE_LANGUAGES:
+    app.add_page(
+        index(_locale),
+        route=locale_route(_locale),
+        on_load=MushroomExpertState.on_load,
+        title=static_t(_locale, "app.page_title"),
+    )
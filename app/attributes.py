@@ -1,6 +1,7 @@
 """Mushroom attribute definitions and options."""
 
-from typing import Callable, TypedDict
+from types import MappingProxyType
+from typing import Callable, Mapping, NamedTuple, TypedDict
 
 
 class AttributeInfo(TypedDict):
@@ -9,6 +10,33 @@ class AttributeInfo(TypedDict):
     options: list[tuple[str, str]]
 
 
+class LocalizedAttribute(NamedTuple):
+    """Immutable translated question, description and options of an attribute."""
+
+    question: str
+    description: str
+    options: tuple[tuple[str, str], ...]
+
+
+# Valid option codes of each attribute, in display order
+ATTRIBUTE_OPTION_CODES: dict[str, tuple[str, ...]] = {
+    "odor": ("a", "l", "c", "f", "m", "n", "p", "s", "y"),
+    "gill_color": ("b", "n", "g", "p", "w", "h", "u", "e", "y", "o", "k"),
+    "spore_print_color": ("w", "n", "k", "h", "r", "o", "u", "y", "b"),
+    "stalk_color_below_ring": ("w", "p", "g", "n", "b", "e", "y", "o", "c"),
+    "stalk_color_above_ring": ("w", "p", "g", "n", "b", "e", "y", "o", "c"),
+    "stalk_root": ("b", "c", "e", "r", "MISSING"),
+    "population": ("a", "c", "n", "s", "v", "y"),
+    "habitat": ("d", "g", "l", "m", "p", "u", "w"),
+    "ring_type": ("e", "f", "l", "n", "p"),
+    "ring_number": ("n", "o", "t"),
+    "cap_shape": ("b", "c", "x", "f", "k", "s"),
+    "cap_color": ("n", "b", "c", "g", "r", "p", "u", "e", "w", "y"),
+    "stalk_shape": ("e", "t"),
+    "gill_spacing": ("c", "w"),
+}
+
+
 def get_attribute_info_i18n(attr_name: str, t_func: Callable) -> AttributeInfo:
     """Get translated attribute info using a translation function.
 
@@ -25,9 +53,8 @@ def get_attribute_info_i18n(attr_name: str, t_func: Callable) -> AttributeInfo:
 
     # Get the options - we need to get all possible option codes for this attribute
     # and translate each one
-    option_codes = get_attribute_option_codes(attr_name)
     options = []
-    for code in option_codes:
+    for code in ATTRIBUTE_OPTION_CODES.get(attr_name, ()):
         translated_label = t_func(f"attributes.{attr_name}.options.{code}")
         options.append((code, translated_label))
 
@@ -43,23 +70,28 @@ def get_attribute_option_codes(attr_name: str) -> list[str]:
 
     This is used to know which options to translate from the JSON files.
     """
-    attribute_options = {
-        "odor": ["a", "l", "c", "f", "m", "n", "p", "s", "y"],
-        "gill_color": ["b", "n", "g", "p", "w", "h", "u", "e", "y", "o", "k"],
-        "spore_print_color": ["w", "n", "k", "h", "r", "o", "u", "y", "b"],
-        "stalk_color_below_ring": ["w", "p", "g", "n", "b", "e", "y", "o", "c"],
-        "stalk_color_above_ring": ["w", "p", "g", "n", "b", "e", "y", "o", "c"],
-        "stalk_root": ["b", "c", "e", "r", "MISSING"],
-        "population": ["a", "c", "n", "s", "v", "y"],
-        "habitat": ["d", "g", "l", "m", "p", "u", "w"],
-        "ring_type": ["e", "f", "l", "n", "p"],
-        "ring_number": ["n", "o", "t"],
-        "cap_shape": ["b", "c", "x", "f", "k", "s"],
-        "cap_color": ["n", "b", "c", "g", "r", "p", "u", "e", "w", "y"],
-        "stalk_shape": ["e", "t"],
-        "gill_spacing": ["c", "w"],
-    }
-    return attribute_options.get(attr_name, [])
+    return list(ATTRIBUTE_OPTION_CODES.get(attr_name, ()))
+
+
+def build_attribute_catalog(t_func: Callable) -> Mapping[str, LocalizedAttribute]:
+    """Translate every attribute once into a read-only catalog.
+
+    Args:
+        t_func: Translation function of the catalog's locale
+
+    Returns:
+        Mapping of attribute name to its translated question, description
+        and options
+    """
+    catalog = {}
+    for attr_name in ATTRIBUTE_OPTION_CODES:
+        info = get_attribute_info_i18n(attr_name, t_func)
+        catalog[attr_name] = LocalizedAttribute(
+            question=info["question"],
+            description=info["description"],
+            options=tuple(info["options"]),
+        )
+    return MappingProxyType(catalog)
 
 
 # Attribute display names and their possible values
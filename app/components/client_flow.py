@@ -0,0 +1,143 @@
+"""Question flow that runs in the browser.
+
+The answers live in client state, and the next question or the verdict is
+computed from them in the browser by STEP_FUNCTION_JS over the exported rule
+bundle, so answering a question (or applying a photo suggestion) needs no
+server round trip and keeps working while the connection is down. The
+server only sees the answers when a photo is sent for analysis, to narrow it
+to the attributes that are still open.
+
+With ANSWERS_IN_URL on, every change to the answers is also written to the
+page URL (``/en?odor=n&stalk_root=e``, attributes in name order like the
+API's canonical URLs), so a question or verdict can be bookmarked or shared,
+and opening such a URL starts from its answers. Off by default.
+
+Configuration via environment variables (read when the pages are compiled):
+    ANSWERS_IN_URL: Keep the answers in the page URL (default: false)
+"""
+
+import json
+import os
+from functools import lru_cache
+
+import reflex as rx
+from reflex.constants import Dirs
+from reflex.experimental.client_state import ClientStateVar
+from reflex.utils.imports import ImportVar
+from reflex.vars import VarData
+from reflex.vars.base import Var
+
+from ..attributes import ATTRIBUTE_OPTION_CODES
+from ..flow_bundle import STEP_FUNCTION_JS, build_bundle, dump_bundle
+
+ANSWERS_IN_URL = os.getenv("ANSWERS_IN_URL", "").lower() in ("1", "true", "yes", "on")
+
+# Attribute -> option code, as answered in this browser tab
+FLOW_ANSWERS = ClientStateVar.create("flow_answers", default={})
+
+# answers -> answers; replaces the answer parameters of the page URL with
+# these answers, keeping any other parameters after them
+URL_SYNC_FUNCTION_JS = """((answers) => {
+  const attributes = ATTRIBUTES;
+  const others = [...new URLSearchParams(window.location.search)].filter(
+    ([name]) => !attributes.includes(name)
+  );
+  const query = new URLSearchParams([
+    ...Object.entries(answers).sort(([a], [b]) => (a < b ? -1 : a > b ? 1 : 0)),
+    ...others,
+  ]).toString();
+  const url = window.location.pathname + (query ? `?${query}` : "") + window.location.hash;
+  window.history.replaceState(window.history.state, "", url);
+  return answers;
+})""".replace("ATTRIBUTES", json.dumps(sorted(ATTRIBUTE_OPTION_CODES)))
+
+
+@lru_cache(maxsize=None)
+def _flow_var_data() -> VarData:
+    """Put the bundle and the step function in the page's refs, once per component."""
+    bundle_json = dump_bundle(build_bundle()).strip()
+    hooks = {
+        f"refs['_flow_bundle'] ??= {bundle_json}": None,
+        f"refs['_flow_step'] ??= {STEP_FUNCTION_JS}": None,
+    }
+    if ANSWERS_IN_URL:
+        hooks[f"refs['_flow_sync_url'] ??= {URL_SYNC_FUNCTION_JS}"] = None
+    return VarData(
+        hooks=hooks,
+        imports={f"$/{Dirs.STATE_PATH}": [ImportVar(tag="refs")]},
+    )
+
+
+def answers() -> Var:
+    """The answers given so far."""
+    return FLOW_ANSWERS.value.to(dict)
+
+
+def flow_step() -> Var:
+    """{verdict, rule, description, attribute} for the current answers."""
+    return Var(
+        _js_expr=f"refs['_flow_step'](refs['_flow_bundle'], {answers()})",
+        _var_data=VarData.merge(answers()._get_all_var_data(), _flow_var_data()),
+    ).to(dict)
+
+
+def current_attribute() -> Var:
+    """The attribute asked about next, or null once there is a verdict."""
+    return flow_step()["attribute"].to(str)
+
+
+def verdict() -> Var:
+    """"edible", "poisonous" or "unknown" once decided, otherwise null."""
+    return flow_step()["verdict"].to(str)
+
+
+def matched_rule() -> Var:
+    return flow_step()["rule"].to(str)
+
+
+def rule_description() -> Var:
+    """Explanation of the verdict, from the rule that decided it."""
+    return flow_step()["description"].to(str)
+
+
+def answered_count() -> Var:
+    return answers().length()
+
+
+def _set_answers(expression: str) -> Var:
+    if ANSWERS_IN_URL:
+        expression = f"refs['_flow_sync_url']({expression})"
+    return FLOW_ANSWERS.set_value(Var(_js_expr=expression, _var_data=_flow_var_data()))
+
+
+def record_answer(form_data: Var) -> Var:
+    """Store the submitted option for the current question; ignore empty submits."""
+    return _set_answers(
+        f"({form_data}.answer ? {{...{answers()}, [{current_attribute()}]: "
+        f"{form_data}.answer}} : {answers()})"
+    )
+
+
+def apply_suggestion(attribute: Var, suggestions: Var) -> Var:
+    """Answer one attribute with its suggested option."""
+    return _set_answers(f"({{...{answers()}, [{attribute}]: {suggestions}[{attribute}]}})")
+
+
+def apply_all_suggestions(suggestions: Var) -> Var:
+    """Answer every suggested attribute, replacing earlier answers."""
+    return _set_answers(f"({{...{answers()}, ...{suggestions}}})")
+
+
+def suggestions_pending(suggestions: Var) -> Var:
+    """Whether some suggested attribute is still unanswered."""
+    return Var(
+        _js_expr=f"Object.keys({suggestions}).some((attr) => !(attr in {answers()}))",
+        _var_data=VarData.merge(
+            suggestions._get_all_var_data(), answers()._get_all_var_data()
+        ),
+    ).to(bool)
+
+
+def clear_answers() -> rx.event.EventSpec:
+    """Forget the answers; an event, so it can be chained with server events."""
+    return rx.call_function(_set_answers("({})"))
@@ -2,221 +2,278 @@
 
 import reflex as rx
 
-from ..state import MushroomExpertState
+from ..i18n import static_t
+from ..services.uploads import UPLOAD_MAX_BYTES
+from ..state import MAX_UPLOAD_PHOTOS, MushroomExpertState
+from . import client_flow
 
 
-def image_upload_section() -> rx.Component:
-    """Render the optional image upload section for LLM analysis."""
-    return rx.cond(
-        MushroomExpertState.llm_enabled,
-        rx.card(
-            rx.vstack(
-                rx.heading(
-                    MushroomExpertState.ui_image_upload_title,
-                    size="5",
-                    margin_bottom="10px",
-                ),
-                rx.text(
-                    MushroomExpertState.ui_image_upload_desc,
-                    size="2",
-                    color="gray",
-                    margin_bottom="15px",
-                ),
-                # Upload area
-                rx.cond(
-                    ~MushroomExpertState.image_uploaded,
+def _suggestion_list(locale: str, suggestions: rx.Var) -> rx.Component:
+    """One card per suggested attribute, each with its own Apply button."""
+    return rx.vstack(
+        rx.foreach(
+            suggestions.items(),
+            lambda item: rx.card(
+                rx.hstack(
                     rx.vstack(
-                        rx.upload(
-                            rx.vstack(
-                                rx.button(
-                                    rx.icon("upload", size=20),
-                                    MushroomExpertState.ui_button_upload,
-                                    size="3",
-                                    variant="soft",
-                                ),
-                                rx.text(
-                                    MushroomExpertState.ui_drag_and_drop,
-                                    size="2",
-                                    color="gray",
-                                ),
-                            ),
-                            id="mushroom_image_upload",
-                            accept={
-                                "image/png": [".png"],
-                                "image/jpeg": [".jpg", ".jpeg"],
-                            },
-                            max_files=1,
-                            border="2px dashed var(--accent-9)",
-                            padding="30px",
-                            border_radius="8px",
+                        rx.text(
+                            item[0].replace("_", " ").title(),
+                            size="2",
+                            weight="bold",
                         ),
-                        rx.hstack(
-                            rx.foreach(
-                                rx.selected_files("mushroom_image_upload"),
-                                lambda file: rx.text(file),
-                            ),
+                        rx.text(
+                            "Value: ",
+                            item[1],
+                            size="2",
+                            color="gray",
                         ),
-                        rx.cond(
-                            MushroomExpertState.get_analyzing_status,
-                            rx.button(MushroomExpertState.ui_button_analyze, loading=True, size="2"),
+                        align="start",
+                        spacing="1",
+                    ),
+                    rx.spacer(),
+                    rx.button(
+                        static_t(locale, "image_upload.button_apply"),
+                        size="1",
+                        variant="soft",
+                        on_click=client_flow.apply_suggestion(item[0], suggestions),
+                    ),
+                    width="100%",
+                    align="center",
+                ),
+                size="1",
+            ),
+        ),
+        spacing="2",
+        width="100%",
+    )
+
+
+def image_upload_section(locale: str) -> rx.Component:
+    """Render the optional image upload section.
+
+    Shown even without an LLM, since the offline color extractor still
+    estimates cap, gill and stalk colors. Those estimates are listed apart
+    from the model's suggestions and left out of "Apply all".
+    """
+    return rx.card(
+        rx.vstack(
+            rx.heading(
+                static_t(locale, "image_upload.section_title"),
+                size="5",
+                margin_bottom="10px",
+            ),
+            rx.text(
+                static_t(locale, "image_upload.section_description"),
+                size="2",
+                color="gray",
+                margin_bottom="15px",
+            ),
+            # Upload area
+            rx.cond(
+                ~MushroomExpertState.image_uploaded,
+                rx.vstack(
+                    rx.upload(
+                        rx.vstack(
                             rx.button(
-                                MushroomExpertState.ui_button_analyze,
-                                on_click=lambda: MushroomExpertState.handle_image_upload(
-                                    rx.upload_files(upload_id="mushroom_image_upload")
-                                ),
+                                rx.icon("upload", size=20),
+                                static_t(locale, "image_upload.button_upload"),
+                                size="3",
+                                variant="soft",
+                            ),
+                            rx.text(
+                                static_t(locale, "image_upload.drag_and_drop"),
                                 size="2",
+                                color="gray",
                             ),
                         ),
-                        width="100%",
-                        spacing="3",
+                        id="mushroom_image_upload",
+                        accept={
+                            "image/png": [".png"],
+                            "image/jpeg": [".jpg", ".jpeg"],
+                        },
+                        multiple=True,
+                        max_files=MAX_UPLOAD_PHOTOS,
+                        # Oversized photos are refused in the browser too
+                        max_size=UPLOAD_MAX_BYTES,
+                        border="2px dashed var(--accent-9)",
+                        padding="30px",
+                        border_radius="8px",
                     ),
-                    # Show suggestions after upload
-                    rx.vstack(
-                        rx.hstack(
-                            rx.icon("check-circle", color="green", size=20),
-                            rx.text(
-                                MushroomExpertState.ui_analysis_complete,
-                                size="3",
-                                weight="bold",
-                                color="green",
-                            ),
-                            spacing="2",
+                    rx.hstack(
+                        rx.foreach(
+                            rx.selected_files("mushroom_image_upload"),
+                            lambda file: rx.text(file),
+                        ),
+                    ),
+                    rx.cond(
+                        MushroomExpertState.get_analyzing_status,
+                        rx.button(
+                            static_t(locale, "image_upload.button_analyze"),
+                            loading=True,
+                            size="2",
                         ),
-                        rx.divider(),
-                        # Show suggestions list if not yet applied
-                        rx.cond(
-                            ~MushroomExpertState.llm_suggestions_applied,
-                            rx.vstack(
-                                rx.text(
-                                    MushroomExpertState.ui_ai_suggestions,
-                                    size="3",
-                                    weight="bold",
-                                    margin_top="10px",
+                        rx.button(
+                            static_t(locale, "image_upload.button_analyze"),
+                            # The analysis skips attributes the answers have closed
+                            on_click=lambda: [
+                                MushroomExpertState.sync_answers(client_flow.answers()),
+                                MushroomExpertState.handle_image_upload(
+                                    rx.upload_files(upload_id="mushroom_image_upload")
                                 ),
-                                # Display suggestions
+                            ],
+                            size="2",
+                        ),
+                    ),
+                    width="100%",
+                    spacing="3",
+                ),
+                # Show suggestions after upload
+                rx.vstack(
+                    rx.hstack(
+                        rx.icon("check-circle", color="green", size=20),
+                        rx.text(
+                            static_t(
+                                locale,
+                                "image_upload.analysis_complete",
+                                count=MushroomExpertState.get_suggestions_count,
+                            ),
+                            size="3",
+                            weight="bold",
+                            color="green",
+                        ),
+                        spacing="2",
+                    ),
+                    rx.divider(),
+                    # Show suggestions list if not yet applied
+                    rx.cond(
+                        client_flow.suggestions_pending(MushroomExpertState.llm_suggestions)
+                        | client_flow.suggestions_pending(MushroomExpertState.color_suggestions),
+                        rx.vstack(
+                            rx.cond(
+                                MushroomExpertState.llm_suggestions,
                                 rx.vstack(
-                                    rx.foreach(
-                                        MushroomExpertState.llm_suggestions.items(),
-                                        lambda item: rx.card(
-                                            rx.hstack(
-                                                rx.vstack(
-                                                    rx.text(
-                                                        item[0]
-                                                        .replace("_", " ")
-                                                        .title(),
-                                                        size="2",
-                                                        weight="bold",
-                                                    ),
-                                                    rx.text(
-                                                        "Value: ",
-                                                        item[1],
-                                                        size="2",
-                                                        color="gray",
-                                                    ),
-                                                    align="start",
-                                                    spacing="1",
-                                                ),
-                                                rx.spacer(),
-                                                rx.button(
-                                                    MushroomExpertState.ui_button_apply,
-                                                    size="1",
-                                                    variant="soft",
-                                                    on_click=MushroomExpertState.apply_llm_suggestion(
-                                                        item[0]
-                                                    ),
-                                                ),
-                                                width="100%",
-                                                align="center",
-                                            ),
-                                            size="1",
-                                        ),
+                                    rx.text(
+                                        static_t(locale, "image_upload.ai_suggestions"),
+                                        size="3",
+                                        weight="bold",
+                                        margin_top="10px",
                                     ),
-                                    spacing="2",
+                                    _suggestion_list(locale, MushroomExpertState.llm_suggestions),
                                     width="100%",
+                                    spacing="3",
+                                    align="start",
                                 ),
-                                rx.hstack(
-                                    rx.button(
-                                        MushroomExpertState.ui_button_apply_all,
-                                        size="2",
-                                        on_click=MushroomExpertState.apply_all_llm_suggestions,
-                                        variant="solid",
+                            ),
+                            # Color estimates are labelled apart and applied one by one
+                            rx.cond(
+                                MushroomExpertState.color_suggestions,
+                                rx.vstack(
+                                    rx.text(
+                                        static_t(locale, "image_upload.color_estimates"),
+                                        size="3",
+                                        weight="bold",
+                                        margin_top="10px",
                                     ),
-                                    rx.button(
-                                        MushroomExpertState.ui_button_upload_different,
+                                    rx.text(
+                                        static_t(locale, "image_upload.color_estimates_hint"),
                                         size="2",
-                                        variant="outline",
-                                        on_click=MushroomExpertState.clear_llm_suggestions,
+                                        color="gray",
+                                    ),
+                                    _suggestion_list(
+                                        locale, MushroomExpertState.color_suggestions
                                     ),
-                                    spacing="2",
                                     width="100%",
-                                    margin_top="15px",
+                                    spacing="3",
+                                    align="start",
                                 ),
-                                width="100%",
-                                spacing="3",
-                                align="start",
                             ),
-                            # Show message after suggestions applied
-                            rx.vstack(
-                                rx.callout(
-                                    rx.vstack(
-                                        rx.hstack(
-                                            rx.icon("check-circle-2", size=20),
-                                            rx.text(
-                                                MushroomExpertState.ui_suggestions_applied,
-                                                size="3",
-                                                weight="bold",
-                                            ),
-                                            spacing="2",
-                                        ),
-                                        rx.cond(
-                                            ~MushroomExpertState.is_complete,
-                                            rx.text(
-                                                MushroomExpertState.ui_fill_remaining,
-                                                size="2",
-                                                margin_top="5px",
-                                            ),
+                            rx.hstack(
+                                rx.cond(
+                                    MushroomExpertState.llm_suggestions,
+                                    rx.button(
+                                        static_t(locale, "image_upload.button_apply_all"),
+                                        size="2",
+                                        on_click=client_flow.apply_all_suggestions(
+                                            MushroomExpertState.llm_suggestions
                                         ),
-                                        spacing="2",
+                                        variant="solid",
                                     ),
-                                    icon="info",
-                                    color_scheme="blue",
-                                    size="2",
-                                    margin_top="10px",
                                 ),
                                 rx.button(
-                                    MushroomExpertState.ui_button_upload_different,
+                                    static_t(locale, "image_upload.button_upload_different"),
                                     size="2",
                                     variant="outline",
-                                    on_click=MushroomExpertState.clear_llm_suggestions(),
-                                    margin_top="10px",
+                                    on_click=MushroomExpertState.clear_llm_suggestions,
                                 ),
-                                width="100%",
                                 spacing="2",
-                                align="start",
+                                width="100%",
+                                margin_top="15px",
                             ),
+                            width="100%",
+                            spacing="3",
+                            align="start",
+                        ),
+                        # Show message after suggestions applied
+                        rx.vstack(
+                            rx.callout(
+                                rx.vstack(
+                                    rx.hstack(
+                                        rx.icon("check-circle-2", size=20),
+                                        rx.text(
+                                            static_t(locale, "image_upload.suggestions_applied"),
+                                            size="3",
+                                            weight="bold",
+                                        ),
+                                        spacing="2",
+                                    ),
+                                    rx.cond(
+                                        ~client_flow.verdict(),
+                                        rx.text(
+                                            static_t(locale, "image_upload.fill_remaining"),
+                                            size="2",
+                                            margin_top="5px",
+                                        ),
+                                    ),
+                                    spacing="2",
+                                ),
+                                icon="info",
+                                color_scheme="blue",
+                                size="2",
+                                margin_top="10px",
+                            ),
+                            rx.button(
+                                static_t(locale, "image_upload.button_upload_different"),
+                                size="2",
+                                variant="outline",
+                                on_click=MushroomExpertState.clear_llm_suggestions(),
+                                margin_top="10px",
+                            ),
+                            width="100%",
+                            spacing="2",
+                            align="start",
                         ),
-                        width="100%",
-                        spacing="3",
-                        align="start",
                     ),
+                    width="100%",
+                    spacing="3",
+                    align="start",
                 ),
-                # Error message
-                rx.cond(
-                    MushroomExpertState.llm_error != "",
-                    rx.callout(
-                        MushroomExpertState.llm_error,
-                        icon="alert-circle",
-                        color_scheme="red",
-                        size="1",
-                        margin_top="10px",
-                    ),
+            ),
+            # Error message
+            rx.cond(
+                MushroomExpertState.llm_error != "",
+                rx.callout(
+                    MushroomExpertState.llm_error,
+                    icon="alert-circle",
+                    color_scheme="red",
+                    size="1",
+                    margin_top="10px",
                 ),
-                width="100%",
-                spacing="4",
-                align="start",
             ),
             width="100%",
-            max_width="600px",
-            margin_bottom="20px",
+            spacing="4",
+            align="start",
         ),
+        width="100%",
+        max_width="600px",
+        margin_bottom="20px",
     )
@@ -1,34 +1,53 @@
 import reflex as rx
 
+from ..i18n import get_attribute_catalog, static_t
 from ..state import MushroomExpertState
+from . import client_flow
 
 
-def question_form() -> rx.Component:
-    """Render the current question with radio options."""
+def _catalog_field(locale: str, field: str) -> rx.Var:
+    """One field of the locale's attribute catalog, for the current attribute.
+
+    The whole catalog is compiled into the page as a literal, so the question
+    text is in the page's language from first paint and never travels in
+    state deltas.
+    """
+    catalog = get_attribute_catalog(locale)
+    values = {attr_name: getattr(entry, field) for attr_name, entry in catalog.items()}
+    return rx.Var.create(values)[client_flow.current_attribute()]
+
+
+def question_form(locale: str) -> rx.Component:
+    """Render the current question with radio options.
+
+    Answers are recorded and the next question is picked in the browser.
+    """
+    current_attribute = client_flow.current_attribute()
+    question = _catalog_field(locale, "question")
+    options = _catalog_field(locale, "options")
+    description = _catalog_field(locale, "description")
     return rx.card(
         rx.vstack(
             rx.heading(
-                MushroomExpertState.get_current_question,
+                question,
                 size="6",
                 margin_bottom="10px",
             ),
             # Show LLM suggestion for current question if available
             rx.cond(
-                MushroomExpertState.llm_suggestions.get(
-                    MushroomExpertState.current_attribute
-                ),
+                MushroomExpertState.llm_suggestions.get(current_attribute),
                 rx.callout(
                     rx.hstack(
                         rx.text(
-                            MushroomExpertState.ui_ai_suggestion_available,
+                            static_t(locale, "question_form.ai_suggestion_available"),
                             size="2",
                         ),
                         rx.button(
-                            MushroomExpertState.ui_button_autofill,
+                            static_t(locale, "question_form.button_autofill"),
                             size="1",
                             variant="soft",
-                            on_click=lambda _: MushroomExpertState.apply_llm_suggestion(
-                                MushroomExpertState.current_attribute
+                            on_click=client_flow.apply_suggestion(
+                                current_attribute, MushroomExpertState.llm_suggestions
                             ),
                         ),
                         spacing="3",
@@ -45,7 +64,7 @@ def question_form() -> rx.Component:
                     rx.vstack(
                         rx.radio_group.root(
                             rx.foreach(
-                                MushroomExpertState.get_current_options,
+                                options,
                                 lambda option: rx.radio_group.item(
                                     rx.text(option[1]),  # Display name
                                     value=option[0],  # Code
@@ -56,7 +75,7 @@ def question_form() -> rx.Component:
                             spacing="3",
                         ),
                         rx.button(
-                            MushroomExpertState.ui_button_submit,
+                            static_t(locale, "question_form.button_submit"),
                             type="submit",
                             size="3",
                             margin_top="20px",
@@ -65,14 +84,15 @@ def question_form() -> rx.Component:
                         spacing="3",
                         align="start",
                     ),
-                    on_submit=MushroomExpertState.handle_answer,
+                    on_submit=client_flow.record_answer,
+                    reset_on_submit=True,
                     width="100%",
                 ),
                 # Attribute description
                 rx.cond(
-                    MushroomExpertState.get_current_description != "",
+                    description != "",
                     rx.text(
-                        MushroomExpertState.get_current_description,
+                        description,
                         size="2",
                         color="gray",
                         margin_bottom="20px",
@@ -82,7 +102,9 @@ def question_form() -> rx.Component:
             ),
             rx.divider(margin_top="20px", margin_bottom="20px"),
             rx.text(
-                MushroomExpertState.ui_progress,
+                static_t(
+                    locale, "question_form.progress", count=client_flow.answered_count()
+                ),
                 size="2",
                 color="gray",
             ),
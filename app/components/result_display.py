@@ -1,62 +1,78 @@
 import reflex as rx
 
+from ..i18n import static_t
 from ..state import MushroomExpertState
+from . import client_flow
 
 
-def result_display() -> rx.Component:
-    """Display the final result."""
+def result_display(locale: str) -> rx.Component:
+    """Display the verdict reached in the browser."""
+    verdict = client_flow.verdict()
+    rule = client_flow.matched_rule()
+
+    def description() -> rx.Component:
+        return rx.text(client_flow.rule_description(), size="2", color="gray")
+
     return rx.card(
         rx.vstack(
-            rx.heading(MushroomExpertState.ui_result_title, size="7"),
+            rx.heading(static_t(locale, "result.title"), size="7"),
             rx.cond(
-                MushroomExpertState.prediction == "edible",
+                verdict == "edible",
                 rx.vstack(
                     rx.callout(
-                        MushroomExpertState.ui_result_edible,
+                        static_t(locale, "result.edible"),
                         icon="circle-check",
                         color="green",
                         size="3",
                     ),
                     rx.text(
-                        MushroomExpertState.ui_result_matched_rule,
+                        static_t(locale, "result.matched_rule", rule=rule),
                         size="2",
                         color="gray",
                     ),
+                    description(),
                     spacing="2",
                 ),
                 rx.cond(
-                    MushroomExpertState.prediction == "poisonous",
+                    verdict == "poisonous",
                     rx.vstack(
                         rx.callout(
-                            MushroomExpertState.ui_result_poisonous,
+                            static_t(locale, "result.poisonous"),
                             icon="triangle-alert",
                             color="red",
                             size="3",
                         ),
                         rx.text(
-                            MushroomExpertState.ui_result_matched_rule,
+                            static_t(locale, "result.matched_rule", rule=rule),
                             size="2",
                             color="gray",
                         ),
+                        description(),
                         spacing="2",
                     ),
-                    rx.callout(
-                        MushroomExpertState.ui_result_unknown,
-                        icon="circle-help",
-                        color="orange",
-                        size="3",
+                    rx.vstack(
+                        rx.callout(
+                            static_t(locale, "result.unknown"),
+                            icon="circle-help",
+                            color="orange",
+                            size="3",
+                        ),
+                        description(),
+                        spacing="2",
                     ),
                 ),
             ),
             rx.divider(margin_top="20px", margin_bottom="20px"),
             rx.text(
-                MushroomExpertState.ui_progress,
+                static_t(
+                    locale, "question_form.progress", count=client_flow.answered_count()
+                ),
                 size="2",
                 color="gray",
             ),
             rx.button(
-                MushroomExpertState.ui_button_start_over,
-                on_click=MushroomExpertState.reset_form,
+                static_t(locale, "result.button_start_over"),
+                on_click=[client_flow.clear_answers(), MushroomExpertState.reset_form],
                 size="3",
                 margin_top="20px",
             ),
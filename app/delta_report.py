@@ -0,0 +1,193 @@
+"""Size and cost of the state deltas sent to the browser per event.
+
+Replays a short session against an in-memory state tree, with the events the
+UI actually sends: page load, a photo analysis (the answers synced from the
+browser, the upload with its color estimates, then each update of the
+background analysis), dismissing the suggestions, a second analysis, start
+over and a locale switch. Answering questions runs in the browser and sends
+no events, so it does not appear. The vision model is the local fake server,
+run in-process without latency.
+
+For each event (and each background update) it reports the size of the JSON
+delta Reflex would push over the websocket, how many vars it carries, and the
+time spent running the handler and resolving the delta.
+
+Usage:
+    python -m app.delta_report [--rounds 50]
+"""
+
+import asyncio
+import json
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from reflex.state import State
+
+from . import state as state_module
+from .loadtest import PhotoUpload, make_photos
+from .state import MushroomExpertState
+
+
+@dataclass
+class EventDelta:
+    """One event's delta, as it would be pushed to the browser."""
+
+    event: str
+    delta: dict[str, dict[str, Any]]
+    bytes: int
+    vars: int
+    elapsed_ms: float
+
+
+class _BackgroundProxy:
+    """Stand-in for Reflex's StateProxy that measures a delta per update."""
+
+    def __init__(self, state: MushroomExpertState, record: Callable[[str, float], None]):
+        object.__setattr__(self, "_state", state)
+        object.__setattr__(self, "_record", record)
+        object.__setattr__(self, "_entered", 0.0)
+
+    async def __aenter__(self):
+        object.__setattr__(self, "_entered", time.perf_counter())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._record("stream_update", self._entered)
+
+    def __getattr__(self, name):
+        return getattr(self._state, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._state, name, value)
+
+
+def _vision_service():
+    """A streaming vision service backed by the in-process fake server."""
+    import httpx
+
+    from .services.analysis_cache import AnalysisCache
+    from .services.fake_vision_server import FakeVisionConfig, create_app
+    from .services.llm_limits import LLMCallLimiter
+    from .services.llm_vision import LLMVisionService
+    from .services.vision_backends import HttpVisionBackend
+
+    config = FakeVisionConfig(latency_ms=0, latency_sigma=0, chunk_delay_ms=0, seed=0)
+    service = LLMVisionService(
+        HttpVisionBackend(
+            url="http://fake-vision", transport=httpx.ASGITransport(app=create_app(config))
+        )
+    )
+    service.streaming = True
+    service.cache = AnalysisCache(max_entries=0)
+    service.limiter = LLMCallLimiter(rate_per_minute=1e9)
+    return service
+
+
+def _session_events(
+    state: MushroomExpertState, photo: bytes
+) -> list[tuple[str, Callable[[], Any]]]:
+    """The events of one replayed session, in order.
+
+    Upload events are followed by the background analysis they start.
+    """
+    cls = MushroomExpertState
+
+    def upload():
+        return cls.handle_image_upload.fn(state, [PhotoUpload(photo)])
+
+    return [
+        ("on_load", state.on_load),
+        # The Analyze button sends the browser's answers, then the photo
+        ("sync_answers", lambda: cls.sync_answers.fn(state, {"odor": "n"})),
+        ("image_upload", upload),
+        ("clear_suggestions", lambda: cls.clear_llm_suggestions.fn(state)),
+        ("sync_answers", lambda: cls.sync_answers.fn(state, {"odor": "n", "stalk_root": "b"})),
+        ("image_upload", upload),
+        ("reset_form", lambda: cls.reset_form.fn(state)),
+        ("on_load", state.on_load),
+        ("set_locale", lambda: cls.set_locale.fn(state, "tr")),
+    ]
+
+
+async def _replay(photo: bytes) -> list[EventDelta]:
+    root = State(_reflex_internal_init=True)
+    state = root.get_substate(MushroomExpertState.get_full_name().split(".")[1:])
+    deltas = []
+
+    def record(event: str, start: float) -> None:
+        delta = root.get_delta()
+        elapsed = time.perf_counter() - start
+        root._clean()
+
+        deltas.append(
+            EventDelta(
+                event=event,
+                delta=delta,
+                bytes=len(json.dumps(delta, default=str)),
+                vars=sum(len(substate) for substate in delta.values()),
+                elapsed_ms=elapsed * 1000,
+            )
+        )
+
+    proxy = _BackgroundProxy(state, record)
+    for event, handler in _session_events(state, photo):
+        start = time.perf_counter()
+        result = handler()
+        if isinstance(result, Awaitable):
+            result = await result
+        record(event, start)
+
+        if event == "image_upload" and result is not None:
+            # The analysis the upload handed over, the newest pending upload
+            upload_id = next(reversed(state_module._pending_uploads))
+            await MushroomExpertState.stream_image_analysis.fn(proxy, upload_id)
+    return deltas
+
+
+def replay_session() -> list[EventDelta]:
+    """Run one session and measure the delta after each event."""
+    from .services import llm_vision
+
+    (photo,) = make_photos(1)
+    service = _vision_service()
+    previous = llm_vision._llm_vision_service
+    llm_vision._llm_vision_service = service
+
+    async def run() -> list[EventDelta]:
+        try:
+            return await _replay(photo)
+        finally:
+            await service.aclose()
+
+    try:
+        return asyncio.run(run())
+    finally:
+        llm_vision._llm_vision_service = previous
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Replay sessions and print the median delta of each event."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    # The first session also pays for imports and cache warm-up
+    replay_session()
+    sessions = [replay_session() for _ in range(args.rounds)]
+
+    print(f"{'step':<4} {'event':<17} {'bytes':>6} {'vars':>5} {'median ms':>10}")
+    for step, deltas in enumerate(zip(*sessions)):
+        first = deltas[0]
+        median_ms = statistics.median(delta.elapsed_ms for delta in deltas)
+        print(
+            f"{step:<4} {first.event:<17} {first.bytes:>6} {first.vars:>5} "
+            f"{median_ms:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
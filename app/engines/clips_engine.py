@@ -1,15 +1,30 @@
 """CLIPS-based rule engine for mushroom classification expert system."""
 
 import os
+import re
 from pathlib import Path
 
+from ..log import get_logger
+from ..metrics import ENGINE_LATENCY, timed
+from ..profiling import profiled
+from ..tracing import traced
+from .rules_engine import open_attributes
+
+logger = get_logger("engine")
+
+# Slot patterns such as "(odor f)" on the left-hand side of a rule; the
+# "(id ?case-id)" binding is skipped because its value is a variable
+_SLOT_PATTERN = re.compile(r"\((\w+) ([^\s()?]+)\)")
+# The verdict asserted on the right-hand side, such as '(target "edible")'
+_TARGET_PATTERN = re.compile(r'\(target "?(\w+)"?\)')
+
 try:
     import clips
 
     clips_available = True
 except ImportError:
     clips_available = False
-    print("Warning: clipspy not installed. Install with: pip install clipspy")
+    logger.warning("clipspy not installed. Install with: pip install clipspy")
 
 
 class CLIPSRulesEngine:
@@ -42,6 +57,8 @@ class CLIPSRulesEngine:
         self.rules_file = rules_file
         self.env: clips.Environment | None = None  # type: ignore
         self._initialize_clips()
+        self.rule_conditions = self._parse_rule_conditions()
+        self.rule_targets = self._parse_rule_targets()
 
     def _initialize_clips(self):
         """Initialize CLIPS environment and load rules."""
@@ -55,11 +72,32 @@ class CLIPSRulesEngine:
                 f"Failed to load CLIPS rules from {self.rules_file}: {e}"
             )
 
+    def _parse_rule_conditions(self) -> dict[str, dict[str, str]]:
+        """Read each rule's attribute conditions from the loaded CLIPS rules."""
+        conditions = {}
+        for rule in self.env.rules():
+            lhs = str(rule).split("=>", 1)[0]
+            conditions[rule.name] = dict(_SLOT_PATTERN.findall(lhs))
+        return conditions
+
+    def _parse_rule_targets(self) -> dict[str, str]:
+        """Read the verdict each CLIPS rule concludes."""
+        targets = {}
+        for rule in self.env.rules():
+            rhs = str(rule).split("=>", 1)[1]
+            match = _TARGET_PATTERN.search(rhs)
+            if match:
+                targets[rule.name] = match.group(1)
+        return targets
+
     def reset_engine(self):
         """Reset the CLIPS environment to its initial state."""
         if self.env:
             self.env.reset()
 
+    @timed(ENGINE_LATENCY.labels("check_rules"))
+    @profiled("engine.check_rules")
+    @traced("engine.check_rules")
     def check_rules(self, facts: dict[str, str]) -> tuple[str, str, str] | None:
         """
         Check if any rule matches the current facts.
@@ -70,7 +108,7 @@ class CLIPSRulesEngine:
         Returns:
             Tuple of (target, rule_name, description) if a rule matches, None otherwise.
         """
-        print(f"\n🔍 CLIPS check_rules called with facts: {facts}")
+        logger.debug("check_rules called", extra={"facts": facts})
 
         # Reset environment for fresh inference
         self.env.reset()
@@ -79,19 +117,17 @@ class CLIPSRulesEngine:
         fact_slots = " ".join([f"({attr} {value})" for attr, value in facts.items()])
         fact_string = f"(case (id case-1) {fact_slots})"
 
-        print(f"   📋 Asserting: {fact_string}")
-
         try:
             self.env.assert_string(fact_string)
         except Exception as e:
-            print(f"   ❌ Error asserting fact: {e}")
-            print(f"   Fact string: {fact_string}")
+            logger.error(
+                "Error asserting fact: %s", e, extra={"fact_string": fact_string}
+            )
             return None
 
         # Run the rules
-        print("   ⚙️  Running CLIPS inference engine...")
         fired_count = self.env.run()
-        print(f"   🔥 {fired_count} rule(s) fired")
+        logger.debug("%d rule(s) fired", fired_count)
 
         # Check for conclusions
         conclusions_found = []
@@ -99,18 +135,84 @@ class CLIPSRulesEngine:
             if fact.template.name == "conclusion":
                 target = fact["target"]
                 rule_name = str(fact["rule"])
-                description = self._get_rule_description(rule_name)
+                description = self.rule_description(rule_name)
                 conclusions_found.append((target, rule_name, description))
-                print(f"   ✅ Conclusion found: {target} from rule {rule_name}")
+                logger.debug("Conclusion found: %s from rule %s", target, rule_name)
 
         if conclusions_found:
             # Return the first conclusion
             return conclusions_found[0]
 
-        print("   ℹ️  No conclusions found")
+        logger.debug("No conclusions found")
         return None
 
-    def _get_rule_description(self, rule_name: str) -> str:
+    @timed(ENGINE_LATENCY.labels("check_rules_batch"))
+    @profiled("engine.check_rules_batch")
+    @traced("engine.check_rules_batch")
+    def check_rules_batch(
+        self, cases: list[dict[str, str]]
+    ) -> list[tuple[str, str, str] | None]:
+        """
+        Check many cases in a single inference run.
+
+        Each case is asserted as its own fact with a distinct id, so the
+        environment is reset and run once for the whole batch instead of once
+        per case; conclusions are matched back to their case by id. Facts are
+        built through the case template rather than parsed from strings,
+        which is several times faster for large batches.
+
+        Args:
+            cases: List of attribute -> value dictionaries
+
+        Returns:
+            For each case, in order, (target, rule_name, description) of its
+            first conclusion, or None if no rule matched.
+        """
+        self.env.reset()
+
+        case_template = self.env.find_template("case")
+        for index, facts in enumerate(cases):
+            slots = {attr: clips.Symbol(value) for attr, value in facts.items()}
+            try:
+                case_template.assert_fact(id=clips.Symbol(f"case-{index}"), **slots)
+            except Exception as e:
+                logger.error("Error asserting fact: %s", e, extra={"facts": facts})
+
+        fired_count = self.env.run()
+        logger.debug("%d rule(s) fired for %d cases", fired_count, len(cases))
+
+        results: list[tuple[str, str, str] | None] = [None] * len(cases)
+        for fact in self.env.facts():
+            if fact.template.name == "conclusion":
+                index = int(str(fact["id"]).removeprefix("case-"))
+                if results[index] is None:
+                    rule_name = str(fact["rule"])
+                    results[index] = (
+                        fact["target"],
+                        rule_name,
+                        self.rule_description(rule_name),
+                    )
+        return results
+
+    def fired_rules(self, facts: dict[str, str]) -> list[str]:
+        """Names of every rule that concludes for the facts, in firing order.
+
+        check_rules reports the first of these; the full order shows which
+        rule wins when several match.
+        """
+        self.env.reset()
+        self.env.find_template("case").assert_fact(
+            id=clips.Symbol("case-1"),
+            **{attr: clips.Symbol(value) for attr, value in facts.items()},
+        )
+        self.env.run()
+        return [
+            str(fact["rule"])
+            for fact in self.env.facts()
+            if fact.template.name == "conclusion"
+        ]
+
+    def rule_description(self, rule_name: str) -> str:
         """Get the description/docstring of a rule."""
         try:
             # Try to find the rule and get its comment/docstring
@@ -123,6 +225,13 @@ class CLIPSRulesEngine:
             pass
         return f"Rule: {rule_name}"
 
+    def get_open_attributes(self, answered: dict[str, str]) -> set[str]:
+        """Get the unanswered attributes that can still change the verdict."""
+        return open_attributes(self.rule_conditions.values(), answered)
+
+    @timed(ENGINE_LATENCY.labels("get_next_question"))
+    @profiled("engine.get_next_question")
+    @traced("engine.get_next_question")
     def get_next_question(self, answered: dict[str, str]) -> str | None:
         """
         Determine the next attribute to ask about.
@@ -229,6 +338,32 @@ if not clips_available:
     class CLIPSRulesEngine(PythonRulesEngine):
         """Fallback to Python-based rules engine when CLIPS is not available."""
 
-        def __init__(self, rules_file: Optional[str] = None):
-            print("Using Python-based rules engine (CLIPS not available)")
+        def __init__(self, rules_file: str | None = None):
+            logger.info("Using Python-based rules engine (CLIPS not available)")
             super().__init__()
+
+
+# Global singleton instance, built on first use rather than at import time
+_rules_engine = None
+
+
+def get_rules_engine():
+    """Get or create the rules engine singleton.
+
+    Falls back to the Python-based rules engine if CLIPS fails to initialize.
+    """
+    global _rules_engine
+    if _rules_engine is None:
+        try:
+            _rules_engine = CLIPSRulesEngine()
+            logger.info("CLIPS engine initialized successfully")
+        except Exception as e:
+            logger.warning(
+                "Failed to initialize CLIPS engine: %s. "
+                "Falling back to Python-based rules engine",
+                e,
+            )
+            from .rules_engine import RulesEngine
+
+            _rules_engine = RulesEngine()
+    return _rules_engine
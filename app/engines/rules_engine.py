@@ -1,6 +1,11 @@
 """Rule engine for mushroom classification expert system."""
 
 from dataclasses import dataclass
+from typing import Iterable
+
+from ..metrics import ENGINE_LATENCY, timed
+from ..profiling import profiled
+from ..tracing import traced
 
 
 @dataclass
@@ -13,6 +18,21 @@ class Rule:
     description: str
 
 
+def open_attributes(
+    rule_conditions: Iterable[dict[str, str]], answered: dict[str, str]
+) -> set[str]:
+    """Find unanswered attributes that can still change the verdict.
+
+    An attribute is open if it appears in a rule whose answered conditions all
+    hold, so answering it could make that rule fire.
+    """
+    open_attrs: set[str] = set()
+    for conditions in rule_conditions:
+        if all(answered.get(attr, value) == value for attr, value in conditions.items()):
+            open_attrs.update(attr for attr in conditions if attr not in answered)
+    return open_attrs
+
+
 class RulesEngine:
     """Expert system rule engine."""
 
@@ -129,6 +149,9 @@ class RulesEngine:
             ),
         ]
 
+    @timed(ENGINE_LATENCY.labels("check_rules"))
+    @profiled("engine.check_rules")
+    @traced("engine.check_rules")
     def check_rules(self, facts: dict[str, str]) -> tuple[str, str, str] | None:
         """
         Check if any rule matches the current facts.
@@ -139,6 +162,23 @@ class RulesEngine:
                 return (rule.target, rule.name, rule.description)
         return None
 
+    @timed(ENGINE_LATENCY.labels("check_rules_batch"))
+    @profiled("engine.check_rules_batch")
+    @traced("engine.check_rules_batch")
+    def check_rules_batch(
+        self, cases: list[dict[str, str]]
+    ) -> list[tuple[str, str, str] | None]:
+        """Check many cases; returns check_rules' result for each, in order."""
+        results = []
+        for facts in cases:
+            match = None
+            for rule in self.rules:
+                if self._rule_matches(rule, facts):
+                    match = (rule.target, rule.name, rule.description)
+                    break
+            results.append(match)
+        return results
+
     def _rule_matches(self, rule: Rule, facts: dict[str, str]) -> bool:
         """Check if a rule's conditions are satisfied by the facts."""
         for attr, value in rule.conditions.items():
@@ -146,6 +186,13 @@ class RulesEngine:
                 return False
         return True
 
+    def get_open_attributes(self, answered: dict[str, str]) -> set[str]:
+        """Get the unanswered attributes that can still change the verdict."""
+        return open_attributes((rule.conditions for rule in self.rules), answered)
+
+    @timed(ENGINE_LATENCY.labels("get_next_question"))
+    @profiled("engine.get_next_question")
+    @traced("engine.get_next_question")
     def get_next_question(self, answered: dict[str, str]) -> str | None:
         """
         Determine the next attribute to ask about.
@@ -0,0 +1,146 @@
+"""Rule bundle for the in-browser question flow.
+
+The question form steps through the questions in the browser instead of
+asking the server after every answer. This module exports what the browser
+needs to do that: the rules from rules.CLP, in the order the engine fires
+them, and the order the engine asks its questions in. The bundle is built
+from rules.CLP when the pages are compiled and inlined into them as compact
+JSON, along with STEP_FUNCTION_JS, which evaluates it the same way the
+engine does (first matching rule wins, otherwise the first unanswered
+question, otherwise no verdict). Inlining it saves the browser a fetch
+before the first question can be shown.
+
+Each rule carries the description the engine reports for it, so the
+browser shows the same explanation as the API.
+
+The engine's question policy only depends on which attributes are answered,
+not on the answers, so it is exported as a fixed order.
+
+Usage (print the bundle the pages are compiled with):
+    python -m app.flow_bundle
+"""
+
+import heapq
+import json
+from itertools import combinations
+from pathlib import Path
+from typing import Any, Mapping
+
+from .services.classification import UNKNOWN_DESCRIPTION, UNKNOWN_RULE, UNKNOWN_VERDICT
+
+RULES_FILE = Path(__file__).parent.parent / "rules.CLP"
+
+# (bundle, answers) -> {verdict, rule, description, attribute}; the browser
+# twin of next_step
+STEP_FUNCTION_JS = """((bundle, answers) => {
+  for (const [rule, verdict, description, conditions] of bundle.rules) {
+    if (Object.entries(conditions).every(([attr, code]) => answers[attr] === code)) {
+      return {verdict, rule, description, attribute: null};
+    }
+  }
+  const attribute = bundle.questions.find((attr) => !(attr in answers));
+  if (attribute !== undefined) {
+    return {verdict: null, rule: null, description: null, attribute};
+  }
+  const [verdict, rule, description] = bundle.unknown;
+  return {verdict, rule, description, attribute: null};
+})"""
+
+
+def _firing_order(engine) -> list[str]:
+    """Order the rules so the first match is the rule the engine would report.
+
+    Every pair of rules that can match together is run through the engine to
+    see which fires first; the pairs are then ordered topologically, keeping
+    the file order where the engine has no say.
+    """
+    names = list(engine.rule_conditions)
+    position = {name: index for index, name in enumerate(names)}
+    later: dict[str, set[str]] = {name: set() for name in names}
+    pending = dict.fromkeys(names, 0)
+
+    for first, second in combinations(names, 2):
+        conditions_a = engine.rule_conditions[first]
+        conditions_b = engine.rule_conditions[second]
+        if any(conditions_b.get(attr, code) != code for attr, code in conditions_a.items()):
+            continue
+        fired = engine.fired_rules({**conditions_a, **conditions_b})
+        winner, loser = sorted((first, second), key=fired.index)
+        later[winner].add(loser)
+        pending[loser] += 1
+
+    ready = [(position[name], name) for name, count in pending.items() if count == 0]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        _, name = heapq.heappop(ready)
+        order.append(name)
+        for loser in later[name]:
+            pending[loser] -= 1
+            if pending[loser] == 0:
+                heapq.heappush(ready, (position[loser], loser))
+    if len(order) != len(names):
+        raise RuntimeError("Rule firing order is not consistent between rule pairs")
+    return order
+
+
+def _question_order(engine) -> list[str]:
+    """The attributes in the order the engine asks for them."""
+    answered: dict[str, str] = {}
+    order = []
+    while (attr_name := engine.get_next_question(answered)) is not None:
+        order.append(attr_name)
+        answered[attr_name] = ""
+    return order
+
+
+def build_bundle(rules_file: Path = RULES_FILE) -> dict[str, Any]:
+    """Export the rules and question policy of rules.CLP.
+
+    Raises:
+        RuntimeError: If clipspy is not installed
+    """
+    from .engines.clips_engine import CLIPSRulesEngine, clips_available
+
+    if not clips_available:
+        raise RuntimeError("Building the question flow bundle requires clipspy")
+
+    engine = CLIPSRulesEngine(str(rules_file))
+    return {
+        "rules": [
+            [
+                name,
+                engine.rule_targets[name],
+                engine.rule_description(name),
+                engine.rule_conditions[name],
+            ]
+            for name in _firing_order(engine)
+        ],
+        "questions": _question_order(engine),
+        "unknown": [UNKNOWN_VERDICT, UNKNOWN_RULE, UNKNOWN_DESCRIPTION],
+    }
+
+
+def dump_bundle(bundle: Mapping[str, Any]) -> str:
+    return json.dumps(bundle, separators=(",", ":")) + "\n"
+
+
+def next_step(bundle: Mapping[str, Any], answers: Mapping[str, str]) -> dict[str, str | None]:
+    """Evaluate the bundle like STEP_FUNCTION_JS does in the browser."""
+    for rule, verdict, description, conditions in bundle["rules"]:
+        if all(answers.get(attr) == code for attr, code in conditions.items()):
+            return {"verdict": verdict, "rule": rule, "description": description, "attribute": None}
+    for attr_name in bundle["questions"]:
+        if attr_name not in answers:
+            return {"verdict": None, "rule": None, "description": None, "attribute": attr_name}
+    verdict, rule, description = bundle["unknown"]
+    return {"verdict": verdict, "rule": rule, "description": description, "attribute": None}
+
+
+def main() -> None:
+    """Print the bundle as it is inlined into the pages."""
+    print(dump_bundle(build_bundle()), end="")
+
+
+if __name__ == "__main__":
+    main()
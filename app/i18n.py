@@ -1,43 +1,225 @@
-"""Internationalization (i18n) support for the mushroom expert system."""
+"""Internationalization (i18n) support for the mushroom expert system.
+
+Translation files are reloaded when they change on disk, so wording can be
+fixed without a restart. This only covers text looked up on the server at
+request time: the HTTP API and the attribute catalog. The UI text is
+compiled into each locale's page (see static_t), so the pages keep the old
+wording until they are compiled again, i.e. until the app is restarted.
+Each load also checks the file for missing keys.
+
+Configuration via environment variables:
+    TRANSLATIONS_RELOAD_SECONDS: Minimum interval between checks of a file for
+        changes (default: 2, 0 checks on every load, negative disables reload)
+"""
 
 import json
+import os
+import time
 from pathlib import Path
-from typing import Any, Callable as CallableType
+from string import Formatter
+from typing import Any, Mapping
 
 import reflex as rx
 
+from .attributes import (
+    ATTRIBUTE_OPTION_CODES,
+    LocalizedAttribute,
+    build_attribute_catalog,
+    get_attribute_option_codes,
+)
+from .log import get_logger
+from .metrics import TRANSLATION_MISSING_KEYS, cache_lookup
+
+logger = get_logger("i18n")
+
 # Available languages
 AVAILABLE_LANGUAGES = {
     "en": "English",
     "tr": "Türkçe",
 }
 
+# Locale of the root page and of browsers that accept none of the above
+DEFAULT_LOCALE = "en"
+
+TRANSLATIONS_DIR = Path(__file__).parent.parent / "translations"
+TRANSLATIONS_RELOAD_SECONDS = float(os.getenv("TRANSLATIONS_RELOAD_SECONDS", "2"))
+
+
+class FormatTemplate:
+    """A translation with {placeholders}, parsed once when it is loaded."""
+
+    __slots__ = ("text", "fields")
+
+    def __init__(self, text: str, fields: frozenset[str]):
+        self.text = text
+        self.fields = fields
+
+    def __str__(self) -> str:
+        return self.text
+
+    def render(self, key: str, params: dict[str, Any]) -> str:
+        """Format parameters into the template, or return it as is on error."""
+        try:
+            return self.text.format_map(params)
+        except (KeyError, ValueError, IndexError) as e:
+            logger.warning("Error formatting translation '%s': %s", key, e)
+            return self.text
+
+
+# Translations of one locale, keyed by dotted path ("app.title")
+TranslationTable = dict[str, str | FormatTemplate]
+
 # Translation cache
-_translations_cache: dict[str, dict] = {}
+_translations_cache: dict[str, TranslationTable] = {}
 
+# Version (mtime and size) of the file each cached locale was read from, and
+# when that file was last checked for changes
+_file_versions: dict[str, tuple[int, int]] = {}
+_last_checked: dict[str, float] = {}
+
+# Translated attribute catalogs, built once per locale
+_catalog_cache: dict[str, Mapping[str, LocalizedAttribute]] = {}
+
+
+def compile_translation(text: str) -> str | FormatTemplate:
+    """Parse a translation once, turning it into a template if it has placeholders."""
+    try:
+        fields = frozenset(
+            name for _, name, _, _ in Formatter().parse(text) if name is not None
+        )
+    except ValueError as e:
+        logger.warning("Malformed translation %r: %s", text, e)
+        return text
+    return FormatTemplate(text, fields) if fields else text
 
-def load_translations(locale: str) -> dict:
-    """Load translations for a specific locale."""
-    if locale in _translations_cache:
-        return _translations_cache[locale]
 
-    translations_dir = Path(__file__).parent.parent / "translations"
-    translations_file = translations_dir / f"{locale}.json"
+def flatten_translations(data: dict, prefix: str = "") -> TranslationTable:
+    """Flatten nested translations into one table keyed by dotted path.
+
+    Example: {"app": {"title": "Hi"}} -> {"app.title": "Hi"}
+    """
+    table: TranslationTable = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            table.update(flatten_translations(value, f"{path}."))
+        elif value is not None:
+            table[path] = compile_translation(str(value))
+    return table
+
+
+def _translations_file(locale: str) -> Path:
+    """Path of a locale's translations JSON, falling back to English."""
+    translations_file = TRANSLATIONS_DIR / f"{locale}.json"
 
     if not translations_file.exists():
-        print(f"⚠️ Translation file not found: {translations_file}")
+        logger.warning("Translation file not found: %s", translations_file)
         # Fallback to English
-        locale = "en"
-        translations_file = translations_dir / "en.json"
+        translations_file = TRANSLATIONS_DIR / "en.json"
+    return translations_file
+
+
+def _file_version(path: Path) -> tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _read_translations_file(locale: str) -> dict:
+    """Read the nested translations JSON of a locale, falling back to English."""
+    with open(_translations_file(locale), "r", encoding="utf-8") as f:
+        return json.load(f)
+
 
+def find_missing_translations(translations: TranslationTable) -> list[str]:
+    """List the keys the app needs that a translation table lacks.
+
+    Every attribute needs a question and a description, and a label for each
+    code get_attribute_option_codes knows about.
+    """
+    missing = []
+    for attr_name in ATTRIBUTE_OPTION_CODES:
+        prefix = f"attributes.{attr_name}"
+        required = [f"{prefix}.question", f"{prefix}.description"]
+        required += [
+            f"{prefix}.options.{code}" for code in get_attribute_option_codes(attr_name)
+        ]
+        missing.extend(key for key in required if key not in translations)
+    return missing
+
+
+def find_unknown_options(translations: TranslationTable) -> list[str]:
+    """List option labels for codes get_attribute_option_codes does not know."""
+    unknown = []
+    for key in translations:
+        parts = key.split(".")
+        if len(parts) == 4 and parts[0] == "attributes" and parts[2] == "options":
+            if parts[3] not in get_attribute_option_codes(parts[1]):
+                unknown.append(key)
+    return unknown
+
+
+def _check_completeness(locale: str, translations: TranslationTable) -> None:
+    """Log and record key problems once per load, instead of at each lookup."""
+    missing = find_missing_translations(translations)
+    TRANSLATION_MISSING_KEYS.labels(locale).set(len(missing))
+    if missing:
+        logger.warning(
+            "Translations for %s are missing %d keys: %s",
+            locale,
+            len(missing),
+            ", ".join(missing),
+        )
+    unknown = find_unknown_options(translations)
+    if unknown:
+        logger.warning(
+            "Translations for %s label unknown option codes: %s", locale, ", ".join(unknown)
+        )
+
+
+def _is_stale(locale: str) -> bool:
+    """Check, at most once per reload interval, if a cached locale's file changed."""
+    if TRANSLATIONS_RELOAD_SECONDS < 0:
+        return False
+    now = time.monotonic()
+    if now - _last_checked.get(locale, 0.0) < TRANSLATIONS_RELOAD_SECONDS:
+        return False
+    _last_checked[locale] = now
     try:
+        return _file_version(_translations_file(locale)) != _file_versions.get(locale)
+    except OSError:
+        # Keep serving the cached table if the file is briefly unavailable
+        return False
+
+
+def load_translations(locale: str) -> TranslationTable:
+    """Load translations for a specific locale as a flat, precompiled table.
+
+    Tables are cached, and re-read when their file changes on disk.
+    """
+    if locale in _translations_cache and not _is_stale(locale):
+        cache_lookup("translations", hit=True)
+        return _translations_cache[locale]
+    cache_lookup("translations", hit=False)
+
+    try:
+        translations_file = _translations_file(locale)
+        version = _file_version(translations_file)
         with open(translations_file, "r", encoding="utf-8") as f:
-            translations = json.load(f)
-            _translations_cache[locale] = translations
-            return translations
+            translations = flatten_translations(json.load(f))
     except Exception as e:
-        print(f"✗ Error loading translations for {locale}: {e}")
-        return {}
+        logger.error("Error loading translations for %s: %s", locale, e)
+        # A broken edit keeps the last good table
+        return _translations_cache.get(locale, {})
+
+    if locale in _translations_cache:
+        logger.info("Reloaded translations for %s from %s", locale, translations_file)
+    _check_completeness(locale, translations)
+    _translations_cache[locale] = translations
+    _file_versions[locale] = version
+    _last_checked[locale] = time.monotonic()
+    # The attribute catalog is rebuilt from the new table on next use
+    _catalog_cache.pop(locale, None)
+    return translations
 
 
 def get_nested_value(data: dict, key_path: str, default: str = "") -> str:
@@ -59,60 +241,173 @@ def get_nested_value(data: dict, key_path: str, default: str = "") -> str:
     return str(value) if value is not None else default
 
 
+def translate(translations: TranslationTable, key: str, **params: Any) -> str:
+    """Translate a key against a loaded table, formatting in parameters.
+
+    Missing keys translate to themselves.
+    """
+    value = translations.get(key)
+    if value is None:
+        return key
+    if params and type(value) is FormatTemplate:
+        return value.render(key, params)
+    return str(value)
+
+
+def get_attribute_catalog(locale: str) -> Mapping[str, LocalizedAttribute]:
+    """Get the translated attribute catalog of a locale, building it on first use.
+
+    The catalog is read-only and shared by every session using the locale,
+    so looking up a question or its options costs a dictionary read.
+    """
+    # Reloading a changed translation file drops the locale's catalog
+    translations = load_translations(locale)
+    catalog = _catalog_cache.get(locale)
+    cache_lookup("attribute_catalog", hit=catalog is not None)
+    if catalog is None:
+        catalog = build_attribute_catalog(
+            lambda key, **params: translate(translations, key, **params)
+        )
+        _catalog_cache[locale] = catalog
+    return catalog
+
+
+def negotiate_locale(accept_language: str | None) -> str:
+    """Pick the best available locale for an Accept-Language header.
+
+    Languages are tried in order of preference (q value, then position), by
+    full tag and then by primary subtag, so "tr-TR" selects "tr". Anything
+    unparsable or unavailable falls back to DEFAULT_LOCALE.
+
+    Example: negotiate_locale("de-DE,tr;q=0.8,en;q=0.5") -> "tr"
+    """
+    preferences = []
+    for position, item in enumerate((accept_language or "").split(",")):
+        tag, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if tag and quality > 0:
+            preferences.append((-quality, position, tag.lower()))
+
+    for _, _, tag in sorted(preferences):
+        for candidate in (tag, tag.split("-")[0]):
+            if candidate in AVAILABLE_LANGUAGES:
+                return candidate
+    return DEFAULT_LOCALE
+
+
+def locale_route(locale: str) -> str:
+    """Route of the page compiled for a locale."""
+    return f"/{locale}"
+
+
+def static_t(locale: str, key: str, **params: Any) -> str:
+    """Translate a key at page compile time.
+
+    Parameters may be Reflex vars, which are formatted into the string so
+    the compiled page fills them in on the client.
+    """
+    return translate(load_translations(locale), key, **params)
+
+
 class I18nState(rx.State):
     """State for managing internationalization."""
 
-    locale: str = "en"
-    _translations: dict = {}
+    locale: str = DEFAULT_LOCALE
+
+    # Each locale has its own page with the UI text compiled in (see
+    # locale_route), so the locale here only drives server-side strings.
+    # The translation tables are shared module-level caches, not
+    # per-session state.
 
     def on_load_i18n(self):
-        """Load translations on app load."""
-        self._translations = load_translations(self.locale)
+        """Set the session's locale on page load.
+
+        A locale page fixes the locale. The root page negotiates it from the
+        browser's Accept-Language header, and redirects to that locale's page
+        when it is not the one the root page was compiled in. This runs after
+        the root page has painted; LocaleRedirectMiddleware in app.api does
+        the same redirect before that where the backend serves the pages.
+
+        Returns:
+            A redirect event, or None to stay on the page
+        """
+        redirect = None
+        page_locale = self.router.url.path.strip("/")
+        if page_locale in AVAILABLE_LANGUAGES:
+            locale = page_locale
+        else:
+            locale = negotiate_locale(self.router.headers.accept_language)
+            if locale != DEFAULT_LOCALE:
+                # Keep the query, which may carry answers
+                target = locale_route(locale)
+                if self.router.url.query:
+                    target = f"{target}?{self.router.url.query}"
+                redirect = rx.redirect(target)
+
+        # Only assign on change, so vars depending on the locale stay clean
+        if locale != self.locale:
+            self.locale = locale
+        load_translations(locale)
+        get_attribute_catalog(locale)
+        return redirect
 
     @rx.event
     def set_locale(self, new_locale: str):
-        """Change the current locale."""
+        """Change the current locale and go to its page."""
         if new_locale in AVAILABLE_LANGUAGES:
             self.locale = new_locale
-            self._translations = load_translations(new_locale)
-            print(f"✓ Locale changed to: {new_locale}")
+            load_translations(new_locale)
+            get_attribute_catalog(new_locale)
+            logger.debug("Locale changed to: %s", new_locale)
+            return rx.redirect(locale_route(new_locale))
 
-    def t(self, key: str, **params: Any) -> str:
-        """Translate a key with optional parameters.
 
-        Args:
-            key: Translation key in dot notation (e.g., "app.title")
-            **params: Parameters to format into the translation string
+def main(argv: list[str] | None = None) -> None:
+    """Micro-benchmark translate(): nested lookup per call vs the flattened table."""
+    import argparse
+    import timeit
 
-        Returns:
-            Translated string with parameters formatted in
+    parser = argparse.ArgumentParser(description="Benchmark translation lookups")
+    parser.add_argument("--locale", default="en")
+    parser.add_argument("--number", type=int, default=100_000)
+    args = parser.parse_args(argv)
 
-        Example:
-            t("question_form.progress", count=5) -> "Questions answered: 5"
-        """
-        translations = self._translations if self._translations else load_translations(self.locale)
-        translated = get_nested_value(translations, key, default=key)
+    nested = _read_translations_file(args.locale)
+    table = load_translations(args.locale)
 
-        # Format parameters if provided
+    def nested_t(key: str, **params: Any) -> str:
+        # The previous implementation: walk the nested JSON, then format
+        translated = get_nested_value(nested, key, default=key)
         if params:
             try:
                 translated = translated.format(**params)
-            except (KeyError, ValueError) as e:
-                print(f"⚠️ Error formatting translation '{key}': {e}")
-
+            except (KeyError, ValueError):
+                pass
         return translated
 
-    @rx.var
-    def get_available_languages(self) -> list[tuple[str, str]]:
-        """Get list of available languages as (code, name) tuples."""
-        return list(AVAILABLE_LANGUAGES.items())
+    cases = [
+        ("plain", "image_upload.section_title", {}),
+        ("deep", "attributes.stalk_color_below_ring.options.w", {}),
+        ("template", "question_form.progress", {"count": 5}),
+        ("missing", "app.no_such_key", {}),
+    ]
+    print(f"{'case':<10} {'before ns':>10} {'after ns':>10} {'speedup':>8}")
+    for name, key, params in cases:
+        assert nested_t(key, **params) == translate(table, key, **params)
+        before = timeit.timeit(lambda: nested_t(key, **params), number=args.number)
+        after = timeit.timeit(lambda: translate(table, key, **params), number=args.number)
+        print(
+            f"{name:<10} {before / args.number * 1e9:>10.0f} "
+            f"{after / args.number * 1e9:>10.0f} {before / after:>7.1f}x"
+        )
 
 
-def get_translator(state: rx.State) -> CallableType:
-    """Get the translation function for use in components.
-
-    This is a helper to make it easier to use translations in components.
-    """
-    if hasattr(state, 't'):
-        return state.t
-    return lambda key, **params: key
+if __name__ == "__main__":
+    main()
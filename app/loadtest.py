@@ -0,0 +1,244 @@
+"""Load test of the upload -> analyze -> apply flow.
+
+Drives concurrent virtual users through the same steps as the image upload
+handlers: spool the uploaded photo, pick the open attributes, estimate the
+color suggestions, analyze the photo with LLMVisionService (behind its
+cache, limiter and retries) and apply the suggestions to the rules engine.
+The vision backend is the local fake server, run in-process by default so
+no network or API quota is needed.
+
+The service's call limiter is permissive by default (one slot per user, no
+rate limit), so the run measures the backend rather than the token bucket;
+pass --rate/--concurrency, or --env-limits for the LLM_* configuration, to
+include the limiter. The report says which limits were used.
+
+Usage:
+    python -m app.loadtest [--flows 200] [--users 20] [--streaming] [--url URL]
+                           [--rate PER_MINUTE] [--concurrency N] [--env-limits]
+"""
+
+import asyncio
+import io
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from PIL import Image, ImageDraw
+
+from .engines.clips_engine import get_rules_engine
+from .services.color_extractor import extract_color_attributes
+from .services.llm_vision import LLMVisionService
+from .services.uploads import spool_upload
+
+
+@dataclass
+class LoadTestReport:
+    """Throughput and latency of a load test run."""
+
+    flows: int
+    users: int
+    duration_s: float
+    latencies_s: list[float] = field(repr=False)
+    outcomes: Counter
+
+    @property
+    def throughput(self) -> float:
+        """Completed flows per second."""
+        return self.flows / self.duration_s if self.duration_s else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Flow latency at quantile q (0-1), in seconds, by nearest rank."""
+        if not self.latencies_s:
+            return 0.0
+        ordered = sorted(self.latencies_s)
+        rank = max(0, min(len(ordered) - 1, round(q * len(ordered)) - 1))
+        return ordered[rank]
+
+
+def make_photos(count: int, seed: int = 0) -> list[bytes]:
+    """Generate distinct JPEG photos, so every flow misses the analysis cache."""
+    rng = random.Random(seed)
+    photos = []
+    for _ in range(count):
+        image = Image.new("RGB", (320, 240), tuple(rng.randrange(256) for _ in range(3)))
+        draw = ImageDraw.Draw(image)
+        for _ in range(4):
+            x, y = rng.randrange(280), rng.randrange(200)
+            draw.ellipse(
+                (x, y, x + 40, y + 40), fill=tuple(rng.randrange(256) for _ in range(3))
+            )
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=85)
+        photos.append(output.getvalue())
+    return photos
+
+
+class PhotoUpload:
+    """An uploaded photo, read in chunks like rx.UploadFile."""
+
+    def __init__(self, data: bytes):
+        self._stream = io.BytesIO(data)
+        self.size = len(data)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._stream.read(size)
+
+
+async def run_flow(service: LLMVisionService, photo: bytes, streaming: bool) -> str:
+    """Run one upload -> analyze -> apply flow and return how it ended."""
+    engine = get_rules_engine()
+    # Same steps as handle_image_upload
+    spooled, _ = await spool_upload(PhotoUpload(photo))
+    try:
+        open_attributes = engine.get_open_attributes({})
+        await asyncio.to_thread(extract_color_attributes, spooled, open_attributes)
+
+        if streaming:
+            suggestions = {}
+            async for attr, value in service.stream_mushroom_image(spooled, open_attributes):
+                suggestions[attr] = value
+        else:
+            suggestions = await service.analyze_mushroom_image(spooled, open_attributes)
+    finally:
+        spooled.close()
+
+    if not suggestions:
+        return "no_suggestions"
+    # Apply all model suggestions, then look for a verdict or the next question
+    if engine.check_rules(suggestions):
+        return "verdict"
+    engine.get_next_question(suggestions)
+    return "next_question"
+
+
+async def run_load_test(
+    service: LLMVisionService,
+    flows: int = 200,
+    users: int = 20,
+    streaming: bool = False,
+    seed: int = 0,
+) -> LoadTestReport:
+    """Run flows across concurrent virtual users and collect their latencies."""
+    photos = make_photos(flows, seed)
+    latencies: list[float] = []
+    outcomes: Counter = Counter()
+
+    async def user() -> None:
+        while photos:
+            photo = photos.pop()
+            start = time.perf_counter()
+            outcomes[await run_flow(service, photo, streaming)] += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(users)))
+    return LoadTestReport(
+        flows=flows,
+        users=users,
+        duration_s=time.perf_counter() - start,
+        latencies_s=latencies,
+        outcomes=outcomes,
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run a load test against the fake vision backend and print a report."""
+    import argparse
+
+    import httpx
+
+    from .metrics import LLM_REJECTIONS, LLM_REQUESTS, LLM_RETRIES
+    from .services.analysis_cache import AnalysisCache
+    from .services.fake_vision_server import FakeVisionConfig, create_app
+    from .services.llm_limits import LLMCallLimiter
+    from .services.vision_backends import HttpVisionBackend
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--flows", type=int, default=200)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--url", help="Use a running fake server instead of in-process")
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.4)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--rate", type=float, help="Limit model calls per minute (default: unlimited)"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, help="Concurrent model calls (default: --users)"
+    )
+    parser.add_argument(
+        "--env-limits", action="store_true", help="Use the LLM_* limiter configuration"
+    )
+    args = parser.parse_args(argv)
+
+    if args.url:
+        backend = HttpVisionBackend(url=args.url)
+    else:
+        config = FakeVisionConfig(
+            latency_ms=args.latency_ms,
+            latency_sigma=args.latency_sigma,
+            rate_limit_rate=args.rate_limit_rate,
+            error_rate=args.error_rate,
+            seed=args.seed,
+        )
+        backend = HttpVisionBackend(
+            url="http://fake-vision", transport=httpx.ASGITransport(app=create_app(config))
+        )
+
+    service = LLMVisionService(backend)
+    # Measure the model path, not the cache
+    service.cache = AnalysisCache(max_entries=0)
+    if not args.env_limits:
+        concurrency = args.concurrency or args.users
+        service.limiter = LLMCallLimiter(
+            max_concurrency=concurrency,
+            queue_timeout=service.limiter.queue_timeout,
+            # Far above anything the fake backend can serve
+            rate_per_minute=args.rate or 1e9,
+            burst=concurrency,
+            max_attempts=service.limiter.max_attempts,
+            deadline=service.limiter.deadline,
+        )
+    limiter = service.limiter
+    limits = f"{limiter.max_concurrency} concurrent, " + (
+        "no rate limit"
+        if not (args.env_limits or args.rate)
+        else f"{limiter.bucket.rate * 60:g}/min, burst {limiter.bucket.capacity:g}"
+    )
+
+    async def run() -> LoadTestReport:
+        try:
+            return await run_load_test(
+                service, args.flows, args.users, args.streaming, args.seed
+            )
+        finally:
+            await service.aclose()
+
+    report = asyncio.run(run())
+
+    print(f"{report.flows} flows, {report.users} users, {report.duration_s:.2f} s")
+    print(f"Limiter ({'LLM_* environment' if args.env_limits else 'load test'}): {limits}")
+    print(f"Throughput: {report.throughput:.1f} flows/s")
+    print(
+        "Latency: "
+        f"p50 {report.percentile(0.50) * 1000:.0f} ms, "
+        f"p95 {report.percentile(0.95) * 1000:.0f} ms, "
+        f"p99 {report.percentile(0.99) * 1000:.0f} ms"
+    )
+    print("Flow outcomes:", dict(report.outcomes))
+    print(
+        "LLM outcomes:",
+        {values[0]: int(count) for values, count in LLM_REQUESTS.snapshot().items()},
+    )
+    print(
+        f"Retries: {int(LLM_RETRIES.get())}, rejections:",
+        {values[0]: int(count) for values, count in LLM_REJECTIONS.snapshot().items()},
+    )
+
+
+if __name__ == "__main__":
+    main()
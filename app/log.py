@@ -0,0 +1,128 @@
+"""Structured logging for the mushroom expert system.
+
+Each subsystem gets its own logger under the ``app`` namespace (``app.engine``,
+``app.state``, ``app.llm``, ``app.i18n``). Records are handed to a queue and
+written by a background thread, so request handlers never block on stdout.
+
+Configuration via environment variables:
+    LOG_LEVEL: Minimum level for app loggers (default: INFO)
+    LOG_FORMAT: "json" for one JSON object per line, "text" otherwise (default: json)
+    LOG_DEBUG_SAMPLE_RATE: Fraction of DEBUG records to keep, 0.0-1.0 (default: 1.0)
+
+Debug traces should use lazy %-style arguments (``logger.debug("x=%s", x)``)
+so they cost a single level check when DEBUG is disabled.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+
+ROOT_LOGGER_NAME = "app"
+
+# Attributes every LogRecord has; anything else was passed via ``extra``
+_RESERVED_ATTRS = frozenset(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__.keys()
+) | {"message", "asctime", "taskName"}
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def get_logger(subsystem: str) -> logging.Logger:
+    """Get the logger for a subsystem (e.g. "engine", "state", "llm")."""
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{subsystem}")
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON including any ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep only a fraction of DEBUG records; other levels always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = min(max(rate, 0.0), 1.0)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+def configure_logging(
+    level: str | None = None,
+    fmt: str | None = None,
+    debug_sample_rate: float | None = None,
+) -> None:
+    """Configure the ``app`` logger hierarchy. Safe to call more than once.
+
+    Args:
+        level: Log level name; defaults to LOG_LEVEL or INFO
+        fmt: "json" or "text"; defaults to LOG_FORMAT or json
+        debug_sample_rate: Fraction of DEBUG records to keep; defaults to
+            LOG_DEBUG_SAMPLE_RATE or 1.0
+    """
+    global _listener
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = fmt or os.getenv("LOG_FORMAT", "json")
+    if debug_sample_rate is None:
+        debug_sample_rate = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    root.setLevel(level)
+    root.propagate = False
+
+    if _listener is not None:
+        _listener.stop()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if fmt == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        )
+
+    # Handlers run on the listener thread; the caller only enqueues the record
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(DebugSamplingFilter(debug_sample_rate))
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the background writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
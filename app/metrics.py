@@ -0,0 +1,444 @@
+"""In-process metrics for the mushroom expert system.
+
+A small Prometheus-compatible metrics library: counters, gauges and
+fixed-bucket histograms, rendered in the Prometheus text exposition format
+by the ``/metrics`` endpoint.
+
+Recording a sample is a dict-free, lock-free operation on a pre-bound child
+(``HISTOGRAM.labels("x").observe(v)``), so instrumentation stays well under a
+microsecond. Updates are not synchronized across threads; under contention a
+sample may occasionally be lost, which is acceptable for monitoring.
+"""
+
+import asyncio
+import functools
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+# Latency buckets in seconds, from 100µs up to 30s (LLM calls)
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    """Base class for metrics with an optional fixed set of label names."""
+
+    type_name = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        registry: "Registry | None" = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Get the child metric for a combination of label values.
+
+        Bind the child once at module level on hot paths to skip the lookup.
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {values}"
+            )
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def collect(self) -> list[str]:
+        """Render this metric in the Prometheus text format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for values, child in list(self._children.items()):
+            lines.extend(self._collect_child(values, child))
+        return lines
+
+    def _collect_child(self, values: tuple[str, ...], child) -> list[str]:
+        labels = _format_labels(self.labelnames, values)
+        return [f"{self.name}{labels} {_format_value(child.get())}"]
+
+
+class _CounterChild:
+    __slots__ = ("_value",)
+
+    def __init__(self):
+        self._value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._value += amount
+
+    def get(self) -> float:
+        return self._value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count of events."""
+
+    type_name = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def get(self) -> float:
+        return self._default.get()
+
+    def snapshot(self) -> dict[tuple[str, ...], float]:
+        """Current count of every label combination seen so far."""
+        return {values: child.get() for values, child in list(self._children.items())}
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "_function")
+
+    def __init__(self):
+        self._value = 0.0
+        self._function: Callable[[], float] | None = None
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the value at scrape time instead of storing it."""
+        self._function = function
+
+    def get(self) -> float:
+        if self._function is not None:
+            return float(self._function())
+        return self._value
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, such as pool depth or a hit ratio."""
+
+    type_name = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._default.set_function(function)
+
+    def get(self) -> float:
+        return self._default.get()
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_counts", "_sum")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self._bounds = bounds
+        # One slot per bucket plus the +Inf overflow bucket
+        self._counts = [0] * (len(bounds) + 1)
+        self._sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect_left(self._bounds, value)] += 1
+        self._sum += value
+
+    def time(self) -> "_Timer":
+        """Time a block of code: ``with HISTOGRAM.labels("x").time(): ...``."""
+        return _Timer(self)
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def buckets(self) -> list[tuple[float, int]]:
+        """Get cumulative (upper bound, count) pairs, ending with +Inf."""
+        cumulative = 0
+        result = []
+        for bound, count in zip((*self._bounds, math.inf), self._counts):
+            cumulative += count
+            result.append((bound, cumulative))
+        return result
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation within buckets."""
+        total = self.count
+        if total == 0:
+            return 0.0
+        rank = q * total
+        lower_bound, lower_count = 0.0, 0
+        for bound, cumulative in self.buckets():
+            if cumulative >= rank:
+                if math.isinf(bound):
+                    return lower_bound
+                in_bucket = cumulative - lower_count
+                fraction = (rank - lower_count) / in_bucket if in_bucket else 0.0
+                return lower_bound + (bound - lower_bound) * fraction
+            lower_bound, lower_count = bound, cumulative
+        return lower_bound
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: _HistogramChild):
+        self._child = child
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._child.observe(time.perf_counter() - self._start)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+        registry: "Registry | None" = None,
+    ):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def time(self) -> _Timer:
+        return self._default.time()
+
+    def _collect_child(self, values: tuple[str, ...], child) -> list[str]:
+        names = (*self.labelnames, "le")
+        lines = [
+            f"{self.name}_bucket{_format_labels(names, (*values, _format_value(bound)))} "
+            f"{cumulative}"
+            for bound, cumulative in child.buckets()
+        ]
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics exposed together."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> _Metric | None:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def timed(child: _HistogramChild) -> Callable:
+    """Decorator recording the wall time of each call into a histogram child.
+
+    Works for both regular and ``async`` functions and preserves the wrapped
+    signature, so it can sit underneath ``@rx.event``.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    child.observe(time.perf_counter() - start)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+# ============================================================================
+# Application metrics
+# ============================================================================
+
+ENGINE_LATENCY = Histogram(
+    "mushroom_engine_seconds",
+    "Time spent in rules engine calls.",
+    ["operation"],
+)
+
+HANDLER_LATENCY = Histogram(
+    "mushroom_handler_seconds",
+    "Time spent in MushroomExpertState event handlers.",
+    ["handler"],
+)
+
+LLM_LATENCY = Histogram(
+    "mushroom_llm_seconds",
+    "Time spent in LLM vision calls.",
+    ["operation"],
+)
+
+LLM_REQUESTS = Counter(
+    "mushroom_llm_requests_total",
+    "LLM vision analyses by outcome.",
+    ["outcome"],
+)
+
+LLM_INFLIGHT = Gauge(
+    "mushroom_llm_inflight",
+    "LLM vision analyses currently in flight.",
+)
+
+LLM_QUEUE_DEPTH = Gauge(
+    "mushroom_llm_queue_depth",
+    "LLM vision calls waiting for a concurrency slot.",
+)
+
+LLM_REJECTIONS = Counter(
+    "mushroom_llm_rejections_total",
+    "LLM vision calls shed under load, by reason.",
+    ["reason"],
+)
+
+LLM_RETRIES = Counter(
+    "mushroom_llm_retries_total",
+    "LLM vision call attempts retried after a transient error.",
+)
+
+IMAGE_PREPROCESS_PENDING = Gauge(
+    "mushroom_image_preprocess_pending",
+    "Images queued or running in the preprocessing pool.",
+)
+
+TRANSLATION_MISSING_KEYS = Gauge(
+    "mushroom_translation_missing_keys",
+    "Required translation keys missing from the loaded file, by locale.",
+    ["locale"],
+)
+
+CACHE_LOOKUPS = Counter(
+    "mushroom_cache_lookups_total",
+    "Cache lookups by cache and result (hit or miss).",
+    ["cache", "result"],
+)
+
+CACHE_HIT_RATIO = Gauge(
+    "mushroom_cache_hit_ratio",
+    "Fraction of cache lookups that were hits since startup.",
+    ["cache"],
+)
+
+
+def cache_lookup(cache: str, hit: bool) -> None:
+    """Record a cache lookup, registering the hit ratio gauge on first use."""
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+    if (cache,) not in CACHE_HIT_RATIO._children:
+        hits = CACHE_LOOKUPS.labels(cache, "hit")
+        misses = CACHE_LOOKUPS.labels(cache, "miss")
+        CACHE_HIT_RATIO.labels(cache).set_function(
+            lambda: hits.get() / ((hits.get() + misses.get()) or 1)
+        )
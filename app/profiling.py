@@ -0,0 +1,147 @@
+"""On-demand cProfile hooks for individual requests.
+
+Profiling is opt-in and off by default. When it is off at import time, the
+``profiled`` decorator returns the function unchanged, so there is no
+per-call overhead at all.
+
+Configuration via environment variables:
+    PROFILE_REQUESTS: Profile every wrapped event handler and engine call (default: off)
+    PROFILE_QUERY_FLAG: Allow a session to opt in with ``?profile=1`` in the page URL
+        (default: off)
+    PROFILE_DIR: Directory for the dumped .prof files (default: .profiles)
+    PROFILE_MIN_MS: Only keep profiles of calls at least this slow (default: 0)
+
+Dumped files are named ``<timestamp>-<event>-<elapsed>ms.prof`` and can be
+inspected with ``python -m pstats`` or snakeviz.
+
+Note that profiling an ``async`` handler also captures whatever else the event
+loop runs while the handler awaits.
+"""
+
+import asyncio
+import cProfile
+import contextvars
+import functools
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from .log import get_logger
+
+logger = get_logger("profiling")
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").lower() in ("1", "true", "yes", "on")
+
+
+PROFILE_REQUESTS = _env_flag("PROFILE_REQUESTS")
+PROFILE_QUERY_FLAG = _env_flag("PROFILE_QUERY_FLAG")
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", ".profiles"))
+PROFILE_MIN_MS = float(os.getenv("PROFILE_MIN_MS", "0"))
+
+# Name of the backend var a state sets when its session opted in via the URL
+SESSION_FLAG_ATTR = "_profile_requests"
+
+# Only one cProfile can be active per thread; nested calls run unprofiled
+_active: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "profiling_active", default=False
+)
+
+
+def profiling_available() -> bool:
+    """Check if any profiling mode is switched on for this process."""
+    return PROFILE_REQUESTS or PROFILE_QUERY_FLAG
+
+
+def session_requested_profiling(query_parameters: Any) -> bool:
+    """Check if a page URL's query parameters opt the session into profiling."""
+    if not PROFILE_QUERY_FLAG:
+        return False
+    return str(query_parameters.get("profile", "")).lower() in ("1", "true", "yes")
+
+
+def _should_profile(args: tuple) -> bool:
+    if _active.get():
+        return False
+    if PROFILE_REQUESTS:
+        return True
+    # Event handlers receive the state as their first argument
+    return bool(args) and bool(getattr(args[0], SESSION_FLAG_ATTR, False))
+
+
+def _start(args: tuple) -> cProfile.Profile | None:
+    if not _should_profile(args):
+        return None
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Another task on this thread is already being profiled
+        return None
+    return profile
+
+
+def _finish(profile: cProfile.Profile, name: str, start: float) -> None:
+    profile.disable()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if elapsed_ms < PROFILE_MIN_MS:
+        return
+    try:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        path = PROFILE_DIR / f"{timestamp}-{name}-{elapsed_ms:.1f}ms.prof"
+        profile.dump_stats(path)
+        logger.info("Wrote profile", extra={"event": name, "path": str(path)})
+    except OSError as e:
+        logger.warning("Could not write profile for %s: %s", name, e)
+
+
+def profiled(name: str) -> Callable:
+    """Decorator profiling each call with cProfile when profiling is enabled.
+
+    Args:
+        name: Event name used in the dumped file name
+
+    Returns:
+        The decorator. It is a no-op when profiling is disabled at import time.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if not profiling_available():
+            return func
+
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                profile = _start(args)
+                if profile is None:
+                    return await func(*args, **kwargs)
+                token = _active.set(True)
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _active.reset(token)
+                    _finish(profile, name, start)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = _start(args)
+            if profile is None:
+                return func(*args, **kwargs)
+            token = _active.set(True)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _active.reset(token)
+                _finish(profile, name, start)
+
+        return wrapper
+
+    return decorator
@@ -1,5 +1,20 @@
-"""Services module for external integrations."""
+"""Services module for external integrations.
 
-from .llm_service import LLMService, is_llm_available
+Exports are resolved lazily so importing the package does not pull in the
+LLM stack until it is actually used.
+"""
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .llm_service import LLMService, is_llm_available
 
 __all__ = ["LLMService", "is_llm_available"]
+
+
+def __getattr__(name: str):
+    if name in __all__:
+        from . import llm_service
+
+        return getattr(llm_service, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
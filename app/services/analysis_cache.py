@@ -0,0 +1,217 @@
+"""Content-addressed cache for LLM image analysis results.
+
+Results are keyed on a hash of the image bytes together with the model name
+and prompt version, so the same photo is only sent to the model once. A
+bounded in-memory LRU tier answers repeat uploads instantly; an optional
+on-disk tier survives restarts and is shared between workers on one host.
+
+Configuration via environment variables:
+    LLM_CACHE_SIZE: Entries kept in memory, 0 disables the cache (default: 256)
+    LLM_CACHE_DIR: Directory for the on-disk tier; unset disables it
+    LLM_CACHE_TTL_SECONDS: Lifetime of a cached result (default: 604800, 7 days)
+    LLM_CACHE_MAX_DISK_MB: Size cap of the on-disk tier (default: 100)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from ..log import get_logger
+from ..metrics import cache_lookup
+
+logger = get_logger("llm")
+
+CACHE_NAME = "llm_analysis"
+
+
+def make_cache_key(image_data: bytes, model: str, prompt_version: str) -> str:
+    """Build the cache key for an image analyzed by a model with a prompt."""
+    digest = hashlib.sha256()
+    digest.update(model.encode())
+    digest.update(b"\0")
+    digest.update(prompt_version.encode())
+    digest.update(b"\0")
+    digest.update(image_data)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """Two-tier (memory LRU + optional disk) cache of attribute suggestions."""
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 7 * 24 * 3600,
+        disk_dir: str | Path | None = None,
+        max_disk_bytes: int = 100 * 1024 * 1024,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        # key -> (expires_at, suggestions), least recently used first
+        self._memory: OrderedDict[str, tuple[float, dict[str, str]]] = OrderedDict()
+        # Running size of the disk tier, seeded by one scan on the first write,
+        # so the directory is only scanned again once over the cap
+        self._disk_bytes: int | None = None
+        self._disk_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "AnalysisCache":
+        """Create a cache configured from LLM_CACHE_* environment variables."""
+        return cls(
+            max_entries=int(os.getenv("LLM_CACHE_SIZE", "256")),
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+            disk_dir=os.getenv("LLM_CACHE_DIR") or None,
+            max_disk_bytes=int(float(os.getenv("LLM_CACHE_MAX_DISK_MB", "100")) * 1024 * 1024),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    async def get(self, key: str) -> dict[str, str] | None:
+        """Look up cached suggestions, checking memory first and then disk."""
+        if not self.enabled:
+            return None
+
+        suggestions = self._get_memory(key)
+        if suggestions is None and self.disk_dir is not None:
+            suggestions = await asyncio.to_thread(self._get_disk, key)
+            if suggestions is not None:
+                self._set_memory(key, suggestions)
+
+        cache_lookup(CACHE_NAME, hit=suggestions is not None)
+        return dict(suggestions) if suggestions is not None else None
+
+    async def set(self, key: str, suggestions: dict[str, str]) -> None:
+        """Store suggestions in memory and, if configured, on disk."""
+        if not self.enabled:
+            return
+        self._set_memory(key, dict(suggestions))
+        if self.disk_dir is not None:
+            await asyncio.to_thread(self._set_disk, key, dict(suggestions))
+
+    def clear(self) -> None:
+        """Drop all in-memory entries."""
+        self._memory.clear()
+
+    # ------------------------------------------------------------------
+    # Memory tier
+    # ------------------------------------------------------------------
+
+    def _get_memory(self, key: str) -> dict[str, str] | None:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, suggestions = entry
+        if expires_at < time.time():
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return suggestions
+
+    def _set_memory(self, key: str, suggestions: dict[str, str]) -> None:
+        self._memory[key] = (time.time() + self.ttl_seconds, suggestions)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Disk tier
+    # ------------------------------------------------------------------
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    def _get_disk(self, key: str) -> dict[str, str] | None:
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Unreadable analysis cache entry %s: %s", path, e)
+            return None
+
+        if entry.get("created", 0) + self.ttl_seconds < time.time():
+            self._unlink_disk(path)
+            return None
+        return entry.get("suggestions")
+
+    def _set_disk(self, key: str, suggestions: dict[str, str]) -> None:
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so readers never see partial JSON
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"created": time.time(), "suggestions": suggestions}, f)
+            replaced = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)
+            with self._disk_lock:
+                if self._disk_bytes is None:
+                    self._disk_bytes = self._scan_disk()
+                else:
+                    self._disk_bytes += path.stat().st_size - replaced
+                if self._disk_bytes > self.max_disk_bytes:
+                    self._evict_disk()
+        except OSError as e:
+            logger.warning("Could not write analysis cache entry %s: %s", path, e)
+
+    def _unlink_disk(self, path: Path) -> None:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return
+        with self._disk_lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes -= size
+
+    def _scan_disk(self) -> int:
+        """Total size of the disk tier's entries."""
+        total = 0
+        for path in self.disk_dir.glob("*/*.json"):
+            try:
+                total += path.stat().st_size
+            except FileNotFoundError:
+                continue
+        return total
+
+    def _evict_disk(self) -> None:
+        """Delete expired entries, then the oldest ones until under the size cap.
+
+        Rescans the directory, which also corrects the running size for
+        entries written or deleted by other workers. Called with the disk
+        lock held.
+        """
+        entries = []
+        total = 0
+        now = time.time()
+        for path in self.disk_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime + self.ttl_seconds < now:
+                path.unlink(missing_ok=True)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self._disk_bytes = total
@@ -0,0 +1,114 @@
+"""Stateless classification of answer sets.
+
+The same steps the UI runs after each answer (check the rules, otherwise pick
+the next question, otherwise give up) as pure functions of the answers, so
+they can be served over HTTP without a session.
+
+An answer set also has a canonical query string form, one parameter per
+answered attribute in name order (``odor=n&stalk_root=e``), so equal answer
+sets always map to the same URL and can be cached under it.
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+from urllib.parse import urlencode
+
+from ..attributes import ATTRIBUTE_OPTION_CODES, get_attribute_option_codes
+from ..engines.clips_engine import get_rules_engine
+
+# Verdict when every useful question is answered and no rule matched
+UNKNOWN_VERDICT = "unknown"
+UNKNOWN_RULE = "No matching rule found"
+UNKNOWN_DESCRIPTION = "Unable to classify this mushroom with the available rules."
+
+
+class InvalidAnswersError(ValueError):
+    """Raised when answers name unknown attributes or option codes."""
+
+    def __init__(self, problems: list[str]):
+        super().__init__("; ".join(problems))
+        self.problems = problems
+
+
+@dataclass(frozen=True)
+class Classification:
+    """Outcome of classifying one set of answers.
+
+    Either ``verdict`` is set (with the matching rule), or ``next_attribute``
+    names the question to ask next.
+    """
+
+    verdict: str | None
+    rule: str | None
+    description: str | None
+    next_attribute: str | None
+
+    @property
+    def is_complete(self) -> bool:
+        return self.verdict is not None
+
+
+def validate_answers(answers: Mapping[str, str]) -> dict[str, str]:
+    """Check that every answer is a known attribute with one of its option codes.
+
+    Returns:
+        The answers as a plain dict
+
+    Raises:
+        InvalidAnswersError: Listing every invalid attribute or code
+    """
+    problems = []
+    for attr_name, code in answers.items():
+        if attr_name not in ATTRIBUTE_OPTION_CODES:
+            problems.append(f"unknown attribute {attr_name!r}")
+        elif code not in get_attribute_option_codes(attr_name):
+            problems.append(f"invalid code {code!r} for {attr_name}")
+    if problems:
+        raise InvalidAnswersError(problems)
+    return dict(answers)
+
+
+def answers_query(answers: Mapping[str, str]) -> str:
+    """Encode answers as their canonical query string."""
+    return urlencode(sorted(answers.items()))
+
+
+def answers_from_query(params: Iterable[tuple[str, str]]) -> dict[str, str]:
+    """Read answers from query parameters.
+
+    Raises:
+        InvalidAnswersError: If an attribute is repeated, unknown or has an
+            invalid code
+    """
+    answers: dict[str, str] = {}
+    for attr_name, code in params:
+        if attr_name in answers:
+            raise InvalidAnswersError([f"attribute {attr_name!r} given more than once"])
+        answers[attr_name] = code
+    return validate_answers(answers)
+
+
+def _outcome(
+    answers: dict[str, str], match: tuple[str, str, str] | None
+) -> Classification:
+    if match is not None:
+        target, rule_name, description = match
+        return Classification(target, rule_name, description, None)
+
+    next_attribute = get_rules_engine().get_next_question(answers)
+    if next_attribute is not None:
+        return Classification(None, None, None, next_attribute)
+    return Classification(UNKNOWN_VERDICT, UNKNOWN_RULE, UNKNOWN_DESCRIPTION, None)
+
+
+def classify(answers: Mapping[str, str]) -> Classification:
+    """Classify one (possibly partial) set of validated answers."""
+    answers = dict(answers)
+    return _outcome(answers, get_rules_engine().check_rules(answers))
+
+
+def classify_batch(cases: list[Mapping[str, str]]) -> list[Classification]:
+    """Classify many sets of validated answers with one engine run."""
+    cases = [dict(answers) for answers in cases]
+    matches = get_rules_engine().check_rules_batch(cases)
+    return [_outcome(answers, match) for answers, match in zip(cases, matches)]
@@ -0,0 +1,198 @@
+"""Offline color attribute extractor.
+
+Estimates cap_color, gill_color and stalk_color_* from a photo in a few
+milliseconds, without any model call. Each attribute is read from a fixed
+region of a typical side-on mushroom photo (cap on top, gills under it, stalk
+below), the region's dominant color is found by median-cut quantization, and
+that color is mapped to the nearest attribute option in CIELAB space.
+
+The fixed regions only fit photos framed that way, and the accuracy on real
+photos has not been measured, so the UI lists these as estimates apart from
+the model's suggestions: each one is applied on its own, never by "Apply
+all", and the model's suggestion for an attribute replaces the estimate.
+
+Usage (speed and agreement on a directory of photos labelled in its
+labels.json as {"photo.jpg": {"cap_color": "n", ...}}; by default the
+synthetic renders in tests/fixtures/mushroom_colors, which vary framing and
+lighting but are no substitute for real photos):
+    python -m app.services.color_extractor [photos_dir]
+"""
+
+import io
+import json
+import math
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from ..attributes import ATTRIBUTES
+from .image_preprocessing import ImageSource
+
+# Approximate sRGB of each color option, shared by all color attributes
+COLOR_REFERENCES: dict[str, tuple[int, int, int]] = {
+    "Black": (25, 25, 25),
+    "Brown": (120, 72, 40),
+    "Buff": (222, 200, 160),
+    "Chocolate": (80, 45, 25),
+    "Cinnamon": (170, 100, 50),
+    "Gray": (128, 128, 128),
+    "Green": (80, 130, 60),
+    "Orange": (230, 130, 40),
+    "Pink": (235, 160, 170),
+    "Purple": (120, 60, 130),
+    "Red": (190, 40, 40),
+    "White": (240, 240, 235),
+    "Yellow": (230, 200, 50),
+}
+
+# Region of the photo each attribute is read from, as (left, top, right, bottom)
+# fractions of the width and height
+REGIONS: dict[str, tuple[float, float, float, float]] = {
+    "cap_color": (0.25, 0.10, 0.75, 0.30),
+    "gill_color": (0.30, 0.38, 0.70, 0.46),
+    "stalk_color_above_ring": (0.45, 0.52, 0.55, 0.66),
+    "stalk_color_below_ring": (0.45, 0.76, 0.55, 0.92),
+}
+
+# Colors further than this (CIE76 delta E) from every option are not suggested
+MAX_COLOR_DISTANCE = 30.0
+
+# Side of the thumbnail the regions are cut from
+_ANALYSIS_SIZE = 128
+
+FIXTURES_DIR = Path(__file__).parent.parent.parent / "tests" / "fixtures" / "mushroom_colors"
+
+
+def _srgb_to_lab(rgb: tuple[int, int, int]) -> tuple[float, float, float]:
+    """Convert an sRGB color to CIELAB (D65)."""
+
+    def linear(channel: int) -> float:
+        c = channel / 255
+        return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+    r, g, b = (linear(c) for c in rgb)
+    x = (0.4124 * r + 0.3576 * g + 0.1805 * b) / 0.95047
+    y = 0.2126 * r + 0.7152 * g + 0.0722 * b
+    z = (0.0193 * r + 0.1192 * g + 0.9505 * b) / 1.08883
+
+    def f(t: float) -> float:
+        return t ** (1 / 3) if t > 216 / 24389 else (24389 / 27 * t + 16) / 116
+
+    fx, fy, fz = f(x), f(y), f(z)
+    return 116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)
+
+
+@lru_cache(maxsize=None)
+def _option_colors(attr_name: str) -> tuple[tuple[str, tuple[float, float, float]], ...]:
+    """Attribute codes paired with the CIELAB color of their option."""
+    return tuple(
+        (code, _srgb_to_lab(COLOR_REFERENCES[label]))
+        for code, label in ATTRIBUTES[attr_name]["options"]
+        if label in COLOR_REFERENCES
+    )
+
+
+def nearest_code(attr_name: str, rgb: tuple[int, int, int]) -> str | None:
+    """Map a color to the closest option code of an attribute, if close enough."""
+    lab = _srgb_to_lab(rgb)
+    best_code, best_distance = None, MAX_COLOR_DISTANCE
+    for code, option_lab in _option_colors(attr_name):
+        distance = math.dist(lab, option_lab)
+        if distance < best_distance:
+            best_code, best_distance = code, distance
+    return best_code
+
+
+def dominant_color(image: Image.Image) -> tuple[int, int, int]:
+    """Find the most common color of an RGB image after median-cut quantization."""
+    quantized = image.quantize(colors=4, method=Image.Quantize.MEDIANCUT)
+    count, index = max(quantized.getcolors())
+    palette = quantized.getpalette()
+    return tuple(palette[index * 3 : index * 3 + 3])
+
+
+def extract_color_attributes(
+    image_data: ImageSource, attributes: Iterable[str] | None = None
+) -> dict[str, str]:
+    """Suggest color attribute codes for a mushroom photo.
+
+    Args:
+        image_data: The photo as bytes or as a file holding them
+        attributes: Only look at these attributes (default: every color attribute)
+
+    Returns:
+        Dictionary mapping color attributes to suggested codes; attributes
+        whose region color is not close to any option are left out
+    """
+    wanted = REGIONS.keys() if attributes is None else REGIONS.keys() & set(attributes)
+    if not wanted:
+        return {}
+
+    try:
+        if isinstance(image_data, bytes):
+            image_data = io.BytesIO(image_data)
+        else:
+            image_data.seek(0)
+        image = Image.open(image_data)
+        # Decode at reduced scale where the format allows it
+        image.draft("RGB", (_ANALYSIS_SIZE * 2, _ANALYSIS_SIZE * 2))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        return {}
+    image.thumbnail((_ANALYSIS_SIZE, _ANALYSIS_SIZE))
+
+    suggestions = {}
+    width, height = image.size
+    for attr_name, (left, top, right, bottom) in REGIONS.items():
+        if attr_name not in wanted:
+            continue
+        region = image.crop(
+            (int(left * width), int(top * height), int(right * width), int(bottom * height))
+        )
+        code = nearest_code(attr_name, dominant_color(region))
+        if code is not None:
+            suggestions[attr_name] = code
+    return suggestions
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Benchmark speed and agreement of the extractor on labelled photos."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the color extractor")
+    parser.add_argument(
+        "photos",
+        nargs="?",
+        default=str(FIXTURES_DIR),
+        help="Directory of photos with a labels.json (default: the synthetic fixtures)",
+    )
+    args = parser.parse_args(argv)
+
+    photos = Path(args.photos)
+    labels: dict[str, dict[str, str]] = json.loads((photos / "labels.json").read_text())
+
+    agree: dict[str, int] = dict.fromkeys(REGIONS, 0)
+    suggested: dict[str, int] = dict.fromkeys(REGIONS, 0)
+    elapsed = 0.0
+    for filename, expected in labels.items():
+        data = (photos / filename).read_bytes()
+        start = time.perf_counter()
+        suggestions = extract_color_attributes(data)
+        elapsed += time.perf_counter() - start
+        for attr_name in REGIONS:
+            if attr_name in suggestions:
+                suggested[attr_name] += 1
+                agree[attr_name] += suggestions[attr_name] == expected.get(attr_name)
+
+    print(f"{len(labels)} images, {elapsed / len(labels) * 1000:.2f} ms per image\n")
+    print(f"{'attribute':<24} {'suggested':>9} {'agreement':>9}")
+    for attr_name in REGIONS:
+        rate = agree[attr_name] / suggested[attr_name] if suggested[attr_name] else 0.0
+        print(f"{attr_name:<24} {suggested[attr_name]:>9} {rate:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
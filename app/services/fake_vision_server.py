@@ -0,0 +1,131 @@
+"""Local stand-in for the vision model, for load tests and offline CI.
+
+Speaks the protocol of HttpVisionBackend and answers with MushroomAttributes-
+shaped JSON. Answers are derived from a hash of the image, so the same photo
+always gets the same suggestions, while latency and failures are drawn from
+configurable distributions:
+
+- latency: log-normal around a median, with a spread (sigma)
+- rate_limit_rate: fraction of requests answered with HTTP 429
+- error_rate: fraction of requests answered with HTTP 500
+- hang_rate: fraction of requests that stall for hang_seconds (client timeouts)
+
+Usage:
+    python -m app.services.fake_vision_server [--port 8765] [--latency-ms 800] ...
+
+Then point the app at it with LLM_VISION_BACKEND=http.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import random
+from dataclasses import dataclass, fields
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from ..attributes import ATTRIBUTES
+
+
+@dataclass
+class FakeVisionConfig:
+    """Latency and failure distributions of the fake vision server."""
+
+    latency_ms: float = 800.0
+    latency_sigma: float = 0.4
+    rate_limit_rate: float = 0.0
+    error_rate: float = 0.0
+    hang_rate: float = 0.0
+    hang_seconds: float = 120.0
+    # Share of the requested attributes the fake "recognizes" in a photo
+    fill_rate: float = 0.6
+    # Pause between streamed chunks
+    chunk_delay_ms: float = 20.0
+    seed: int | None = None
+
+
+def fake_suggestions(
+    image_data: bytes, attributes: list[str], fill_rate: float = 0.6
+) -> dict[str, str | None]:
+    """Pick deterministic, valid attribute codes for an image."""
+    rng = random.Random(hashlib.sha256(image_data).digest())
+    suggestions: dict[str, str | None] = {}
+    for attr in attributes:
+        options = ATTRIBUTES.get(attr, {}).get("options", [])
+        if options and rng.random() < fill_rate:
+            suggestions[attr] = rng.choice(options)[0]
+        else:
+            suggestions[attr] = None
+    return suggestions
+
+
+def create_app(config: FakeVisionConfig | None = None) -> Starlette:
+    """Create the fake vision server as an ASGI app."""
+    config = config or FakeVisionConfig()
+    rng = random.Random(config.seed)
+
+    async def analyze(request: Request) -> Response:
+        payload = await request.json()
+
+        roll = rng.random()
+        if roll < config.rate_limit_rate:
+            return JSONResponse({"error": "rate limited"}, status_code=429)
+        roll -= config.rate_limit_rate
+        if roll < config.error_rate:
+            return JSONResponse({"error": "internal error"}, status_code=500)
+        roll -= config.error_rate
+        if roll < config.hang_rate:
+            await asyncio.sleep(config.hang_seconds)
+
+        latency = config.latency_ms / 1000 * rng.lognormvariate(0, config.latency_sigma)
+        suggestions = fake_suggestions(
+            base64.b64decode(payload["image"]), payload["attributes"], config.fill_rate
+        )
+
+        if not payload.get("stream"):
+            await asyncio.sleep(latency)
+            return JSONResponse(suggestions)
+
+        text = json.dumps(suggestions)
+
+        async def chunks():
+            # Time to first token, then the body a few characters at a time
+            await asyncio.sleep(latency / 2)
+            for i in range(0, len(text), 16):
+                yield text[i : i + 16]
+                await asyncio.sleep(config.chunk_delay_ms / 1000)
+
+        return StreamingResponse(chunks(), media_type="application/json")
+
+    return Starlette(routes=[Route("/v1/analyze", analyze, methods=["POST"])])
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the fake vision server."""
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    for field in fields(FakeVisionConfig):
+        parser.add_argument(
+            f"--{field.name.replace('_', '-')}",
+            type=int if field.name == "seed" else float,
+            default=field.default,
+        )
+    args = parser.parse_args(argv)
+
+    config = FakeVisionConfig(
+        **{field.name: getattr(args, field.name) for field in fields(FakeVisionConfig)}
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
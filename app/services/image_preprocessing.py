@@ -0,0 +1,147 @@
+"""Image preprocessing before sending photos to the vision model.
+
+Phone photos are often 10+ MB. Downscaling them to the resolution the model
+actually uses, dropping EXIF metadata and re-encoding as JPEG cuts upload
+payloads and model latency without hurting attribute recognition.
+
+Images can be given as bytes or as a file object (such as a spooled upload),
+which Pillow decodes straight from the file without loading it into memory.
+
+Pillow work is CPU-bound, so it runs in a bounded thread pool instead of on
+the event loop (Pillow releases the GIL while decoding, resizing and encoding).
+
+Configuration via environment variables:
+    IMAGE_MAX_EDGE: Longest edge in pixels after downscaling (default: 1536)
+    IMAGE_JPEG_QUALITY: JPEG quality of the re-encoded image (default: 85)
+    IMAGE_PREPROCESS_WORKERS: Threads used for preprocessing (default: 4)
+"""
+
+import asyncio
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from ..metrics import IMAGE_PREPROCESS_PENDING, LLM_LATENCY
+from ..tracing import span
+
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1536"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_PREPROCESS_WORKERS = int(os.getenv("IMAGE_PREPROCESS_WORKERS", "4"))
+
+# Input formats we accept, as reported by Pillow (MPO is a multi-frame JPEG)
+SUPPORTED_FORMATS = frozenset({"JPEG", "MPO", "PNG", "WEBP"})
+
+# Raw image bytes, or a readable and seekable file holding them
+ImageSource = bytes | BinaryIO
+
+_executor: ThreadPoolExecutor | None = None
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    """An image ready to send to the vision model."""
+
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    source_format: str
+
+
+def preprocess_image(
+    image_data: ImageSource,
+    max_edge: int = IMAGE_MAX_EDGE,
+    quality: int = IMAGE_JPEG_QUALITY,
+) -> PreparedImage:
+    """Detect the format, strip metadata, downscale and re-encode an image.
+
+    Args:
+        image_data: The uploaded image bytes, or a file holding them
+        max_edge: Longest edge of the output in pixels
+        quality: JPEG quality of the output
+
+    Returns:
+        PreparedImage holding JPEG bytes without EXIF metadata
+
+    Raises:
+        ValueError: If the bytes are not an image in a supported format
+    """
+    try:
+        if isinstance(image_data, bytes):
+            image_data = io.BytesIO(image_data)
+        else:
+            image_data.seek(0)
+        image = Image.open(image_data)
+        source_format = image.format or ""
+        if source_format not in SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported image format: {source_format or 'unknown'}")
+
+        # draft() lets the JPEG decoder skip straight to a reduced scale
+        image.draft("RGB", (max_edge, max_edge))
+        # Apply the EXIF orientation before the metadata is dropped
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+        if image.mode in ("RGBA", "LA", "P"):
+            # Flatten transparency onto white rather than black
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel("A"))
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        output = io.BytesIO()
+        # Saving without exif= drops all metadata
+        image.save(output, format="JPEG", quality=quality, optimize=True)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Could not read image: {e}") from e
+
+    return PreparedImage(
+        data=output.getvalue(),
+        mime_type="image/jpeg",
+        width=image.width,
+        height=image.height,
+        source_format=source_format,
+    )
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=IMAGE_PREPROCESS_WORKERS, thread_name_prefix="image-preprocess"
+        )
+    return _executor
+
+
+def source_size(image_data: ImageSource) -> int:
+    """Get the size in bytes of an image source without reading it."""
+    if isinstance(image_data, bytes):
+        return len(image_data)
+    position = image_data.tell()
+    size = image_data.seek(0, io.SEEK_END)
+    image_data.seek(position)
+    return size
+
+
+async def prepare_image(image_data: ImageSource) -> PreparedImage:
+    """Preprocess an image in the worker pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    IMAGE_PREPROCESS_PENDING.inc()
+    try:
+        with span("image.preprocess", bytes_in=source_size(image_data)) as preprocess_span:
+            prepared = await loop.run_in_executor(
+                _get_executor(), preprocess_image, image_data
+            )
+            preprocess_span.set_attribute("bytes_out", len(prepared.data))
+            preprocess_span.set_attribute("source_format", prepared.source_format)
+            return prepared
+    finally:
+        IMAGE_PREPROCESS_PENDING.dec()
+        LLM_LATENCY.labels("preprocess").observe(time.perf_counter() - start)
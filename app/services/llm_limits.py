@@ -0,0 +1,172 @@
+"""Overload protection for LLM vision calls.
+
+A burst of uploads should queue briefly and then degrade to manual answering,
+not fan out into unlimited concurrent model requests. Calls go through:
+
+1. A concurrency limit (semaphore) with a bounded queue wait
+2. A token-bucket rate limit matched to the API quota, taken per attempt
+3. Retries of transient errors with jittered exponential backoff
+4. An overall per-call deadline covering all of the above
+
+Configuration via environment variables:
+    LLM_MAX_CONCURRENCY: Model calls in flight at once (default: 4)
+    LLM_QUEUE_TIMEOUT_SECONDS: Longest wait for a free slot (default: 10)
+    LLM_RATE_PER_MINUTE: Sustained request rate allowed by the quota (default: 60)
+    LLM_RATE_BURST: Requests allowed back to back (default: LLM_MAX_CONCURRENCY)
+    LLM_MAX_ATTEMPTS: Attempts per call including the first (default: 3)
+    LLM_DEADLINE_SECONDS: Total time budget per call (default: 45)
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from ..log import get_logger
+from ..metrics import LLM_LATENCY, LLM_QUEUE_DEPTH, LLM_REJECTIONS, LLM_RETRIES
+
+logger = get_logger("llm")
+
+
+class LLMOverloadedError(RuntimeError):
+    """Raised when a call could not get a slot before the queue timeout."""
+
+
+class TokenBucket:
+    """Token-bucket rate limiter for a single event loop."""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """Wait for a token and take it.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return waited
+            delay = (1 - self._tokens) / self.rate
+            waited += delay
+            await asyncio.sleep(delay)
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Check if an error is worth retrying (rate limits, server and network errors)."""
+    import httpx
+
+    try:
+        from google.genai import errors
+    except ImportError:
+        errors = None
+
+    if errors is not None and isinstance(exc, errors.APIError):
+        return _is_transient_status(exc.code)
+    if isinstance(exc, httpx.HTTPStatusError):
+        return _is_transient_status(exc.response.status_code)
+    return isinstance(exc, httpx.TransportError)
+
+
+def _is_transient_status(status: int) -> bool:
+    return status in (408, 429) or status >= 500
+
+
+class LLMCallLimiter:
+    """Concurrency, rate, retry and deadline policy shared by all LLM calls."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        queue_timeout: float = 10.0,
+        rate_per_minute: float = 60.0,
+        burst: float | None = None,
+        max_attempts: int = 3,
+        deadline: float = 45.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self.bucket = TokenBucket(
+            rate_per_minute / 60.0, burst if burst is not None else max_concurrency
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @classmethod
+    def from_env(cls) -> "LLMCallLimiter":
+        """Create a limiter configured from LLM_* environment variables."""
+        burst = os.getenv("LLM_RATE_BURST")
+        return cls(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+            queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10")),
+            rate_per_minute=float(os.getenv("LLM_RATE_PER_MINUTE", "60")),
+            burst=float(burst) if burst else None,
+            max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "3")),
+            deadline=float(os.getenv("LLM_DEADLINE_SECONDS", "45")),
+        )
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the concurrency slots for the duration of a call.
+
+        Raises:
+            LLMOverloadedError: If no slot frees up within the queue timeout
+        """
+        start = time.perf_counter()
+        LLM_QUEUE_DEPTH.inc()
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await self._semaphore.acquire()
+        except TimeoutError:
+            LLM_REJECTIONS.labels("queue_timeout").inc()
+            raise LLMOverloadedError(
+                f"No LLM slot free after {self.queue_timeout:.0f}s"
+            ) from None
+        finally:
+            LLM_QUEUE_DEPTH.dec()
+            LLM_LATENCY.labels("queue_wait").observe(time.perf_counter() - start)
+
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+    def retrying(self) -> AsyncRetrying:
+        """Retry policy for transient errors, with jittered exponential backoff."""
+        return AsyncRetrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=wait_random_exponential(multiplier=0.5, max=8),
+            retry=retry_if_exception(is_transient_error),
+            before_sleep=_log_retry,
+            reraise=True,
+        )
+
+
+def _log_retry(retry_state: RetryCallState) -> None:
+    LLM_RETRIES.inc()
+    logger.info(
+        "Retrying LLM call after transient error: %s",
+        retry_state.outcome.exception() if retry_state.outcome else None,
+        extra={"attempt": retry_state.attempt_number},
+    )
@@ -4,11 +4,31 @@ This module provides optional LLM-based image analysis to help users
 quickly fill in mushroom attributes based on uploaded images.
 """
 
+import asyncio
+import json
 import os
+import re
+import time
+from contextlib import AsyncExitStack, aclosing
+from collections import Counter
+from functools import lru_cache
+from typing import AsyncIterator, Iterable
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, create_model
 
 from ..attributes import ATTRIBUTES
+from ..log import get_logger
+from ..metrics import LLM_INFLIGHT, LLM_LATENCY, LLM_REJECTIONS, LLM_REQUESTS
+from ..tracing import span, traced
+from .analysis_cache import AnalysisCache, make_cache_key
+from .image_preprocessing import ImageSource, PreparedImage, prepare_image
+from .llm_limits import LLMCallLimiter, LLMOverloadedError
+from .vision_backends import VisionBackend, backend_from_env
+
+logger = get_logger("llm")
+
+# Bump whenever the prompt or response schema changes, to invalidate cached results
+PROMPT_VERSION = "1"
 
 
 class MushroomAttributes(BaseModel):
@@ -34,111 +54,584 @@ class MushroomAttributes(BaseModel):
     gill_spacing: str | None = Field(None, description="Gill spacing code")
 
 
+# Attribute names in prompt order
+ALL_ATTRIBUTES: tuple[str, ...] = tuple(ATTRIBUTES)
+
+
+def normalize_attributes(attributes: Iterable[str] | None) -> tuple[str, ...]:
+    """Turn a set of requested attributes into a canonical, hashable tuple.
+
+    Unknown names are dropped and the order follows ATTRIBUTES, so the same
+    set always maps to the same cached prompt, schema and cache key.
+    """
+    if attributes is None:
+        return ALL_ATTRIBUTES
+    requested = set(attributes)
+    return tuple(name for name in ALL_ATTRIBUTES if name in requested)
+
+
+@lru_cache(maxsize=128)
+def build_analysis_prompt(attributes: tuple[str, ...]) -> str:
+    """Build the analysis prompt listing only the given attributes and their codes."""
+    prompt = """Analyze this mushroom image and identify visible attributes.
+Only provide values you are confident about based on what you can see in the image.
+Leave attributes as null if you cannot determine them from the image.
+
+Use ONLY the exact codes from the following valid options:
+
+"""
+
+    for attr_name in attributes:
+        prompt += f"\n{attr_name}:\n"
+        for code, description in ATTRIBUTES[attr_name]["options"]:
+            prompt += f"  {code} = {description}\n"
+
+    prompt += """
+
+Important:
+- Only include attributes you can confidently determine from the image
+- Use ONLY the exact codes provided above (not the descriptions)
+- Visual attributes like cap_color, gill_color, cap_shape are usually visible
+- Odor and spore_print_color are typically NOT determinable from images alone
+- Return null for any attribute you cannot see or determine
+"""
+
+    return prompt
+
+
+@lru_cache(maxsize=128)
+def build_response_schema(attributes: tuple[str, ...]) -> type[BaseModel]:
+    """Build a response model with only the given MushroomAttributes fields."""
+    if attributes == ALL_ATTRIBUTES:
+        return MushroomAttributes
+    fields = MushroomAttributes.model_fields
+    return create_model(
+        "MushroomAttributesSubset",
+        **{name: (fields[name].annotation, fields[name]) for name in attributes},
+    )
+
+
+def merge_suggestions(per_photo: list[dict[str, str]]) -> dict[str, str]:
+    """Merge suggestions from several photos of one mushroom by voting.
+
+    Each photo votes for the values it suggests. The most common value wins;
+    ties go to the value suggested by the earliest photo, so a single photo
+    still counts when no other photo shows that part of the mushroom.
+    """
+    votes: dict[str, Counter[str]] = {}
+    first_seen: dict[tuple[str, str], int] = {}
+    for index, suggestions in enumerate(per_photo):
+        for attr, value in suggestions.items():
+            votes.setdefault(attr, Counter())[value] += 1
+            first_seen.setdefault((attr, value), index)
+
+    return {
+        attr: max(counts, key=lambda value: (counts[value], -first_seen[(attr, value)]))
+        for attr, counts in votes.items()
+    }
+
+
+# A complete "attribute": "code" (or null) pair in a flat JSON object
+_PAIR_PATTERN = re.compile(r'"(\w+)"\s*:\s*(?:"((?:[^"\\]|\\.)*)"|null)')
+
+
+class StreamingAttributeParser:
+    """Incrementally pull attribute/value pairs out of a streamed JSON object.
+
+    The structured response is a flat object of string-or-null values, so a
+    pair is complete as soon as its closing quote (or ``null``) has arrived.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._position = 0
+
+    def feed(self, text: str) -> list[tuple[str, str]]:
+        """Add a chunk of response text and return the newly completed pairs."""
+        self._buffer += text
+        pairs = []
+        for match in _PAIR_PATTERN.finditer(self._buffer, self._position):
+            self._position = match.end()
+            if match.group(2) is not None:
+                pairs.append((match.group(1), json.loads(f'"{match.group(2)}"')))
+        return pairs
+
+
 class LLMVisionService:
     """Service for analyzing mushroom images using LLM vision APIs."""
 
-    def __init__(self):
-        """Initialize the LLM vision service."""
-        self.enabled: bool = False
-        self.api_key = os.getenv("GOOGLE_API_KEY")
-        self.model = os.getenv("LLM_VISION_MODEL", "gemini-2.0-flash")
-
-        if self.api_key:
-            self.enabled = True
-            print("✓ LLM Vision service enabled (Gemini)")
+    def __init__(self, backend: VisionBackend | None = None):
+        """Initialize the LLM vision service.
+
+        Args:
+            backend: Model backend to call; defaults to the one selected by
+                LLM_VISION_BACKEND (Gemini unless configured otherwise)
+        """
+        self.backend = backend if backend is not None else backend_from_env()
+        self.model = self.backend.model
+        self.streaming = os.getenv("LLM_STREAMING", "true").lower() in ("1", "true", "yes", "on")
+
+        # Results of previous analyses, keyed on the image content
+        self.cache = AnalysisCache.from_env()
+
+        # Concurrency, rate, retry and deadline policy for model calls
+        self.limiter = LLMCallLimiter.from_env()
+
+        # Analyses currently running, keyed like the cache, so identical
+        # concurrent uploads share one model call, and how many callers wait
+        # on each so the call can be cancelled once nobody needs it
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._waiters: dict[str, int] = {}
+
+        self.enabled: bool = self.backend.available
+        backend_name = type(self.backend).__name__
+        if self.enabled:
+            logger.info(
+                "LLM Vision service enabled (%s)", backend_name, extra={"model": self.model}
+            )
         else:
-            print("ℹ LLM Vision service disabled (no API key found)")
+            logger.info("LLM Vision service disabled (%s not configured)", backend_name)
 
     def is_enabled(self) -> bool:
         """Check if the LLM vision service is enabled."""
         return self.enabled
 
-    async def analyze_mushroom_image(self, image_data: bytes) -> dict[str, str]:
+    async def aclose(self) -> None:
+        """Close the backend and its connection pool."""
+        await self.backend.aclose()
+
+    async def analyze_mushroom_image(
+        self, image_data: ImageSource, attributes: Iterable[str] | None = None
+    ) -> dict[str, str]:
         """
         Analyze a mushroom image and return suggested attribute values.
 
+        The image is downscaled and re-encoded first, so the cache key and the
+        model both see the normalized bytes. Concurrent calls for the same
+        image (other sessions, double clicks) wait on a single model call.
+
+        Asking only for the attributes that can still change the verdict
+        keeps the prompt and the response, and so model latency, small.
+
         Args:
-            image_data: The image data as bytes
-            image_format: The image format (jpeg, png, etc.)
+            image_data: The uploaded image (JPEG, PNG or WebP), as bytes or a file
+            attributes: Attributes to ask for; None asks for all of them
 
         Returns:
             Dictionary mapping attribute names to their suggested values
         """
-        if not self.enabled:
+        attributes = normalize_attributes(attributes)
+        request = await self._prepare_request(image_data, attributes)
+        if request is None:
             return {}
+        prepared, cache_key = request
+
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            LLM_REQUESTS.labels("cached").inc()
+            return cached
+
+        while True:
+            shared = self._inflight.get(cache_key)
+            if shared is None:
+                shared = asyncio.ensure_future(
+                    self._analyze_uncached(prepared, cache_key, attributes)
+                )
+                self._inflight[cache_key] = shared
+                shared.add_done_callback(lambda done: self._forget_inflight(cache_key, done))
+            else:
+                LLM_REQUESTS.labels("coalesced").inc()
+
+            results = await self._wait_for_shared(cache_key, shared)
+            if results is not None:
+                return dict(results)
+            # The stream this joined was cut short; run the call again
+
+    async def stream_mushroom_image(
+        self, image_data: ImageSource, attributes: Iterable[str] | None = None
+    ) -> AsyncIterator[tuple[str, str]]:
+        """
+        Analyze a mushroom image, yielding each suggestion as soon as it is decoded.
+
+        Same caching, coalescing and limits as analyze_mushroom_image, but the
+        model response is streamed and parsed incrementally, so the first
+        suggestions reach the user before the whole response has arrived.
+        Identical concurrent requests wait for the full result of the first
+        stream; if its caller stops early, one of them makes the call instead.
+
+        Args:
+            image_data: The uploaded image (JPEG, PNG or WebP), as bytes or a file
+            attributes: Attributes to ask for; None asks for all of them
 
+        Yields:
+            (attribute, code) pairs, each validated against the known codes
+        """
+        attributes = normalize_attributes(attributes)
+        request = await self._prepare_request(image_data, attributes)
+        if request is None:
+            return
+        prepared, cache_key = request
+
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            LLM_REQUESTS.labels("cached").inc()
+            for item in cached.items():
+                yield item
+            return
+
+        while (shared := self._inflight.get(cache_key)) is not None:
+            LLM_REQUESTS.labels("coalesced").inc()
+            shared_results = await self._wait_for_shared(cache_key, shared)
+            if shared_results is not None:
+                for item in shared_results.items():
+                    yield item
+                return
+            # The stream this joined was cut short; run the call ourselves,
+            # or join whichever waiter got there first
+
+        # Let identical concurrent requests wait for this stream's final
+        # result. The stream counts as a waiter itself, so the others never
+        # cancel it while it runs.
+        shared = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = shared
+        shared.add_done_callback(lambda done: self._forget_inflight(cache_key, done))
+        self._waiters[cache_key] = self._waiters.get(cache_key, 0) + 1
+        results: dict[str, str] = {}
+        finished = False
         try:
-            from google import genai
-            from google.genai import types
-
-            # Configure Gemini
-            client = genai.Client(api_key=self.api_key)
-
-            # Create the prompt with all available attributes
-            prompt = self._create_analysis_prompt()
-
-            # Generate content with structured output
-            response = client.models.generate_content(
-                model=self.model,
-                contents=[
-                    prompt,
-                    types.Part.from_bytes(data=image_data, mime_type="image/jpeg"),
-                ],
-                config={
-                    "response_mime_type": "application/json",
-                    "response_schema": MushroomAttributes,
-                },
-            )
+            # aclosing() releases the concurrency slot as soon as the caller stops
+            async with aclosing(self._stream_uncached(prepared, attributes)) as stream:
+                async for attr, value in stream:
+                    results[attr] = value
+                    yield attr, value
+            finished = True
+            if results:
+                await self.cache.set(cache_key, results)
+        finally:
+            if not shared.done():
+                # A stream stopped by its caller (reset, new upload) hands
+                # the waiters None rather than its partial result
+                shared.set_result(dict(results) if finished else None)
+            self._release_waiter(cache_key, shared)
+
+    async def analyze_mushroom_images(
+        self, images: list[ImageSource], attributes: Iterable[str] | None = None
+    ) -> dict[str, str]:
+        """
+        Analyze several photos of one mushroom and merge their suggestions.
 
-            # Parse the structured response
-            parsed_response: MushroomAttributes = response.parsed
-            return self._validate_and_convert_response(parsed_response)
+        Photos are analyzed concurrently (still within the limiter), so the
+        total latency is that of the slowest photo rather than the sum.
 
-        except ImportError:
-            print(
-                "⚠️  Google Generative AI library not installed. Install with: pip install google-generativeai pillow"
-            )
-            return {}
-        except Exception as e:
-            print(f"⚠️  Error analyzing image: {e}")
-            return {}
+        Args:
+            images: The uploaded images as bytes or files, one entry per photo
+            attributes: Attributes to ask for; None asks for all of them
 
-    def _create_analysis_prompt(self) -> str:
-        """Create a detailed prompt for the LLM to analyze the mushroom."""
-        prompt = """Analyze this mushroom image and identify visible attributes.
-Only provide values you are confident about based on what you can see in the image.
-Leave attributes as null if you cannot determine them from the image.
+        Returns:
+            Dictionary mapping attribute names to the winning suggested values
+        """
+        attributes = normalize_attributes(attributes)
+        per_photo = await asyncio.gather(
+            *(self.analyze_mushroom_image(image, attributes) for image in images)
+        )
+        return merge_suggestions(list(per_photo))
+
+    async def stream_mushroom_images(
+        self, images: list[ImageSource], attributes: Iterable[str] | None = None
+    ) -> AsyncIterator[tuple[str, str]]:
+        """
+        Stream several photos concurrently, yielding merged suggestions as they change.
 
-Use ONLY the exact codes from the following valid options:
+        Args:
+            images: The uploaded images as bytes or files, one entry per photo
+            attributes: Attributes to ask for; None asks for all of them
 
-"""
+        Yields:
+            (attribute, code) pairs whenever the merged vote for an attribute
+            changes, so an attribute may be yielded more than once
+        """
+        attributes = normalize_attributes(attributes)
+        if len(images) == 1:
+            async with aclosing(self.stream_mushroom_image(images[0], attributes)) as stream:
+                async for item in stream:
+                    yield item
+            return
+
+        # Producers push (photo index, attribute, code), or None when finished
+        queue: asyncio.Queue[tuple[int, str, str] | None] = asyncio.Queue()
+
+        async def produce(index: int, image_data: ImageSource) -> None:
+            try:
+                async with aclosing(
+                    self.stream_mushroom_image(image_data, attributes)
+                ) as stream:
+                    async for attr, value in stream:
+                        queue.put_nowait((index, attr, value))
+            finally:
+                queue.put_nowait(None)
+
+        producers = [
+            asyncio.create_task(produce(index, image_data))
+            for index, image_data in enumerate(images)
+        ]
+        per_photo: list[dict[str, str]] = [{} for _ in images]
+        merged: dict[str, str] = {}
+        remaining = len(producers)
+        try:
+            while remaining:
+                item = await queue.get()
+                if item is None:
+                    remaining -= 1
+                    continue
+                index, attr, value = item
+                per_photo[index][attr] = value
+                winner = merge_suggestions(per_photo)[attr]
+                if merged.get(attr) != winner:
+                    merged[attr] = winner
+                    yield attr, winner
+        finally:
+            for producer in producers:
+                producer.cancel()
+            await asyncio.gather(*producers, return_exceptions=True)
+
+    async def _prepare_request(
+        self, image_data: ImageSource, attributes: tuple[str, ...]
+    ) -> tuple[PreparedImage, str] | None:
+        """Preprocess the image and build its cache key, or None to skip analysis."""
+        if not self.enabled:
+            LLM_REQUESTS.labels("disabled").inc()
+            return None
 
-        # Add all attributes and their options
-        for attr_name, attr_info in ATTRIBUTES.items():
-            prompt += f"\n{attr_name}:\n"
-            for code, description in attr_info["options"]:
-                prompt += f"  {code} = {description}\n"
+        if not attributes:
+            LLM_REQUESTS.labels("not_needed").inc()
+            return None
 
-        prompt += """
+        try:
+            prepared = await prepare_image(image_data)
+        except ValueError as e:
+            logger.warning("Could not preprocess image: %s", e)
+            LLM_REQUESTS.labels("invalid_image").inc()
+            return None
+
+        cache_key = make_cache_key(
+            prepared.data, self.model, f"{PROMPT_VERSION}:{','.join(attributes)}"
+        )
+        return prepared, cache_key
+
+    def _forget_inflight(self, cache_key: str, done: asyncio.Future) -> None:
+        if self._inflight.get(cache_key) is done:
+            del self._inflight[cache_key]
+
+    async def _wait_for_shared(
+        self, cache_key: str, shared: asyncio.Future
+    ) -> dict[str, str] | None:
+        """Wait for an analysis in flight; None if it is a stream that was cut short."""
+        # Shielded so one caller going away does not cancel the call for the
+        # rest; the last caller to leave cancels it and frees its slot
+        self._waiters[cache_key] = self._waiters.get(cache_key, 0) + 1
+        try:
+            return await asyncio.shield(shared)
+        finally:
+            self._release_waiter(cache_key, shared)
+
+    def _release_waiter(self, cache_key: str, shared: asyncio.Future) -> None:
+        remaining = self._waiters.pop(cache_key, 1) - 1
+        if remaining:
+            self._waiters[cache_key] = remaining
+        elif not shared.done():
+            # Nobody is waiting any more: stop sharing it and cancel the call
+            self._forget_inflight(cache_key, shared)
+            shared.cancel()
+
+    async def _analyze_uncached(
+        self, prepared: PreparedImage, cache_key: str, attributes: tuple[str, ...]
+    ) -> dict[str, str]:
+        """Run the model on a prepared image and cache a non-empty result."""
+        LLM_INFLIGHT.inc()
+        start = time.perf_counter()
+        outcome = "error"
+        with span(
+            "llm.analyze",
+            model=self.model,
+            bytes=len(prepared.data),
+            attributes=len(attributes),
+        ) as analyze_span:
+            try:
+                # Prompt and schema cover only the requested attributes
+                with span("llm.build_prompt"):
+                    prompt = self._create_analysis_prompt(attributes)
+                    schema = build_response_schema(attributes)
+
+                # The deadline covers queueing, every attempt and the backoff
+                # between them, so a slow API never holds the user for long.
+                async with asyncio.timeout(self.limiter.deadline):
+                    async with self.limiter.slot():
+                        parsed_response = await self._generate_content(
+                            prompt, schema, prepared
+                        )
+
+                # Validate the structured response
+                results = {
+                    attr: value
+                    for attr, value in self._validate_and_convert_response(
+                        parsed_response
+                    ).items()
+                    if attr in attributes
+                }
+                outcome = "success" if results else "empty"
+                if results:
+                    await self.cache.set(cache_key, results)
+                return results
+
+            except ImportError:
+                logger.warning(
+                    "Google Generative AI library not installed. Install with: pip install google-genai pillow"
+                )
+                return {}
+            except asyncio.CancelledError:
+                # Superseded by a reset or a new upload
+                outcome = "cancelled"
+                raise
+            except LLMOverloadedError as e:
+                # Degrade to manual answering rather than queueing without bound
+                outcome = "rejected"
+                logger.warning("Skipping image analysis: %s", e)
+                return {}
+            except TimeoutError:
+                outcome = "deadline"
+                LLM_REJECTIONS.labels("deadline").inc()
+                logger.warning(
+                    "Image analysis exceeded its %.0fs deadline", self.limiter.deadline
+                )
+                return {}
+            except Exception as e:
+                logger.warning("Error analyzing image: %s", e)
+                return {}
+            finally:
+                analyze_span.set_attribute("outcome", outcome)
+                LLM_INFLIGHT.dec()
+                LLM_LATENCY.labels("analyze").observe(time.perf_counter() - start)
+                LLM_REQUESTS.labels(outcome).inc()
+
+    async def _stream_uncached(
+        self, prepared: PreparedImage, attributes: tuple[str, ...]
+    ) -> AsyncIterator[tuple[str, str]]:
+        """Stream the model response, yielding validated pairs as they complete.
+
+        Time to the first suggestion is recorded separately from total time.
+        """
+        LLM_INFLIGHT.inc()
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        # A deadline instead of asyncio.timeout(), which must not span a yield
+        deadline_at = loop.time() + self.limiter.deadline
+        outcome = "error"
+        yielded = 0
+        with span(
+            "llm.analyze",
+            model=self.model,
+            bytes=len(prepared.data),
+            attributes=len(attributes),
+            streaming=True,
+        ) as analyze_span:
+            try:
+                with span("llm.build_prompt"):
+                    prompt = self._create_analysis_prompt(attributes)
+                    schema = build_response_schema(attributes)
+
+                # The deadline covers queueing for the slot too, as on the
+                # non-streaming path; the slot is held until the stream ends
+                async with AsyncExitStack() as slot:
+                    async with asyncio.timeout_at(deadline_at):
+                        await slot.enter_async_context(self.limiter.slot())
+                        stream = await self._generate_content(
+                            prompt, schema, prepared, stream=True
+                        )
+
+                    parser = StreamingAttributeParser()
+                    async with aclosing(stream):
+                        while True:
+                            async with asyncio.timeout_at(deadline_at):
+                                text = await anext(stream, None)
+                            if text is None:
+                                break
+                            for attr, value in parser.feed(text):
+                                if attr not in attributes or not _is_valid_code(
+                                    attr, value
+                                ):
+                                    continue
+                                if not yielded:
+                                    first = time.perf_counter() - start
+                                    LLM_LATENCY.labels("first_suggestion").observe(first)
+                                    analyze_span.set_attribute(
+                                        "first_suggestion_ms", round(first * 1000, 3)
+                                    )
+                                yielded += 1
+                                yield attr, value
+
+                outcome = "success" if yielded else "empty"
+
+            except ImportError:
+                logger.warning(
+                    "Google Generative AI library not installed. Install with: pip install google-genai pillow"
+                )
+            except (asyncio.CancelledError, GeneratorExit):
+                # Cancelled, or the caller stopped reading the stream
+                outcome = "cancelled"
+                raise
+            except LLMOverloadedError as e:
+                outcome = "rejected"
+                logger.warning("Skipping image analysis: %s", e)
+            except TimeoutError:
+                outcome = "deadline"
+                LLM_REJECTIONS.labels("deadline").inc()
+                logger.warning(
+                    "Image analysis exceeded its %.0fs deadline", self.limiter.deadline
+                )
+            except Exception as e:
+                logger.warning("Error analyzing image: %s", e)
+            finally:
+                analyze_span.set_attribute("outcome", outcome)
+                LLM_INFLIGHT.dec()
+                LLM_LATENCY.labels("analyze").observe(time.perf_counter() - start)
+                LLM_REQUESTS.labels(outcome).inc()
+
+    async def _generate_content(
+        self,
+        prompt: str,
+        schema: type[BaseModel],
+        prepared: PreparedImage,
+        stream: bool = False,
+    ):
+        """Call the model, retrying transient errors with jittered backoff.
+
+        Every attempt takes a token from the rate limiter first, so retries
+        count against the API quota like any other request. With stream=True
+        only opening the stream is retried, and the text chunk iterator is
+        returned; otherwise the parsed response.
+        """
+        generate = self.backend.stream if stream else self.backend.generate
 
-Important:
-- Only include attributes you can confidently determine from the image
-- Use ONLY the exact codes provided above (not the descriptions)
-- Visual attributes like cap_color, gill_color, cap_shape are usually visible
-- Odor and spore_print_color are typically NOT determinable from images alone
-- Return null for any attribute you cannot see or determine
-"""
+        async for attempt in self.limiter.retrying():
+            with attempt:
+                await self.limiter.bucket.acquire()
+                attempt_number = attempt.retry_state.attempt_number
+                with span("llm.generate_content", attempt=attempt_number):
+                    return await generate(prompt, schema, prepared)
 
-        return prompt
+    def _create_analysis_prompt(self, attributes: tuple[str, ...] = ALL_ATTRIBUTES) -> str:
+        """Create a detailed prompt for the LLM to analyze the mushroom."""
+        return build_analysis_prompt(attributes)
 
+    @traced("llm.validate")
     def _validate_and_convert_response(
-        self, parsed_response: MushroomAttributes
+        self, parsed_response: BaseModel
     ) -> dict[str, str]:
         """
         Validate and convert the Pydantic model response to a dictionary.
 
         Args:
-            parsed_response: The parsed Pydantic model from Gemini
+            parsed_response: The parsed Pydantic model from the backend
 
         Returns:
             Dictionary mapping attribute names to their validated values
@@ -155,17 +648,23 @@ Important:
             # Validate that the attribute exists in our system
             if attr_name in ATTRIBUTES:
                 # Validate that the value is valid for this attribute
-                valid_codes = [code for code, _ in ATTRIBUTES[attr_name]["options"]]
-                if value in valid_codes:
+                if _is_valid_code(attr_name, value):
                     results[attr_name] = value
                 else:
-                    print(
-                        f"⚠️  Invalid value '{value}' for attribute '{attr_name}', skipping"
+                    logger.debug(
+                        "Invalid value '%s' for attribute '%s', skipping",
+                        value,
+                        attr_name,
                     )
 
         return results
 
 
+def _is_valid_code(attr_name: str, value: str) -> bool:
+    """Check that a value is one of the known codes for an attribute."""
+    return any(code == value for code, _ in ATTRIBUTES[attr_name]["options"])
+
+
 # Global singleton instance
 _llm_vision_service: LLMVisionService | None = None
 
@@ -0,0 +1,68 @@
+"""Bounded reading of uploaded photos.
+
+Uploads are read in fixed-size chunks into a spooled temporary file: small
+photos stay in memory, larger ones roll over to disk, and anything above the
+byte cap is rejected as soon as the cap is crossed instead of after the whole
+body has been buffered. Image preprocessing then reads from the spooled file
+directly, so peak memory per upload does not grow with the file size.
+
+Configuration via environment variables:
+    UPLOAD_MAX_BYTES: Largest accepted photo in bytes (default: 20 MiB)
+    UPLOAD_SPOOL_BYTES: Size kept in memory before spilling to disk (default: 1 MiB)
+"""
+
+import os
+import tempfile
+from typing import BinaryIO
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured byte cap."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Upload exceeds the {max_bytes / (1024 * 1024):.0f} MB limit")
+        self.max_bytes = max_bytes
+
+
+async def spool_upload(
+    upload_file,
+    max_bytes: int = UPLOAD_MAX_BYTES,
+    spool_bytes: int = UPLOAD_SPOOL_BYTES,
+) -> tuple[BinaryIO, int]:
+    """Read an upload chunk by chunk into a spooled temporary file.
+
+    Args:
+        upload_file: An uploaded file with an async ``read(size)`` method
+        max_bytes: Reject the upload once it grows past this many bytes
+        spool_bytes: Keep at most this many bytes in memory
+
+    Returns:
+        The spooled file, rewound to the start, and its size in bytes.
+        The caller owns the file and must close it.
+
+    Raises:
+        UploadTooLargeError: If the declared or actual size exceeds max_bytes
+    """
+    # Reject early when the client declared the size up front
+    declared = getattr(upload_file, "size", None)
+    if declared is not None and declared > max_bytes:
+        raise UploadTooLargeError(max_bytes)
+
+    spooled = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+    size = 0
+    try:
+        while chunk := await upload_file.read(UPLOAD_CHUNK_BYTES):
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(max_bytes)
+            spooled.write(chunk)
+    except BaseException:
+        spooled.close()
+        raise
+
+    spooled.seek(0)
+    return spooled, size
@@ -0,0 +1,254 @@
+"""Pluggable backends for the LLM vision service.
+
+The service owns prompts, schemas, caching and overload protection; a
+backend only turns (prompt, schema, image) into a structured response. This
+lets the service run against Gemini in production and against a local fake
+server (see ``app.services.fake_vision_server``) for load tests and offline CI.
+
+Configuration via environment variables:
+    LLM_VISION_BACKEND: gemini (default) or http
+    LLM_VISION_BACKEND_URL: Base URL of the http backend (default: http://127.0.0.1:8765)
+"""
+
+import base64
+import os
+from abc import ABC, abstractmethod
+from typing import AsyncIterator
+
+import httpx
+from pydantic import BaseModel
+
+from .image_preprocessing import PreparedImage
+
+
+class VisionBackend(ABC):
+    """A model endpoint that analyzes one prepared image."""
+
+    #: Model name, part of the analysis cache key
+    model: str = ""
+
+    @property
+    @abstractmethod
+    def available(self) -> bool:
+        """Whether the backend is configured well enough to be called."""
+
+    @abstractmethod
+    async def generate(
+        self, prompt: str, schema: type[BaseModel], image: PreparedImage
+    ) -> BaseModel | None:
+        """Run the model and return the response parsed into ``schema``."""
+
+    @abstractmethod
+    async def stream(
+        self, prompt: str, schema: type[BaseModel], image: PreparedImage
+    ) -> AsyncIterator[str]:
+        """Start a streamed response and return an iterator of JSON text chunks.
+
+        Awaiting this opens the stream, so connection and status errors are
+        raised here (and can be retried) rather than while iterating.
+        """
+
+    async def aclose(self) -> None:
+        """Release connections held by the backend."""
+
+
+class GeminiBackend(VisionBackend):
+    """Google Gemini via the google-genai SDK."""
+
+    def __init__(
+        self,
+        api_key: str | None,
+        model: str = "gemini-2.0-flash",
+        timeout: float = 60.0,
+        max_connections: int = 10,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.max_connections = max_connections
+
+        # Long-lived Gemini client, created on first use and shared by all calls
+        self._client = None
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    def _get_client(self):
+        """Get the shared Gemini client, creating it on first use.
+
+        The client keeps a pooled HTTP connection set, so requests reuse
+        warm connections instead of opening a new one per analysis.
+        """
+        if self._client is None:
+            from google import genai
+            from google.genai import types
+
+            self._client = genai.Client(
+                api_key=self.api_key,
+                http_options=types.HttpOptions(
+                    timeout=int(self.timeout * 1000),
+                    async_client_args={
+                        "limits": httpx.Limits(
+                            max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_connections,
+                        )
+                    },
+                ),
+            )
+        return self._client
+
+    def _request(self, prompt: str, schema: type[BaseModel], image: PreparedImage) -> dict:
+        from google.genai import types
+
+        return {
+            "model": self.model,
+            "contents": [
+                prompt,
+                types.Part.from_bytes(data=image.data, mime_type=image.mime_type),
+            ],
+            "config": {
+                "response_mime_type": "application/json",
+                "response_schema": schema,
+            },
+        }
+
+    async def generate(
+        self, prompt: str, schema: type[BaseModel], image: PreparedImage
+    ) -> BaseModel | None:
+        # The async interface keeps the event loop free for other sessions
+        response = await self._get_client().aio.models.generate_content(
+            **self._request(prompt, schema, image)
+        )
+        return response.parsed
+
+    async def stream(
+        self, prompt: str, schema: type[BaseModel], image: PreparedImage
+    ) -> AsyncIterator[str]:
+        chunks = await self._get_client().aio.models.generate_content_stream(
+            **self._request(prompt, schema, image)
+        )
+
+        async def texts():
+            async for chunk in chunks:
+                yield chunk.text or ""
+
+        return texts()
+
+    async def aclose(self) -> None:
+        """Close the shared client and its connection pool."""
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aio.aclose()
+
+
+class HttpVisionBackend(VisionBackend):
+    """A plain JSON-over-HTTP vision endpoint, such as the local fake server.
+
+    POST ``{url}/v1/analyze`` with the prompt, the requested attribute names
+    and the base64 image; the response is a JSON object of attribute codes,
+    streamed as chunked text when ``stream`` is true.
+    """
+
+    def __init__(
+        self,
+        url: str = "http://127.0.0.1:8765",
+        model: str = "fake-vision",
+        timeout: float = 60.0,
+        max_connections: int = 10,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.url = url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.transport = transport
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def available(self) -> bool:
+        return bool(self.url)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                transport=self.transport,
+            )
+        return self._client
+
+    def _payload(
+        self, prompt: str, schema: type[BaseModel], image: PreparedImage, stream: bool
+    ) -> dict:
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "attributes": list(schema.model_fields),
+            "mime_type": image.mime_type,
+            "image": base64.b64encode(image.data).decode("ascii"),
+            "stream": stream,
+        }
+
+    async def generate(
+        self, prompt: str, schema: type[BaseModel], image: PreparedImage
+    ) -> BaseModel | None:
+        response = await self._get_client().post(
+            "/v1/analyze", json=self._payload(prompt, schema, image, stream=False)
+        )
+        response.raise_for_status()
+        return schema.model_validate(response.json())
+
+    async def stream(
+        self, prompt: str, schema: type[BaseModel], image: PreparedImage
+    ) -> AsyncIterator[str]:
+        client = self._get_client()
+        request = client.build_request(
+            "POST", "/v1/analyze", json=self._payload(prompt, schema, image, stream=True)
+        )
+        response = await client.send(request, stream=True)
+        if response.is_error:
+            await response.aread()
+            await response.aclose()
+            response.raise_for_status()
+
+        async def texts():
+            try:
+                async for text in response.aiter_text():
+                    yield text
+            finally:
+                await response.aclose()
+
+        return texts()
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+
+
+def backend_from_env() -> VisionBackend:
+    """Create the vision backend selected by LLM_VISION_BACKEND."""
+    kind = os.getenv("LLM_VISION_BACKEND", "gemini").lower()
+    timeout = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+    max_connections = int(os.getenv("LLM_MAX_CONNECTIONS", "10"))
+
+    if kind == "http":
+        return HttpVisionBackend(
+            url=os.getenv("LLM_VISION_BACKEND_URL", "http://127.0.0.1:8765"),
+            model=os.getenv("LLM_VISION_MODEL", "fake-vision"),
+            timeout=timeout,
+            max_connections=max_connections,
+        )
+    if kind != "gemini":
+        raise ValueError(f"Unknown LLM_VISION_BACKEND: {kind}")
+    return GeminiBackend(
+        api_key=os.getenv("GOOGLE_API_KEY"),
+        model=os.getenv("LLM_VISION_MODEL", "gemini-2.0-flash"),
+        timeout=timeout,
+        max_connections=max_connections,
+    )
@@ -0,0 +1,100 @@
+"""Startup profiling for the mushroom expert system.
+
+Measures per-module import time of the app package in a fresh interpreter,
+so worker boot regressions can be spotted before they reach production.
+
+Usage:
+    python -m app.startup [module] [--top N]
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import NamedTuple
+
+# Project root, so the subprocess resolves the ``app`` package the same way
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Cold import budget for the app package, in milliseconds
+IMPORT_BUDGET_MS = float(os.getenv("APP_IMPORT_BUDGET_MS", "2500"))
+
+
+class ImportTiming(NamedTuple):
+    """Import time of a single module, in microseconds."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def profile_imports(module: str = "app.app") -> list[ImportTiming]:
+    """Import a module in a fresh interpreter and collect per-module timings.
+
+    Args:
+        module: Dotted name of the module to import
+
+    Returns:
+        List of ImportTiming entries in the order Python reported them
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=PROJECT_ROOT,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to import {module}: {result.stderr.strip()}")
+
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # Skip the header line
+            continue
+        timings.append(
+            ImportTiming(
+                module=fields[2].strip(),
+                self_us=int(fields[0]),
+                cumulative_us=int(fields[1]),
+            )
+        )
+    return timings
+
+
+def import_time_ms(module: str = "app.app") -> float:
+    """Get the cold cumulative import time of a module in milliseconds."""
+    for timing in profile_imports(module):
+        if timing.module == module:
+            return timing.cumulative_us / 1000
+    return 0.0
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Print the slowest imports of the app package."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("module", nargs="?", default="app.app")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    timings = profile_imports(args.module)
+    total = next(
+        (t.cumulative_us for t in timings if t.module == args.module), 0
+    )
+
+    print(f"Cold import of {args.module}: {total / 1000:.1f} ms")
+    print(f"Budget: {IMPORT_BUDGET_MS:.0f} ms\n")
+    print(f"{'self (ms)':>10} {'cumul (ms)':>11}  module")
+    for timing in sorted(timings, key=lambda t: t.self_us, reverse=True)[: args.top]:
+        print(
+            f"{timing.self_us / 1000:>10.1f} {timing.cumulative_us / 1000:>11.1f}  "
+            f"{timing.module}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,389 +1,352 @@
 """State management using CLIPS-based rules engine."""
 
-from typing import Any
+import asyncio
+import os
+import secrets
+import time
+from contextlib import aclosing
+from typing import BinaryIO
+from urllib.parse import parse_qsl
 
 import reflex as rx
 
-from .attributes import get_attribute_info, get_attribute_info_i18n
-from .engines.clips_engine import CLIPSRulesEngine
-from .i18n import I18nState, load_translations
-from .services.llm_vision import get_llm_vision_service
-
-# Module-level singleton engine
-try:
-    _clips_engine = CLIPSRulesEngine()
-    print("✓ CLIPS engine initialized successfully")
-except Exception as e:
-    print(f"✗ Failed to initialize CLIPS engine: {e}")
-    print("  Falling back to Python-based rules engine")
-    from .engines.rules_engine import RulesEngine
-
-    _clips_engine = RulesEngine()
+from .attributes import ATTRIBUTE_OPTION_CODES
+from .components.client_flow import ANSWERS_IN_URL, FLOW_ANSWERS
+from .engines.clips_engine import get_rules_engine
+from .i18n import I18nState
+from .log import get_logger
+from .metrics import HANDLER_LATENCY, timed
+from .profiling import profiled, session_requested_profiling
+from .services.classification import (
+    InvalidAnswersError,
+    answers_from_query,
+    validate_answers,
+)
+from .services.color_extractor import extract_color_attributes
+from .services.uploads import UploadTooLargeError, spool_upload
+from .tracing import span, traced
+
+logger = get_logger("state")
+
+# Photos of one mushroom analyzed together (cap, gills, stalk, ...)
+MAX_UPLOAD_PHOTOS = int(os.getenv("MAX_UPLOAD_PHOTOS", "4"))
+
+# Seconds a handed-over upload waits for its analysis before it is discarded
+PENDING_UPLOAD_TTL_SECONDS = float(os.getenv("PENDING_UPLOAD_TTL_SECONDS", "60"))
+
+# Uploads waiting for their streaming analysis to start, keyed by a one-off id,
+# with the time they were handed over. Upload handlers cannot run in the
+# background, so the bytes are handed over here rather than round-tripping
+# through the browser as an event argument. If the browser never starts the
+# analysis (closed tab, lost connection), the entry is swept after the TTL.
+# The hand-over is in-process only: it assumes a single backend worker, since
+# the upload POST and the websocket event that starts the analysis must reach
+# the same process.
+_pending_uploads: dict[str, tuple[list[BinaryIO], set[str], int, float]] = {}
+
+ANALYSIS_FAILED_MESSAGE = "Could not analyze the image. Please answer questions manually."
+
+# Running streaming analyses by session token, so they can be cancelled
+_analysis_tasks: dict[str, asyncio.Task] = {}
+
+
+def _close_all(files: list[BinaryIO]) -> None:
+    for file in files:
+        file.close()
+
+
+def _sweep_pending_uploads() -> None:
+    """Close and drop handed-over uploads whose analysis never started."""
+    cutoff = time.monotonic() - PENDING_UPLOAD_TTL_SECONDS
+    stale = [upload_id for upload_id, entry in _pending_uploads.items() if entry[3] < cutoff]
+    for upload_id in stale:
+        _close_all(_pending_uploads.pop(upload_id)[0])
+    if stale:
+        logger.warning("Discarded %d uploads whose analysis never started", len(stale))
+
+
+async def _llm_suggestions(llm_service, images: list[BinaryIO], attributes: set[str]):
+    """Yield (attribute, value) pairs from the model, streamed or all at once."""
+    if llm_service.streaming:
+        async with aclosing(llm_service.stream_mushroom_images(images, attributes)) as stream:
+            async for attribute, value in stream:
+                yield attribute, value
+        return
+
+    # Photos are analyzed concurrently and their suggestions merged by vote
+    suggestions = await llm_service.analyze_mushroom_images(images, attributes)
+    for attribute, value in suggestions.items():
+        yield attribute, value
 
 
 class MushroomExpertState(I18nState):
     """State for the mushroom expert system using CLIPS."""
 
-    # Current answers
+    # Answers given in the browser, synced ahead of each photo analysis to
+    # narrow it to the open attributes (the question flow runs client-side)
     answers: dict[str, str] = {}
 
-    # Current attribute being asked - default to first important attribute
-    current_attribute: str = "odor"
-
-    # Prediction result
-    prediction: str = ""  # "edible" or "poisonous"
-    matched_rule: str = ""
-    rule_description: str = ""
-
-    # UI state
-    is_complete: bool = False
-
     # LLM Vision features
     llm_enabled: bool = False
     image_uploaded: bool = False
     analyzing_image: bool = False
     llm_suggestions: dict[str, str] = {}
+    # Rough estimates from the photo's colors, kept apart from the model's
+    # suggestions: they are applied one at a time, never by "Apply all"
+    color_suggestions: dict[str, str] = {}
     llm_error: str = ""
-    llm_suggestions_applied: bool = False
+
+    # Set when the session opted into request profiling via ?profile=1
+    _profile_requests: bool = False
+
+    # Bumped whenever an image analysis is superseded, so late results are dropped
+    _analysis_generation: int = 0
 
     def on_load(self):
-        """Initialize state on page load."""
-        # Load i18n
-        self.on_load_i18n()
+        """Initialize state on page load.
+
+        With ANSWERS_IN_URL on, answers in the URL (``?odor=n&stalk_root=e``)
+        become the browser's starting answers, so a question or verdict can
+        be linked to.
+        """
+        # Pick the locale, possibly redirecting to that locale's page
+        redirect = self.on_load_i18n()
+
+        self._profile_requests = session_requested_profiling(
+            self.router.url.query_parameters
+        )
+
+        # Imported lazily so the LLM stack is only loaded on first use
+        from .services.llm_vision import get_llm_vision_service
 
         llm_service = get_llm_vision_service()
         self.llm_enabled = llm_service.is_enabled()
+        if redirect is not None:
+            return redirect
+        if not ANSWERS_IN_URL:
+            return None
+
+        # Other parameters (e.g. profile=1) are kept in the URL next to the answers
+        params = [
+            (name, value)
+            for name, value in parse_qsl(self.router.url.query)
+            if name in ATTRIBUTE_OPTION_CODES
+        ]
+        try:
+            answers = answers_from_query(params)
+        except InvalidAnswersError as e:
+            logger.info("Ignoring invalid answers in the URL: %s", e)
+            return None
+        return FLOW_ANSWERS.push(answers) if answers else None
 
     @rx.event
+    @timed(HANDLER_LATENCY.labels("handle_image_upload"))
+    @profiled("handle_image_upload")
+    @traced("state.handle_image_upload")
     async def handle_image_upload(self, files: list[rx.UploadFile]):
-        """Handle mushroom image upload and analyze with LLM."""
+        """Handle upload of one or more mushroom photos and analyze them.
+
+        Color estimates from the offline extractor are shown right away, apart
+        from the model's suggestions; the vision model then runs in a
+        background event, and each attribute it suggests replaces the color
+        estimate for it. Without a model the color estimates are all there is.
+        """
         if not files:
             return
 
+        # A new upload supersedes any analysis still running for this session
+        self._cancel_analysis()
+        generation = self._analysis_generation
+
+        handed_off = False
+        images: list[BinaryIO] = []
         try:
             self.analyzing_image = True
             self.llm_error = ""
 
-            # Get the first uploaded file
-            upload_file = files[0]
+            # Spool the photos, up to the configured limit, rejecting oversized
+            # ones before they are fully buffered
+            for upload_file in files[:MAX_UPLOAD_PHOTOS]:
+                with span("upload.read") as read_span:
+                    spooled, size = await spool_upload(upload_file)
+                    read_span.set_attribute("bytes", size)
+                images.append(spooled)
 
-            # Read the file data
-            image_data = await upload_file.read()
+            from .services.llm_vision import get_llm_vision_service, merge_suggestions
 
-            # Analyze with LLM
             llm_service = get_llm_vision_service()
-            suggestions = await llm_service.analyze_mushroom_image(image_data)
-
-            if suggestions:
-                self.llm_suggestions = suggestions
-                self.image_uploaded = True
-                print(
-                    f"✓ LLM analysis complete: {len(suggestions)} attributes identified"
-                )
-            else:
-                self.llm_error = (
-                    "Could not analyze the image. Please answer questions manually."
+            # Only look for attributes that can still change the verdict
+            open_attributes = get_rules_engine().get_open_attributes(self.answers)
+
+            # Instant estimates from the photos' colors, merged by vote like the
+            # model's suggestions
+            with span("image.color_prefill"):
+                color_suggestions = merge_suggestions(
+                    await asyncio.gather(
+                        *(
+                            asyncio.to_thread(extract_color_attributes, image, open_attributes)
+                            for image in images
+                        )
+                    )
                 )
+            self.llm_suggestions = {}
+            self.color_suggestions = color_suggestions
+            self.image_uploaded = bool(color_suggestions)
+
+            if not llm_service.is_enabled():
+                if not color_suggestions:
+                    self.llm_error = ANALYSIS_FAILED_MESSAGE
+                return
+
+            # Hand over to a background event so the estimates reach the
+            # browser now and the model's suggestions are pushed as they come
+            _sweep_pending_uploads()
+            upload_id = secrets.token_hex(8)
+            _pending_uploads[upload_id] = (
+                images,
+                open_attributes,
+                generation,
+                time.monotonic(),
+            )
+            handed_off = True
+            return MushroomExpertState.stream_image_analysis(upload_id)
 
+        except UploadTooLargeError as e:
+            self.llm_error = f"Error processing image: {str(e)}"
+            logger.warning("Rejected image upload: %s", e)
         except Exception as e:
             self.llm_error = f"Error processing image: {str(e)}"
-            print(f"✗ Error in handle_image_upload: {e}")
+            logger.exception("Error in handle_image_upload")
+        finally:
+            # The background event clears the flag and closes the spooled
+            # files once the analysis finishes
+            if not handed_off:
+                self.analyzing_image = False
+                _close_all(images)
+
+    @rx.event(background=True)
+    @timed(HANDLER_LATENCY.labels("stream_image_analysis"))
+    @traced("state.stream_image_analysis")
+    async def stream_image_analysis(self, upload_id: str):
+        """Push LLM suggestions into the state, replacing color estimates.
+
+        In streaming mode each attribute is applied as soon as it is decoded;
+        otherwise all of them are applied once the analysis completes. The
+        analysis is registered under the session so a reset or a new upload
+        can cancel it, and results from a superseded generation are dropped
+        rather than applied.
+        """
+        pending = _pending_uploads.pop(upload_id, None)
+        if pending is None:
+            # Swept after the TTL, or the upload reached another worker
+            logger.warning("No pending upload %s to analyze", upload_id)
+            async with self:
+                self.analyzing_image = False
+                self.llm_error = ANALYSIS_FAILED_MESSAGE
+            return
+        images, open_attributes, generation, _ = pending
+
+        from .services.llm_vision import get_llm_vision_service
+
+        llm_service = get_llm_vision_service()
+        session = self.router.session.client_token
+        task = asyncio.current_task()
+        _analysis_tasks[session] = task
+        count = 0
+        error = ""
+        try:
+            async with aclosing(
+                _llm_suggestions(llm_service, images, open_attributes)
+            ) as suggestions:
+                async for attribute, value in suggestions:
+                    async with self:
+                        if generation != self._analysis_generation:
+                            break
+                        self.llm_suggestions = {**self.llm_suggestions, attribute: value}
+                        if attribute in self.color_suggestions:
+                            self.color_suggestions = {
+                                attr: code
+                                for attr, code in self.color_suggestions.items()
+                                if attr != attribute
+                            }
+                        count += 1
+                        self.image_uploaded = True
+        except asyncio.CancelledError:
+            logger.info("Image analysis cancelled")
+            return
+        except Exception as e:
+            error = f"Error processing image: {str(e)}"
+            logger.exception("Error in stream_image_analysis")
         finally:
+            _close_all(images)
+            if _analysis_tasks.get(session) is task:
+                del _analysis_tasks[session]
+
+        async with self:
+            if generation != self._analysis_generation:
+                logger.info("Dropping superseded image analysis result")
+                return
             self.analyzing_image = False
+            if error:
+                self.llm_error = error
+            elif not self.llm_suggestions and not self.color_suggestions:
+                self.llm_error = ANALYSIS_FAILED_MESSAGE
+        logger.info("LLM analysis complete: %d attributes identified", count)
+
+    def _cancel_analysis(self):
+        """Supersede the session's current image analysis, cancelling it if running."""
+        self._analysis_generation += 1
+        task = _analysis_tasks.pop(self.router.session.client_token, None)
+        if task is not None and not task.done():
+            task.cancel()
 
     @rx.var
     def get_analyzing_status(self) -> bool:
         return self.analyzing_image
 
-    @rx.event
-    def apply_llm_suggestion(self, attribute: str):
-        """Apply an LLM suggestion for a specific attribute."""
-        if attribute in self.llm_suggestions:
-            suggested_value = self.llm_suggestions[attribute]
-
-            # Create new answers dict and add the suggestion
-            new_answers = dict(self.answers)
-            new_answers[attribute] = suggested_value
-            self.answers = new_answers
-
-            print(f"✓ Applied LLM suggestion: {attribute} = {suggested_value}")
-
-            # Check if we have a match with current answers
-            result = _clips_engine.check_rules(self.answers)
-
-            if result:
-                # We have a match!
-                target, rule_name, description = result
-                self.prediction = target
-                self.matched_rule = rule_name
-                self.rule_description = description
-                self.is_complete = True
-                print(f"✅ MATCH FOUND after LLM suggestion: {target} - {rule_name}")
-            else:
-                # Get next question
-                next_attr = _clips_engine.get_next_question(self.answers)
-                if next_attr:
-                    self.current_attribute = next_attr
-
-    @rx.event
-    def apply_all_llm_suggestions(self):
-        """Apply all LLM suggestions at once."""
-        if not self.llm_suggestions:
-            return
-
-        # Merge all suggestions into answers
-        new_answers = dict(self.answers)
-        new_answers.update(self.llm_suggestions)
-        self.answers = new_answers
-
-        # Mark suggestions as applied
-        self.llm_suggestions_applied = True
-
-        print(f"✓ Applied all {len(self.llm_suggestions)} LLM suggestions")
-
-        # Check if we have a match
-        result = _clips_engine.check_rules(self.answers)
-
-        if result:
-            # We have a match!
-            target, rule_name, description = result
-            self.prediction = target
-            self.matched_rule = rule_name
-            self.rule_description = description
-            self.is_complete = True
-            print(
-                f"✅ MATCH FOUND after applying all suggestions: {target} - {rule_name}"
-            )
-        else:
-            # Get next question for unanswered attributes
-            next_attr = _clips_engine.get_next_question(self.answers)
-            if next_attr:
-                self.current_attribute = next_attr
-            else:
-                # No more questions and no match
-                self.prediction = "unknown"
-                self.matched_rule = "No matching rule found"
-                self.rule_description = (
-                    "Unable to classify this mushroom with the available rules."
-                )
-                self.is_complete = True
-
     @rx.event
     def clear_llm_suggestions(self):
         """Clear LLM suggestions and uploaded image."""
+        self._cancel_analysis()
+        self.analyzing_image = False
         self.llm_suggestions = {}
+        self.color_suggestions = {}
         self.image_uploaded = False
         self.llm_error = ""
-        self.llm_suggestions_applied = False
 
     @rx.event
-    def handle_answer(self, form_data: dict[str, Any]):
-        """Handle form submission with an answer (matches form component call)."""
-        print("\n📝 handle_answer called")
-        print(f"   Form data: {form_data}")
-        print(f"   Current attribute: {self.current_attribute}")
-        print(f"   Current answers: {self.answers}")
-
-        if not self.current_attribute:
-            print("   ⚠️  No current attribute set!")
-            return
-
-        answer = form_data.get("answer", "")
-        if not answer:
-            print("   ⚠️  No answer in form data!")
-            return
-
-        print(f"   ✓ Answer received: {answer}")
-
-        # Store the answer - create new dict to trigger Reflex reactivity
-        new_answers = dict(self.answers)
-        new_answers[self.current_attribute] = answer
-        self.answers = new_answers
-        print(f"   ✓ Updated answers: {self.answers}")
-
-        # Check if any rule matches
-        result = _clips_engine.check_rules(self.answers)
-        print(f"   🔍 Rule check result: {result}")
-
-        if result:
-            # We have a match!
-            target, rule_name, description = result
-            self.prediction = target
-            self.matched_rule = rule_name
-            self.rule_description = description
-            self.is_complete = True
-            print(f"   ✅ MATCH FOUND: {target} - {rule_name}")
-        else:
-            # Get next question
-            next_attr = _clips_engine.get_next_question(self.answers)
-            print(f"   ➡️  Next question: {next_attr}")
-
-            if next_attr:
-                self.current_attribute = next_attr
-            else:
-                # No more questions and no match
-                self.prediction = "unknown"
-                self.matched_rule = "No matching rule found"
-                self.rule_description = (
-                    "Unable to classify this mushroom with the available rules."
-                )
-                self.is_complete = True
-                print("   ⚠️  No more questions and no match found")
-
-    # Alias for compatibility
-    handle_submit = handle_answer
+    def sync_answers(self, answers: dict[str, str]):
+        """Take over the answers kept in the browser, ahead of a photo analysis."""
+        try:
+            self.answers = validate_answers(answers)
+        except InvalidAnswersError as e:
+            logger.warning("Ignoring invalid answers from the browser: %s", e)
 
     @rx.event
+    @timed(HANDLER_LATENCY.labels("reset_form"))
+    @profiled("reset_form")
+    @traced("state.reset_form")
     def reset_form(self):
-        """Reset the expert system to start over."""
-        print("\n🔄 Resetting form...")
-        self.answers = {}
-        next_question = _clips_engine.get_next_question({})
-        self.current_attribute = next_question if next_question else "odor"
-        self.prediction = ""
-        self.matched_rule = ""
-        self.rule_description = ""
-        self.is_complete = False
-        self.llm_suggestions = {}
-        self.image_uploaded = False
-        self.llm_error = ""
-        self.analyzing_image = False
-        self.llm_suggestions_applied = False
-        print(f"   ✓ Reset complete. First question: {self.current_attribute}")
-
-    @rx.var
-    def get_current_question(self) -> str:
-        """Get the current question text."""
-        if self.current_attribute:
-            attr_info = get_attribute_info_i18n(self.current_attribute, self.t)
-            return attr_info["question"]
-        return ""
-
-    @rx.var
-    def get_current_options(self) -> list[tuple[str, str]]:
-        """Get options for the current question."""
-        if self.current_attribute:
-            attr_info = get_attribute_info_i18n(self.current_attribute, self.t)
-            return attr_info["options"]
-        return []
-
-    @rx.var
-    def get_current_description(self) -> str:
-        """Get the description for the current attribute."""
-        if self.current_attribute:
-            attr_info = get_attribute_info_i18n(self.current_attribute, self.t)
-            return attr_info.get("description", "")
-        return ""
-
-    @rx.var
-    def get_answered_count(self) -> int:
-        """Get number of questions answered."""
-        return len(self.answers)
-
-    @rx.var
-    def get_progress(self) -> str:
-        """Get progress information."""
-        total_answered = len(self.answers)
-        return f"Questions answered: {total_answered}"
-
-    @rx.var
-    def get_llm_suggestions_count(self) -> int:
-        """Get the number of LLM suggestions."""
-        return len(self.llm_suggestions)
-
-    # UI Text Translations
-    @rx.var
-    def ui_app_title(self) -> str:
-        return self.t("app.title")
-
-    @rx.var
-    def ui_app_subtitle(self) -> str:
-        return self.t("app.subtitle")
-
-    @rx.var
-    def ui_image_upload_title(self) -> str:
-        return self.t("image_upload.section_title")
-
-    @rx.var
-    def ui_image_upload_desc(self) -> str:
-        return self.t("image_upload.section_description")
-
-    @rx.var
-    def ui_button_upload(self) -> str:
-        return self.t("image_upload.button_upload")
-
-    @rx.var
-    def ui_drag_and_drop(self) -> str:
-        return self.t("image_upload.drag_and_drop")
-
-    @rx.var
-    def ui_button_analyze(self) -> str:
-        return self.t("image_upload.button_analyze")
-
-    @rx.var
-    def ui_analysis_complete(self) -> str:
-        return self.t("image_upload.analysis_complete", count=self.get_llm_suggestions_count)
-
-    @rx.var
-    def ui_ai_suggestions(self) -> str:
-        return self.t("image_upload.ai_suggestions")
-
-    @rx.var
-    def ui_button_apply(self) -> str:
-        return self.t("image_upload.button_apply")
-
-    @rx.var
-    def ui_button_apply_all(self) -> str:
-        return self.t("image_upload.button_apply_all")
-
-    @rx.var
-    def ui_button_upload_different(self) -> str:
-        return self.t("image_upload.button_upload_different")
-
-    @rx.var
-    def ui_suggestions_applied(self) -> str:
-        return self.t("image_upload.suggestions_applied")
-
-    @rx.var
-    def ui_fill_remaining(self) -> str:
-        return self.t("image_upload.fill_remaining")
-
-    @rx.var
-    def ui_ai_suggestion_available(self) -> str:
-        return self.t("question_form.ai_suggestion_available")
-
-    @rx.var
-    def ui_button_autofill(self) -> str:
-        return self.t("question_form.button_autofill")
-
-    @rx.var
-    def ui_button_submit(self) -> str:
-        return self.t("question_form.button_submit")
-
-    @rx.var
-    def ui_progress(self) -> str:
-        return self.t("question_form.progress", count=self.get_answered_count)
-
-    @rx.var
-    def ui_result_title(self) -> str:
-        return self.t("result.title")
-
-    @rx.var
-    def ui_result_edible(self) -> str:
-        return self.t("result.edible")
-
-    @rx.var
-    def ui_result_poisonous(self) -> str:
-        return self.t("result.poisonous")
-
-    @rx.var
-    def ui_result_unknown(self) -> str:
-        return self.t("result.unknown")
-
-    @rx.var
-    def ui_result_matched_rule(self) -> str:
-        return self.t("result.matched_rule", rule=self.matched_rule)
+        """Forget the synced answers and the photo analysis, to start over.
+
+        The browser clears its own answers; only vars that hold something are
+        assigned, so starting over from a fresh page sends no delta.
+        """
+        self._cancel_analysis()
+        if self.answers:
+            self.answers = {}
+        if self.llm_suggestions:
+            self.llm_suggestions = {}
+        if self.color_suggestions:
+            self.color_suggestions = {}
+        if self.image_uploaded:
+            self.image_uploaded = False
+        if self.analyzing_image:
+            self.analyzing_image = False
+        if self.llm_error:
+            self.llm_error = ""
 
     @rx.var
-    def ui_button_start_over(self) -> str:
-        return self.t("result.button_start_over")
+    def get_suggestions_count(self) -> int:
+        """Get the number of attributes suggested from the photo, by either source."""
+        return len(self.llm_suggestions) + len(self.color_suggestions)
@@ -0,0 +1,317 @@
+"""Lightweight in-process request tracing.
+
+Nested spans are tracked through a context variable, so spans opened inside
+an event handler (upload read, LLM call, validation, engine calls) become
+children of the handler's span, including across ``await``.
+
+Finished spans are batched and exported from a background thread, either as
+JSON lines to a local file or as OTLP/JSON to a local collector.
+
+Configuration via environment variables:
+    TRACING_EXPORTER: "jsonl", "otlp" or empty to disable (default: disabled)
+    TRACING_JSONL_PATH: Output file for the jsonl exporter (default: traces.jsonl)
+    TRACING_OTLP_ENDPOINT: OTLP/HTTP traces endpoint
+        (default: http://localhost:4318/v1/traces)
+
+When tracing is disabled ``span()`` returns a shared no-op span.
+"""
+
+import asyncio
+import atexit
+import contextvars
+import functools
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Protocol
+
+from .log import get_logger
+
+logger = get_logger("tracing")
+
+SERVICE_NAME = "canieatthemushroom"
+
+_current_span: contextvars.ContextVar["Span | None"] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+class Span:
+    """A timed operation, optionally nested under a parent span."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+        "_token",
+    )
+
+    def __init__(self, name: str, attributes: dict[str, Any] | None = None):
+        parent = _current_span.get()
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = 0
+        self.end_ns = 0
+        self.attributes = dict(attributes) if attributes else {}
+        self.error: str | None = None
+        self._token = None
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self.start_ns = time.time_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end_ns = time.time_ns()
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        if _processor is not None:
+            _processor.submit(self)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Stand-in returned by ``span()`` when tracing is disabled."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class SpanExporter(Protocol):
+    def export(self, spans: list[Span]) -> None: ...
+
+
+class JsonlExporter:
+    """Append finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+
+    def export(self, spans: list[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for finished in spans:
+                f.write(json.dumps(finished.to_dict(), default=str) + "\n")
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpHttpExporter:
+    """Send finished spans to an OTLP/HTTP collector using the JSON encoding."""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def _encode(self, spans: list[Span]) -> dict[str, Any]:
+        otlp_spans = []
+        for finished in spans:
+            otlp_span = {
+                "traceId": finished.trace_id,
+                "spanId": finished.span_id,
+                "name": finished.name,
+                "kind": 1,
+                "startTimeUnixNano": str(finished.start_ns),
+                "endTimeUnixNano": str(finished.end_ns),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)}
+                    for key, value in finished.attributes.items()
+                ],
+                "status": (
+                    {"code": 2, "message": finished.error}
+                    if finished.error
+                    else {"code": 1}
+                ),
+            }
+            if finished.parent_id:
+                otlp_span["parentSpanId"] = finished.parent_id
+            otlp_spans.append(otlp_span)
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {"key": "service.name", "value": _otlp_value(SERVICE_NAME)}
+                        ]
+                    },
+                    "scopeSpans": [{"scope": {"name": "app"}, "spans": otlp_spans}],
+                }
+            ]
+        }
+
+    def export(self, spans: list[Span]) -> None:
+        import httpx
+
+        response = httpx.post(self.endpoint, json=self._encode(spans), timeout=self.timeout)
+        response.raise_for_status()
+
+
+class _BatchProcessor:
+    """Queue finished spans and export them in batches on a daemon thread."""
+
+    def __init__(self, exporter: SpanExporter, max_batch: int = 256):
+        self.exporter = exporter
+        self.max_batch = max_batch
+        self._queue: queue.SimpleQueue[Span | None] = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._run, name="span-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, finished: Span) -> None:
+        self._queue.put(finished)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            stop = item is None
+            batch = [] if stop else [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            if batch:
+                try:
+                    self.exporter.export(batch)
+                except Exception as e:
+                    logger.warning("Failed to export %d span(s): %s", len(batch), e)
+            if stop:
+                return
+
+    def shutdown(self) -> None:
+        """Export everything queued so far and stop the worker thread."""
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+_processor: _BatchProcessor | None = None
+
+
+def configure_tracing(exporter: SpanExporter | None = None) -> None:
+    """Start exporting spans.
+
+    Args:
+        exporter: Exporter to use. If None, one is built from TRACING_EXPORTER;
+            tracing stays disabled when that is unset.
+    """
+    global _processor
+
+    if exporter is None:
+        kind = os.getenv("TRACING_EXPORTER", "").lower()
+        if kind == "jsonl":
+            exporter = JsonlExporter(os.getenv("TRACING_JSONL_PATH", "traces.jsonl"))
+        elif kind == "otlp":
+            exporter = OtlpHttpExporter(
+                os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+            )
+        elif kind:
+            logger.warning("Unknown TRACING_EXPORTER %r, tracing disabled", kind)
+
+    shutdown_tracing()
+    if exporter is not None:
+        _processor = _BatchProcessor(exporter)
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans and disable tracing."""
+    global _processor
+    if _processor is not None:
+        _processor.shutdown()
+        _processor = None
+
+
+atexit.register(shutdown_tracing)
+
+
+def tracing_enabled() -> bool:
+    return _processor is not None
+
+
+def span(name: str, **attributes: Any) -> Span | _NoopSpan:
+    """Open a span: ``with span("llm.generate_content", model=m): ...``."""
+    if _processor is None:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+def current_span() -> Span | None:
+    """Get the innermost open span in this context, if any."""
+    return _current_span.get()
+
+
+def traced(name: str) -> Callable:
+    """Decorator wrapping each call of a sync or async function in a span."""
+
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,103 @@
+import asyncio
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from app.services.llm_vision import LLMVisionService, MushroomAttributes
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "benchmark: wall-clock timing check, run with RUN_BENCHMARKS=1"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip timing benchmarks unless asked for, since they flake on loaded runners."""
+    if os.getenv("RUN_BENCHMARKS") == "1":
+        return
+    skip = pytest.mark.skip(reason="benchmark; set RUN_BENCHMARKS=1 to run")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def make_photo(color=(120, 80, 40), size=(64, 48), fmt="JPEG", **save_args) -> bytes:
+    """Build a small solid-colour image and return its encoded bytes."""
+    mode = "RGBA" if fmt == "PNG" and len(color) == 4 else "RGB"
+    output = io.BytesIO()
+    Image.new(mode, size, color).save(output, format=fmt, **save_args)
+    return output.getvalue()
+
+
+class FakeUpload:
+    """Stand-in for an uploaded file."""
+
+    def __init__(self, data, size=None):
+        self.data = data
+        self.size = size
+        self.position = 0
+
+    async def read(self, size=-1):
+        end = len(self.data) if size < 0 else self.position + size
+        chunk = self.data[self.position : end]
+        self.position += len(chunk)
+        return chunk
+
+
+class FakeGenaiClient:
+    """Stand-in for ``genai.Client`` that answers from a canned result."""
+
+    instances = 0
+
+    def __init__(self, **kwargs):
+        FakeGenaiClient.instances += 1
+        self.kwargs = kwargs
+        self.aio = self
+        self.models = self
+        self.calls = []
+        self.result = MushroomAttributes(cap_color="n")
+        self.delay = 0.0
+        self.closed = False
+
+    async def generate_content(self, **kwargs):
+        self.calls.append(kwargs)
+        result = self.result
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return type("Response", (), {"parsed": result})()
+
+    async def generate_content_stream(self, **kwargs):
+        self.calls.append(kwargs)
+        text = self.result.model_dump_json()
+
+        async def chunks():
+            # Split mid-token, the way streamed responses arrive
+            for i in range(0, len(text), 7):
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                yield type("Chunk", (), {"text": text[i : i + 7]})()
+
+        return chunks()
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_genai(monkeypatch):
+    """Fixture to route Gemini calls to an in-memory fake client."""
+    from google import genai
+
+    FakeGenaiClient.instances = 0
+    monkeypatch.setattr(genai, "Client", FakeGenaiClient)
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    return FakeGenaiClient
+
+
+@pytest.fixture
+def vision_service(fake_genai):
+    """Fixture to create an enabled LLMVisionService backed by the fake client."""
+    return LLMVisionService()
@@ -0,0 +1,127 @@
+"""Render the labelled color fixtures used to benchmark the color extractor.
+
+These are synthetic side-on mushroom photos, not real ones: a domed cap over
+a band of gills and a stalk with a ring, on a mottled ground. The framing
+(position, size, aspect), lighting, color of each part, sensor noise and
+JPEG quality vary per photo, and the shapes do not follow the extractor's
+REGIONS, so agreement measures how well it copes with framing and lighting
+drift, not its accuracy on real photos.
+
+Usage (from the repository root, rewrites the photos and labels.json):
+    python -m tests.fixtures.mushroom_colors.generate
+"""
+
+import io
+import json
+import random
+from pathlib import Path
+
+from PIL import Image, ImageChops, ImageDraw, ImageEnhance, ImageFilter
+
+from app.attributes import ATTRIBUTES
+from app.services.color_extractor import COLOR_REFERENCES
+
+FIXTURES_DIR = Path(__file__).parent
+PHOTO_COUNT = 24
+
+# Ground colors: moss, leaf litter, soil, dry grass
+GROUNDS = [(70, 95, 50), (105, 80, 50), (60, 45, 35), (150, 140, 90)]
+
+
+def _option_rgb(attr_name: str, rng: random.Random) -> tuple[str, tuple[int, int, int]]:
+    """Pick an option of a color attribute and a jittered color for it."""
+    options = ATTRIBUTES[attr_name]["options"]
+    code, label = rng.choice([option for option in options if option[1] in COLOR_REFERENCES])
+    rgb = tuple(
+        max(0, min(255, channel + rng.randint(-12, 12))) for channel in COLOR_REFERENCES[label]
+    )
+    return code, rgb
+
+
+def render_photo(rng: random.Random) -> tuple[bytes, dict[str, str]]:
+    """Render one photo and return its JPEG bytes and expected codes."""
+    width = rng.choice([240, 280, 320])
+    height = rng.choice([180, 210, 240])
+    ground = rng.choice(GROUNDS)
+    image = Image.new("RGB", (width, height), ground)
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.uniform(0, width), rng.uniform(0, height)
+        radius = rng.uniform(4, 18)
+        shade = rng.uniform(0.7, 1.3)
+        draw.ellipse(
+            (x - radius, y - radius, x + radius, y + radius),
+            fill=tuple(min(255, int(c * shade)) for c in ground),
+        )
+
+    labels, colors = {}, {}
+    for attr_name in (
+        "cap_color",
+        "gill_color",
+        "stalk_color_above_ring",
+        "stalk_color_below_ring",
+    ):
+        labels[attr_name], colors[attr_name] = _option_rgb(attr_name, rng)
+
+    # Framing: the mushroom drifts off center and changes size
+    cx = width * rng.uniform(0.45, 0.55)
+    scale = rng.uniform(0.9, 1.1)
+    top = height * rng.uniform(0.04, 0.1)
+
+    def y(fraction: float) -> float:
+        return top + fraction * height * scale
+
+    cap_half = width * 0.32 * scale
+    stalk_half = width * rng.uniform(0.06, 0.08) * scale
+    ring_y = y(rng.uniform(0.58, 0.64))
+
+    # Stalk, darker where the ring shades it
+    above, below = colors["stalk_color_above_ring"], colors["stalk_color_below_ring"]
+    draw.rectangle((cx - stalk_half, y(0.36), cx + stalk_half, ring_y), above)
+    draw.rectangle((cx - stalk_half, ring_y, cx + stalk_half, y(0.88)), below)
+    draw.ellipse(
+        (cx - stalk_half * 1.8, ring_y - 4, cx + stalk_half * 1.8, ring_y + 5),
+        fill=tuple(int(c * 0.85) for c in above),
+    )
+    # Gills: the underside of the cap with darker lines radiating from the stalk
+    gill_bottom = y(0.37)
+    draw.ellipse(
+        (cx - cap_half * 0.9, y(0.18), cx + cap_half * 0.9, gill_bottom),
+        fill=colors["gill_color"],
+    )
+    gill_line = tuple(int(c * 0.8) for c in colors["gill_color"])
+    for step in range(-8, 9):
+        draw.line((cx, gill_bottom, cx + step * cap_half / 9, y(0.26)), fill=gill_line)
+    # Cap: a dome with a highlight
+    draw.pieslice((cx - cap_half, y(0.0), cx + cap_half, y(0.56)), 180, 360, colors["cap_color"])
+    highlight = tuple(min(255, int(c * 1.08)) for c in colors["cap_color"])
+    draw.ellipse((cx - cap_half * 0.4, y(0.04), cx + cap_half * 0.1, y(0.12)), fill=highlight)
+
+    # Camera: lighting, focus, sensor noise and compression
+    image = ImageEnhance.Brightness(image).enhance(rng.uniform(0.9, 1.08))
+    image = image.filter(ImageFilter.GaussianBlur(rng.uniform(0.5, 1.2)))
+    amplitude = rng.randint(6, 14)
+    noise = Image.frombytes("L", (width, height), rng.randbytes(width * height))
+    noise = noise.point(lambda v: 128 + (v - 128) * amplitude // 128).convert("RGB")
+    image = ImageChops.add(image, noise, 1.0, -128)
+
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=rng.randint(65, 85))
+    return output.getvalue(), labels
+
+
+def main() -> None:
+    """Rewrite the fixture photos and their labels.json."""
+    rng = random.Random(42)
+    labels = {}
+    for index in range(PHOTO_COUNT):
+        data, expected = render_photo(rng)
+        filename = f"mushroom_{index:02d}.jpg"
+        (FIXTURES_DIR / filename).write_bytes(data)
+        labels[filename] = expected
+    (FIXTURES_DIR / "labels.json").write_text(json.dumps(labels, indent=2) + "\n")
+    print(f"Wrote {PHOTO_COUNT} photos to {FIXTURES_DIR}")
+
+
+if __name__ == "__main__":
+    main()
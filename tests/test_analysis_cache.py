@@ -0,0 +1,123 @@
+import asyncio
+import os
+import time
+
+from app.metrics import CACHE_LOOKUPS
+from app.services.analysis_cache import AnalysisCache, make_cache_key
+from tests.conftest import make_photo
+
+
+def test_key_depends_on_image_model_and_prompt():
+    """Test: Cache keys change with the image, the model or the prompt version."""
+    key = make_cache_key(b"image", "gemini-2.0-flash", "1")
+
+    assert key == make_cache_key(b"image", "gemini-2.0-flash", "1")
+    assert key != make_cache_key(b"other", "gemini-2.0-flash", "1")
+    assert key != make_cache_key(b"image", "gemini-1.5-pro", "1")
+    assert key != make_cache_key(b"image", "gemini-2.0-flash", "2")
+
+
+def test_memory_tier_evicts_least_recently_used():
+    """Test: The memory tier keeps only the most recently used entries."""
+    cache = AnalysisCache(max_entries=2)
+
+    async def run():
+        await cache.set("a", {"cap_color": "n"})
+        await cache.set("b", {"cap_color": "w"})
+        await cache.get("a")
+        await cache.set("c", {"cap_color": "y"})
+        return await cache.get("a"), await cache.get("b"), await cache.get("c")
+
+    a, b, c = asyncio.run(run())
+
+    assert a == {"cap_color": "n"}
+    assert b is None
+    assert c == {"cap_color": "y"}
+
+
+def test_expired_entries_are_misses():
+    """Test: Entries older than the TTL are not returned."""
+    cache = AnalysisCache(ttl_seconds=-1)
+
+    async def run():
+        await cache.set("a", {"cap_color": "n"})
+        return await cache.get("a")
+
+    assert asyncio.run(run()) is None
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    """Test: A fresh cache instance reads results written to disk."""
+    asyncio.run(AnalysisCache(disk_dir=tmp_path).set("ab12", {"odor": "n"}))
+
+    assert asyncio.run(AnalysisCache(disk_dir=tmp_path).get("ab12")) == {"odor": "n"}
+
+
+def test_disk_tier_evicts_oldest_over_size_cap(tmp_path):
+    """Test: The disk tier deletes the oldest entries once over its size cap."""
+    cache = AnalysisCache(disk_dir=tmp_path, max_disk_bytes=100)
+
+    async def run():
+        await cache.set("aa01", {"odor": "n"})
+        old = cache._disk_path("aa01")
+        os.utime(old, (time.time() - 60, time.time() - 60))
+        await cache.set("bb02", {"odor": "a"})
+        await cache.set("cc03", {"odor": "l"})
+
+    asyncio.run(run())
+
+    assert not cache._disk_path("aa01").exists()
+    assert cache._disk_path("cc03").exists()
+
+
+def test_disk_tier_scans_only_when_over_cap(tmp_path, monkeypatch):
+    """Test: Writes under the size cap keep a running total instead of rescanning."""
+    asyncio.run(AnalysisCache(disk_dir=tmp_path).set("aa01", {"odor": "n"}))
+    cache = AnalysisCache(disk_dir=tmp_path, max_disk_bytes=10_000)
+    scans = []
+    original_glob = type(tmp_path).glob
+
+    def counting_glob(self, pattern):
+        scans.append(pattern)
+        return original_glob(self, pattern)
+
+    monkeypatch.setattr(type(tmp_path), "glob", counting_glob)
+
+    async def run():
+        for index in range(20):
+            await cache.set(f"b{index:03d}", {"odor": "a"})
+
+    asyncio.run(run())
+
+    # One scan seeds the total, including the entry written by the other instance
+    assert len(scans) == 1
+    written = original_glob(tmp_path, "*/*.json")
+    assert cache._disk_bytes == sum(path.stat().st_size for path in written)
+
+
+def test_repeat_upload_served_from_cache(vision_service):
+    """Test: Analyzing the same image twice calls the model once."""
+    hits = CACHE_LOOKUPS.labels("llm_analysis", "hit")
+    hits_before = hits.get()
+
+    async def run():
+        first = await vision_service.analyze_mushroom_image(make_photo())
+        second = await vision_service.analyze_mushroom_image(make_photo())
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first == second == {"cap_color": "n"}
+    assert len(vision_service.backend._get_client().calls) == 1
+    assert hits.get() == hits_before + 1
+
+
+def test_cached_results_are_copies(vision_service):
+    """Test: Mutating a returned result does not corrupt the cache."""
+
+    async def run():
+        first = await vision_service.analyze_mushroom_image(make_photo())
+        first["cap_color"] = "changed"
+        return await vision_service.analyze_mushroom_image(make_photo())
+
+    assert asyncio.run(run()) == {"cap_color": "n"}
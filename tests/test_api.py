@@ -0,0 +1,193 @@
+import pytest
+from starlette.testclient import TestClient
+
+from app import api as api_module
+from app.api import api
+
+
+@pytest.fixture
+def client():
+    """Fixture to create a test client for the HTTP API."""
+    return TestClient(api)
+
+
+def test_classify_returns_verdict(client):
+    """Test: Answers that match a rule get its verdict and no next question."""
+    response = client.post("/api/classify", json={"answers": {"odor": "f"}})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["complete"] is True
+    assert body["verdict"] == "poisonous"
+    assert body["rule"]
+    assert body["description"]
+    assert body["next_question"] is None
+
+
+def test_classify_returns_localized_next_question(client):
+    """Test: Undecided answers get the next question in the requested locale."""
+    response = client.post("/api/classify", json={"answers": {}, "locale": "tr"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["complete"] is False
+    assert body["verdict"] is None
+    question = body["next_question"]
+    assert question["attribute"] == "odor"
+    assert question["question"]
+    assert {"code": "n", "label": "Yok", "href": None} in question["options"]
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"answers": {"odor": "zz"}},
+        {"answers": {"not_an_attribute": "n"}},
+        {"answers": {"odor": "n"}, "locale": "xx"},
+        {"answers": {"odor": 1}},
+        {"answers": {}, "unexpected": True},
+    ],
+)
+def test_classify_rejects_invalid_requests(client, payload):
+    """Test: Unknown attributes, codes, locales and fields are reported as 422."""
+    response = client.post("/api/classify", json=payload)
+
+    assert response.status_code == 422
+    assert response.json()["detail"]
+
+
+def test_classify_rejects_malformed_json(client):
+    """Test: A body that is not JSON is rejected, not a server error."""
+    response = client.post(
+        "/api/classify", content=b"{not json", headers={"content-type": "application/json"}
+    )
+
+    assert response.status_code == 422
+
+
+def test_classify_rejects_oversized_body(client, monkeypatch):
+    """Test: Bodies above the configured size are refused before parsing."""
+    monkeypatch.setattr(api_module, "CLASSIFY_MAX_BODY_BYTES", 16)
+
+    response = client.post("/api/classify", json={"answers": {"odor": "n"}})
+
+    assert response.status_code == 413
+
+
+def test_classify_batch_keeps_case_order(client):
+    """Test: Batch results line up with the cases and match single requests."""
+    cases = [{"odor": "f"}, {}, {"odor": "n", "stalk_shape": "t"}]
+
+    response = client.post("/api/classify/batch", json={"cases": cases})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results == [
+        client.post("/api/classify", json={"answers": answers}).json() for answers in cases
+    ]
+
+
+def test_classify_batch_enforces_size_limits(client):
+    """Test: Empty batches and batches above CLASSIFY_BATCH_MAX are rejected."""
+    too_many = [{}] * (api_module.CLASSIFY_BATCH_MAX + 1)
+
+    assert client.post("/api/classify/batch", json={"cases": []}).status_code == 422
+    assert client.post("/api/classify/batch", json={"cases": too_many}).status_code == 422
+
+
+def test_classify_batch_reports_invalid_case_index(client):
+    """Test: Validation errors name the offending case."""
+    response = client.post(
+        "/api/classify/batch", json={"cases": [{"odor": "n"}, {"odor": "zz"}]}
+    )
+
+    assert response.status_code == 422
+    assert "cases[1]" in response.text
+
+
+def test_classify_rejects_other_methods(client):
+    """Test: Classify takes POST or GET, the batch endpoint only POST."""
+    assert client.put("/api/classify", json={}).status_code == 405
+    assert client.get("/api/classify/batch").status_code == 405
+
+
+def test_classify_query_is_cacheable(client):
+    """Test: Answers in the URL get a verdict with HTTP cache headers."""
+    response = client.get("/api/classify?odor=n&stalk_root=e")
+
+    assert response.status_code == 200
+    assert response.json()["verdict"] == "edible"
+    assert response.json()["rule"] == "edible_odor_n_stalk_root_e"
+    assert response.headers["cache-control"] == "public, max-age=3600"
+    assert response.headers["etag"]
+
+
+def test_classify_query_revalidates_with_etag(client):
+    """Test: A matching If-None-Match gets 304 without a body."""
+    etag = client.get("/api/classify?odor=n").headers["etag"]
+
+    response = client.get("/api/classify?odor=n", headers={"if-none-match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+@pytest.mark.parametrize(
+    ("url", "canonical"),
+    [
+        ("/api/classify?stalk_root=e&odor=n", "/api/classify?odor=n&stalk_root=e"),
+        ("/api/classify?locale=tr&odor=n", "/api/classify?odor=n&locale=tr"),
+        ("/api/classify?odor=n&locale=en", "/api/classify?odor=n"),
+    ],
+)
+def test_classify_query_redirects_to_canonical_url(client, url, canonical):
+    """Test: Equal answer sets are redirected to one URL, so they share a cache entry."""
+    response = client.get(url, follow_redirects=False)
+
+    assert response.status_code == 308
+    assert response.headers["location"] == canonical
+
+
+def test_classify_query_links_next_answers(client):
+    """Test: Following an option link answers the question."""
+    first = client.get("/api/classify?locale=tr").json()["next_question"]
+    option = next(option for option in first["options"] if option["code"] == "n")
+    assert option["href"] == "/api/classify?odor=n&locale=tr"
+
+    second = client.get(option["href"], follow_redirects=False)
+
+    assert second.status_code == 200
+    assert second.json()["next_question"]["attribute"] != "odor"
+
+
+@pytest.mark.parametrize(
+    "query", ["odor=zz", "odor=n&odor=f", "unknown=n", "odor=n&locale=xx"]
+)
+def test_classify_query_rejects_invalid_answers(client, query):
+    """Test: Invalid or repeated answers in the URL are reported as 422."""
+    response = client.get(f"/api/classify?{query}")
+
+    assert response.status_code == 422
+    assert "cache-control" not in response.headers
+
+
+def test_root_redirects_to_preferred_locale(client):
+    """Test: "/" is redirected by Accept-Language before any page is served."""
+    response = client.get(
+        "/?odor=n", headers={"Accept-Language": "tr-TR,en;q=0.5"}, follow_redirects=False
+    )
+
+    assert response.status_code == 307
+    assert response.headers["location"] == "/tr?odor=n"
+    assert response.headers["vary"] == "Accept-Language"
+
+
+def test_root_passes_default_locale_through(client):
+    """Test: Browsers preferring the default locale get the root page itself."""
+    response = client.get("/", headers={"Accept-Language": "en-US"}, follow_redirects=False)
+
+    # No page is mounted in the test app, so the request falls through to a 404
+    assert response.status_code == 404
+    # It still depends on Accept-Language, so shared caches must key on it
+    assert response.headers["vary"] == "Accept-Language"
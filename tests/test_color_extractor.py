@@ -0,0 +1,121 @@
+import io
+import json
+import time
+
+import pytest
+from PIL import Image, ImageDraw
+
+from app.attributes import ATTRIBUTES
+from app.services.color_extractor import (
+    FIXTURES_DIR,
+    REGIONS,
+    extract_color_attributes,
+    main,
+    nearest_code,
+)
+from tests.conftest import make_photo
+
+
+@pytest.fixture(scope="module")
+def labelled_photos():
+    """The synthetic labelled fixture photos as (bytes, expected codes) pairs."""
+    labels = json.loads((FIXTURES_DIR / "labels.json").read_text())
+    return [((FIXTURES_DIR / name).read_bytes(), expected) for name, expected in labels.items()]
+
+
+def make_region_photo(colors, size=(400, 300)) -> bytes:
+    """Build a photo with each region of REGIONS painted in its own color."""
+    image = Image.new("RGB", size, (128, 128, 128))
+    draw = ImageDraw.Draw(image)
+    width, height = size
+    for attr_name, color in colors.items():
+        left, top, right, bottom = REGIONS[attr_name]
+        draw.rectangle((left * width, top * height, right * width, bottom * height), fill=color)
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=95)
+    return output.getvalue()
+
+
+def test_nearest_code_maps_to_valid_options():
+    """Test: Colors map to the closest option the attribute actually has."""
+    assert nearest_code("cap_color", (125, 70, 40)) == "n"
+    assert nearest_code("gill_color", (25, 25, 25)) == "k"
+    # No cap color option is anywhere near blue
+    assert nearest_code("cap_color", (20, 40, 220)) is None
+    for attr_name in REGIONS:
+        codes = {code for code, _ in ATTRIBUTES[attr_name]["options"]}
+        assert nearest_code(attr_name, (240, 240, 235)) in codes
+
+
+def test_each_attribute_is_read_from_its_region():
+    """Test: Each attribute comes from its own region (plumbing, not accuracy)."""
+    photo = make_region_photo(
+        {
+            "cap_color": (190, 40, 40),
+            "gill_color": (25, 25, 25),
+            "stalk_color_above_ring": (230, 200, 50),
+            "stalk_color_below_ring": (230, 130, 40),
+        }
+    )
+
+    assert extract_color_attributes(photo) == {
+        "cap_color": "e",
+        "gill_color": "k",
+        "stalk_color_above_ring": "y",
+        "stalk_color_below_ring": "o",
+    }
+
+
+@pytest.mark.parametrize("attr_name", list(REGIONS))
+def test_agreement_with_fixture_labels(labelled_photos, attr_name):
+    """Test: Most fixture photos get their labelled color, despite framing and lighting drift.
+
+    The fixtures are synthetic renders (see tests/fixtures/mushroom_colors/generate.py),
+    so this guards against regressions, not accuracy on real photos.
+    """
+    agree = sum(
+        extract_color_attributes(data).get(attr_name) == expected[attr_name]
+        for data, expected in labelled_photos
+    )
+
+    assert agree / len(labelled_photos) >= 0.7
+
+
+def test_benchmark_reports_agreement_per_attribute(tmp_path, capsys):
+    """Test: The benchmark reads a labelled photo directory and scores each attribute."""
+    (tmp_path / "white.jpg").write_bytes(make_photo(color=(240, 240, 235)))
+    labels = {"white.jpg": {"cap_color": "w", "gill_color": "n"}}
+    (tmp_path / "labels.json").write_text(json.dumps(labels))
+
+    main([str(tmp_path)])
+
+    out = capsys.readouterr().out
+    assert "1 images" in out
+    assert "cap_color" in out and "100%" in out
+    assert any(line.startswith("gill_color") and line.endswith("0%") for line in out.splitlines())
+
+
+@pytest.mark.benchmark
+def test_extraction_is_fast(labelled_photos):
+    """Test: Extraction takes milliseconds, so it can run before the model."""
+    photos = [data for data, _ in labelled_photos]
+    photos += [make_photo(color=(40 * i, 120, 80), size=(1600, 1200)) for i in range(5)]
+    start = time.perf_counter()
+    for data in photos:
+        extract_color_attributes(data)
+    per_image = (time.perf_counter() - start) / len(photos)
+
+    assert per_image < 0.05
+
+
+def test_only_requested_attributes_are_extracted():
+    """Test: Attributes outside the requested set are not suggested."""
+    suggestions = extract_color_attributes(make_photo(), {"cap_color", "odor"})
+
+    assert set(suggestions) == {"cap_color"}
+    assert extract_color_attributes(make_photo(), {"odor"}) == {}
+
+
+def test_invalid_image_gives_no_suggestions():
+    """Test: Undecodable data yields no suggestions instead of an error."""
+    assert extract_color_attributes(b"not an image") == {}
@@ -0,0 +1,66 @@
+import pytest
+
+from app.engines.clips_engine import CLIPSRulesEngine, clips_available
+from app.engines.rules_engine import RulesEngine
+
+
+@pytest.fixture
+def engine():
+    """Fixture to create the Python rules engine."""
+    return RulesEngine()
+
+
+def test_open_attributes_start_with_every_rule_attribute(engine):
+    """Test: Before any answer, every attribute used by a rule is open."""
+    expected = {attr for rule in engine.rules for attr in rule.conditions}
+
+    assert engine.get_open_attributes({}) == expected
+
+
+def test_open_attributes_drop_ruled_out_conditions(engine):
+    """Test: Attributes only used by rules that can no longer fire are closed."""
+    open_attrs = engine.get_open_attributes({"odor": "n", "cap_color": "w"})
+
+    assert "odor" not in open_attrs
+    # Only reachable through edible_gill_spacing_w_cap_color_n (needs cap_color=n)
+    assert "gill_spacing" not in open_attrs
+    # Still completes edible_odor_n_stalk_shape_t
+    assert "stalk_shape" in open_attrs
+
+
+@pytest.mark.skipif(not clips_available, reason="clipspy not installed")
+def test_clips_rule_conditions_match_python_rules(engine):
+    """Test: Conditions parsed from rules.CLP agree with the Python rule set."""
+    clips_engine = CLIPSRulesEngine()
+
+    assert clips_engine.rule_conditions == {r.name: r.conditions for r in engine.rules}
+    for answers in ({}, {"odor": "n"}, {"odor": "n", "stalk_root": "b"}):
+        assert clips_engine.get_open_attributes(answers) == engine.get_open_attributes(
+            answers
+        )
+
+
+@pytest.mark.parametrize(
+    "engine_factory",
+    [
+        RulesEngine,
+        pytest.param(
+            CLIPSRulesEngine,
+            marks=pytest.mark.skipif(not clips_available, reason="clipspy not installed"),
+        ),
+    ],
+)
+def test_check_rules_batch_matches_single_checks(engine_factory):
+    """Test: A batch run gives the same match per case as checking them one by one."""
+    batch_engine = engine_factory()
+    cases = [
+        {},
+        {"odor": "f"},
+        {"odor": "n", "stalk_shape": "t"},
+        {"odor": "n", "cap_color": "w"},
+        {"odor": "a"},
+    ]
+
+    assert batch_engine.check_rules_batch(cases) == [
+        batch_engine.check_rules(answers) for answers in cases
+    ]
@@ -0,0 +1,94 @@
+import json
+import random
+import shutil
+import subprocess
+
+import pytest
+
+from app.attributes import ATTRIBUTE_OPTION_CODES
+from app.components.client_flow import URL_SYNC_FUNCTION_JS
+from app.engines.clips_engine import clips_available
+from app.flow_bundle import STEP_FUNCTION_JS, build_bundle, next_step
+from app.services.classification import answers_query, classify
+
+pytestmark = pytest.mark.skipif(not clips_available, reason="clipspy not installed")
+
+
+def random_answers(count: int, seed: int = 0) -> list[dict[str, str]]:
+    """Random partial answer sets over every attribute."""
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(count):
+        attributes = rng.sample(sorted(ATTRIBUTE_OPTION_CODES), rng.randrange(15))
+        cases.append(
+            {attr: rng.choice(ATTRIBUTE_OPTION_CODES[attr]) for attr in attributes}
+        )
+    return cases
+
+
+def test_bundle_steps_like_the_engine():
+    """Test: Evaluating the bundle gives the engine's verdict, rule and next question."""
+    bundle = build_bundle()
+
+    for answers in random_answers(2000):
+        result = classify(answers)
+        step = next_step(bundle, answers)
+        assert (step["verdict"], step["rule"], step["description"], step["attribute"]) == (
+            result.verdict,
+            result.rule,
+            result.description,
+            result.next_attribute,
+        ), answers
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_browser_step_function_matches_python():
+    """Test: STEP_FUNCTION_JS evaluates the bundle exactly like next_step."""
+    bundle = build_bundle()
+    cases = random_answers(500, seed=1)
+    script = (
+        f"const step = {STEP_FUNCTION_JS};"
+        "const {bundle, cases} = JSON.parse(require('fs').readFileSync(0, 'utf8'));"
+        "console.log(JSON.stringify(cases.map((answers) => step(bundle, answers))));"
+    )
+
+    output = subprocess.run(
+        ["node", "-e", script],
+        input=json.dumps({"bundle": bundle, "cases": cases}),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    assert json.loads(output) == [next_step(bundle, answers) for answers in cases]
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_url_sync_writes_canonical_answers():
+    """Test: The browser writes answers to the URL like the API's canonical query."""
+    answers = {"stalk_root": "e", "odor": "n", "cap_color": "w"}
+    script = (
+        "globalThis.window = {"
+        "  location: {pathname: '/tr', search: '?odor=f&profile=1', hash: '#top'},"
+        "  history: {state: {key: 1}, replaceState(state, title, url) {"
+        "    console.log(JSON.stringify({state, url}));"
+        "  }},"
+        "};"
+        f"const sync = {URL_SYNC_FUNCTION_JS};"
+        "const answers = JSON.parse(require('fs').readFileSync(0, 'utf8'));"
+        "if (sync(answers) !== answers) throw new Error('answers not returned');"
+    )
+
+    output = subprocess.run(
+        ["node", "-e", script],
+        input=json.dumps(answers),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    assert json.loads(output) == {
+        "state": {"key": 1},
+        "url": f"/tr?{answers_query(answers)}&profile=1#top",
+    }
+
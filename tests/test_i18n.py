@@ -0,0 +1,182 @@
+import json
+import os
+
+import pytest
+
+from app.attributes import ATTRIBUTE_OPTION_CODES, get_attribute_info_i18n
+from app.i18n import (
+    AVAILABLE_LANGUAGES,
+    TRANSLATIONS_DIR,
+    FormatTemplate,
+    find_missing_translations,
+    find_unknown_options,
+    flatten_translations,
+    get_attribute_catalog,
+    load_translations,
+    negotiate_locale,
+    static_t,
+    translate,
+)
+
+
+@pytest.mark.parametrize("locale", list(AVAILABLE_LANGUAGES))
+def test_catalog_matches_per_call_translation(locale):
+    """Test: The precomputed catalog holds what per-call translation returns."""
+    translations = load_translations(locale)
+    catalog = get_attribute_catalog(locale)
+
+    assert set(catalog) == set(ATTRIBUTE_OPTION_CODES)
+    for attr_name, entry in catalog.items():
+        info = get_attribute_info_i18n(
+            attr_name, lambda key, **params: translate(translations, key, **params)
+        )
+        assert entry.question == info["question"]
+        assert entry.description == info["description"]
+        assert list(entry.options) == info["options"]
+
+
+def test_catalog_is_built_once_and_read_only():
+    """Test: A locale's catalog is shared and cannot be modified."""
+    catalog = get_attribute_catalog("tr")
+
+    assert get_attribute_catalog("tr") is catalog
+    assert catalog["odor"].question != get_attribute_catalog("en")["odor"].question
+    with pytest.raises(TypeError):
+        catalog["odor"] = None
+    with pytest.raises(AttributeError):
+        catalog["odor"].question = "?"
+
+
+def test_translate_formats_parameters_and_falls_back_to_key():
+    """Test: Parameters are formatted in and unknown keys translate to themselves."""
+    translations = flatten_translations({"form": {"progress": "Answered: {count}"}})
+
+    assert translate(translations, "form.progress", count=3) == "Answered: 3"
+    assert translate(translations, "form.progress") == "Answered: {count}"
+    assert translate(translations, "form.progress", total=3) == "Answered: {count}"
+    assert translate(translations, "missing.key") == "missing.key"
+
+
+def test_translations_are_flattened_and_precompiled():
+    """Test: Loaded tables are keyed by dotted path, with templates pre-parsed."""
+    table = flatten_translations(
+        {"app": {"title": "Hi", "count": 3, "greeting": "Hello {name}", "none": None}}
+    )
+
+    assert table["app.title"] == "Hi"
+    assert table["app.count"] == "3"
+    assert "app.none" not in table
+    assert isinstance(table["app.greeting"], FormatTemplate)
+    assert table["app.greeting"].fields == {"name"}
+    assert "app.title" in load_translations("en")
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("tr-TR,tr;q=0.9,en;q=0.8", "tr"),
+        ("de-DE,tr;q=0.8,en;q=0.5", "tr"),
+        ("en;q=0.2,tr;q=0.7", "tr"),
+        ("tr;q=0,en", "en"),
+        ("de, fr", "en"),
+        ("", "en"),
+        (None, "en"),
+        ("tr;q=abc", "en"),
+    ],
+)
+def test_negotiate_locale(header, expected):
+    """Test: Accept-Language picks the most preferred available locale."""
+    assert negotiate_locale(header) == expected
+
+
+def test_static_t_formats_vars_into_compiled_text():
+    """Test: Compile-time translations embed state vars for the client to fill in."""
+    from app.state import MushroomExpertState
+
+    text = static_t(
+        "tr", "image_upload.analysis_complete", count=MushroomExpertState.get_suggestions_count
+    )
+
+    assert text.startswith("Resim analiz edildi! ")
+    assert "get_suggestions_count" in text
+
+
+@pytest.mark.parametrize("locale", list(AVAILABLE_LANGUAGES))
+def test_shipped_translations_are_complete(locale):
+    """Test: Every attribute question, description and option code is translated."""
+    translations = load_translations(locale)
+
+    assert find_missing_translations(translations) == []
+    assert find_unknown_options(translations) == []
+
+
+def test_completeness_check_reports_option_mismatches():
+    """Test: Option labels are cross-checked against the attribute option codes."""
+    translations = dict(load_translations("en"))
+    del translations["attributes.odor.options.f"]
+    translations["attributes.odor.options.zz"] = "Unknown"
+
+    assert find_missing_translations(translations) == ["attributes.odor.options.f"]
+    assert find_unknown_options(translations) == ["attributes.odor.options.zz"]
+
+
+@pytest.fixture
+def translations_dir(tmp_path, monkeypatch):
+    """A private translations directory, reloaded on every load."""
+    from app import i18n
+
+    monkeypatch.setattr(i18n, "TRANSLATIONS_DIR", tmp_path)
+    monkeypatch.setattr(i18n, "TRANSLATIONS_RELOAD_SECONDS", 0)
+    for cache in ("_translations_cache", "_catalog_cache", "_file_versions", "_last_checked"):
+        monkeypatch.setattr(i18n, cache, {})
+    return tmp_path
+
+
+def write_translations(path, title):
+    english = json.loads((TRANSLATIONS_DIR / "en.json").read_text(encoding="utf-8"))
+    english["app"]["title"] = title
+    path.write_text(json.dumps(english), encoding="utf-8")
+    # Make sure the change is visible even on coarse mtime filesystems
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_changed_file_is_reloaded(translations_dir):
+    """Test: Editing a translation file takes effect without a restart."""
+    en_file = translations_dir / "en.json"
+    write_translations(en_file, "First")
+    catalog = get_attribute_catalog("en")
+
+    assert translate(load_translations("en"), "app.title") == "First"
+    assert load_translations("en") is load_translations("en")
+
+    write_translations(en_file, "Second")
+
+    assert translate(load_translations("en"), "app.title") == "Second"
+    assert get_attribute_catalog("en") is not catalog
+
+
+def test_catalog_picks_up_changed_file(translations_dir):
+    """Test: The attribute catalog, used by the API, follows file edits on its own."""
+    en_file = translations_dir / "en.json"
+    write_translations(en_file, "First")
+    english = json.loads(en_file.read_text(encoding="utf-8"))
+    assert get_attribute_catalog("en")["odor"].question == english["attributes"]["odor"]["question"]
+
+    english["attributes"]["odor"]["question"] = "Smell?"
+    en_file.write_text(json.dumps(english), encoding="utf-8")
+    stat = en_file.stat()
+    os.utime(en_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert get_attribute_catalog("en")["odor"].question == "Smell?"
+
+
+def test_broken_edit_keeps_last_good_table(translations_dir):
+    """Test: A file that fails to parse does not replace the loaded table."""
+    en_file = translations_dir / "en.json"
+    write_translations(en_file, "Good")
+    load_translations("en")
+
+    en_file.write_text("{ not json", encoding="utf-8")
+
+    assert translate(load_translations("en"), "app.title") == "Good"
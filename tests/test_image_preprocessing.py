@@ -0,0 +1,89 @@
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+
+from app.services.image_preprocessing import prepare_image, preprocess_image
+from tests.conftest import make_photo
+
+
+def open_prepared(prepared):
+    """Helper function to decode the bytes of a prepared image."""
+    return Image.open(io.BytesIO(prepared.data))
+
+
+def test_png_detected_and_reencoded_as_jpeg():
+    """Test: PNG uploads are detected and sent as JPEG with a matching MIME type."""
+    prepared = preprocess_image(make_photo(fmt="PNG"))
+
+    assert prepared.source_format == "PNG"
+    assert prepared.mime_type == "image/jpeg"
+    assert open_prepared(prepared).format == "JPEG"
+
+
+def test_large_image_downscaled_to_max_edge():
+    """Test: Large photos are resized so the longest edge fits the limit."""
+    prepared = preprocess_image(make_photo(size=(4000, 3000)), max_edge=1000)
+
+    assert (prepared.width, prepared.height) == (1000, 750)
+    assert open_prepared(prepared).size == (1000, 750)
+
+
+def test_small_image_not_upscaled():
+    """Test: Images already under the limit keep their size."""
+    prepared = preprocess_image(make_photo(size=(64, 48)), max_edge=1000)
+
+    assert (prepared.width, prepared.height) == (64, 48)
+
+
+def test_exif_stripped_and_orientation_applied():
+    """Test: EXIF metadata is removed after applying its orientation."""
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90° clockwise
+    exif[0x010F] = "PhoneMaker"  # Make
+    photo = make_photo(size=(80, 40), exif=exif.tobytes())
+
+    prepared = preprocess_image(photo)
+    decoded = open_prepared(prepared)
+
+    assert decoded.size == (40, 80)
+    assert not decoded.getexif()
+
+
+def test_transparency_flattened_onto_white():
+    """Test: Transparent pixels become white instead of black."""
+    prepared = preprocess_image(make_photo(color=(0, 0, 0, 0), fmt="PNG"))
+
+    r, g, b = open_prepared(prepared).getpixel((10, 10))
+    assert min(r, g, b) > 240
+
+
+def test_non_image_rejected():
+    """Test: Bytes that are not a supported image raise ValueError."""
+    with pytest.raises(ValueError):
+        preprocess_image(b"definitely not an image")
+
+    with pytest.raises(ValueError):
+        preprocess_image(make_photo(fmt="GIF"))
+
+
+def test_prepare_image_runs_off_event_loop():
+    """Test: The async wrapper returns the same result as the sync function."""
+    photo = make_photo(size=(300, 200))
+
+    prepared = asyncio.run(prepare_image(photo))
+
+    assert prepared == preprocess_image(photo)
+
+
+def test_model_receives_preprocessed_jpeg(vision_service):
+    """Test: The model call gets re-encoded JPEG bytes, not the raw upload."""
+    photo = make_photo(size=(3000, 2000), fmt="PNG")
+
+    asyncio.run(vision_service.analyze_mushroom_image(photo))
+
+    (call,) = vision_service.backend._get_client().calls
+    part = call["contents"][1]
+    assert part.inline_data.mime_type == "image/jpeg"
+    assert len(part.inline_data.data) < len(photo)
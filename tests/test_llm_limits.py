@@ -0,0 +1,186 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from google.genai import errors
+
+from app.metrics import LLM_REJECTIONS, LLM_RETRIES
+from app.services.llm_limits import (
+    LLMCallLimiter,
+    LLMOverloadedError,
+    TokenBucket,
+    is_transient_error,
+)
+from tests.conftest import make_photo
+
+
+def api_error(code):
+    """Helper function to build a Gemini API error with a status code."""
+    return errors.APIError(code, {"error": {"message": "boom", "status": "X"}})
+
+
+@pytest.fixture
+def limited_service(vision_service):
+    """Fixture to give the vision service a small, fast limiter."""
+    vision_service.limiter = LLMCallLimiter(
+        max_concurrency=2,
+        queue_timeout=5,
+        rate_per_minute=60_000,
+        max_attempts=3,
+        deadline=5,
+    )
+    return vision_service
+
+
+def test_transient_error_classification():
+    """Test: Rate limits, server and network errors are retried; bad requests are not."""
+    assert is_transient_error(api_error(429))
+    assert is_transient_error(api_error(503))
+    assert is_transient_error(httpx.ConnectError("refused"))
+    assert not is_transient_error(api_error(400))
+    assert not is_transient_error(ValueError("bad"))
+
+
+def test_token_bucket_paces_after_burst():
+    """Test: Once the burst is spent, acquisitions wait for the refill rate."""
+    bucket = TokenBucket(rate_per_second=50, capacity=2)
+
+    async def take(n):
+        start = time.perf_counter()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.perf_counter() - start
+
+    # Two tokens are free, the next three need ~20ms each
+    assert asyncio.run(take(5)) >= 0.05
+
+
+def test_concurrency_is_capped(limited_service):
+    """Test: No more model calls run at once than the limiter allows."""
+    client = limited_service.backend._get_client()
+    client.delay = 0.05
+    in_flight = peak = 0
+    original = client.generate_content
+
+    async def tracking_generate(**kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            return await original(**kwargs)
+        finally:
+            in_flight -= 1
+
+    client.generate_content = tracking_generate
+
+    async def burst():
+        photos = [make_photo(color=(i, 0, 0)) for i in range(6)]
+        return await asyncio.gather(
+            *(limited_service.analyze_mushroom_image(p) for p in photos)
+        )
+
+    results = asyncio.run(burst())
+
+    assert all(r == {"cap_color": "n"} for r in results)
+    assert peak == 2
+
+
+def test_transient_errors_are_retried(limited_service):
+    """Test: A 429 followed by success yields suggestions after a retry."""
+    client = limited_service.backend._get_client()
+    original = client.generate_content
+    failures = [api_error(429)]
+    retries_before = LLM_RETRIES.get()
+
+    async def flaky_generate(**kwargs):
+        if failures:
+            raise failures.pop()
+        return await original(**kwargs)
+
+    client.generate_content = flaky_generate
+    limited_service.limiter.retrying = lambda: _fast_retrying(limited_service.limiter)
+
+    suggestions = asyncio.run(limited_service.analyze_mushroom_image(make_photo()))
+
+    assert suggestions == {"cap_color": "n"}
+    assert LLM_RETRIES.get() == retries_before + 1
+
+
+def test_permanent_errors_are_not_retried(limited_service):
+    """Test: A 400 fails immediately and degrades to no suggestions."""
+    client = limited_service.backend._get_client()
+    attempts = 0
+
+    async def rejecting_generate(**kwargs):
+        nonlocal attempts
+        attempts += 1
+        raise api_error(400)
+
+    client.generate_content = rejecting_generate
+
+    assert asyncio.run(limited_service.analyze_mushroom_image(make_photo())) == {}
+    assert attempts == 1
+
+
+def test_queue_timeout_rejects_call(limited_service):
+    """Test: Calls that cannot get a slot in time are shed, not queued forever."""
+    limiter = limited_service.limiter
+    limiter.queue_timeout = 0.01
+    rejections = LLM_REJECTIONS.labels("queue_timeout")
+    before = rejections.get()
+
+    async def run():
+        async with limiter.slot(), limiter.slot():
+            with pytest.raises(LLMOverloadedError):
+                async with limiter.slot():
+                    pass
+
+    asyncio.run(run())
+
+    assert rejections.get() == before + 1
+
+
+def test_deadline_bounds_slow_calls(limited_service):
+    """Test: A model call slower than the deadline returns no suggestions."""
+    limited_service.backend._get_client().delay = 1
+    limited_service.limiter.deadline = 0.05
+
+    start = time.perf_counter()
+    suggestions = asyncio.run(limited_service.analyze_mushroom_image(make_photo()))
+
+    assert suggestions == {}
+    assert time.perf_counter() - start < 0.5
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_deadline_covers_queueing(limited_service, streaming):
+    """Test: Time waiting for a slot counts against the deadline on both paths."""
+    limiter = LLMCallLimiter(max_concurrency=1, queue_timeout=5, deadline=0.05)
+    limited_service.limiter = limiter
+    deadlines = LLM_REJECTIONS.labels("deadline")
+    before = deadlines.get()
+
+    async def run():
+        # Another call holds the only slot for longer than the deadline
+        async with limiter.slot():
+            if streaming:
+                stream = limited_service.stream_mushroom_image(make_photo())
+                return dict([item async for item in stream])
+            return await limited_service.analyze_mushroom_image(make_photo())
+
+    start = time.perf_counter()
+    suggestions = asyncio.run(run())
+
+    assert suggestions == {}
+    assert time.perf_counter() - start < 0.5
+    assert deadlines.get() == before + 1
+
+
+def _fast_retrying(limiter):
+    """Helper function to retry without real backoff sleeps."""
+    from tenacity import wait_none
+
+    retrying = LLMCallLimiter.retrying(limiter)
+    retrying.wait = wait_none()
+    return retrying
@@ -0,0 +1,291 @@
+import asyncio
+import time
+
+import pytest
+
+from app.metrics import LLM_LATENCY, LLM_REQUESTS
+from app.services.llm_vision import (
+    MushroomAttributes,
+    StreamingAttributeParser,
+    build_analysis_prompt,
+    build_response_schema,
+    merge_suggestions,
+    normalize_attributes,
+)
+from tests.conftest import make_photo
+
+
+def test_client_created_once_and_reused(vision_service, fake_genai):
+    """Test: Repeated analyses share a single long-lived client."""
+
+    async def analyze_three():
+        for i in range(3):
+            await vision_service.analyze_mushroom_image(make_photo(color=(i, i, i)))
+
+    asyncio.run(analyze_three())
+
+    assert fake_genai.instances == 1
+    assert len(vision_service.backend._get_client().calls) == 3
+
+
+def test_slow_analysis_does_not_block_event_loop(vision_service):
+    """Test: Other coroutines keep running while the model call is in flight."""
+    vision_service.backend._get_client().delay = 0.2
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        await vision_service.analyze_mushroom_image(make_photo())
+        ticking.cancel()
+        return ticks
+
+    assert asyncio.run(run()) >= 10
+
+
+def test_invalid_codes_are_dropped(vision_service):
+    """Test: Attribute values outside the known codes are discarded."""
+    vision_service.backend._get_client().result = MushroomAttributes(
+        cap_color="n", gill_color="not-a-code"
+    )
+
+    suggestions = asyncio.run(vision_service.analyze_mushroom_image(make_photo()))
+
+    assert suggestions == {"cap_color": "n"}
+
+
+def test_aclose_releases_client(vision_service):
+    """Test: Closing the service closes the shared client."""
+    client = vision_service.backend._get_client()
+
+    asyncio.run(vision_service.aclose())
+
+    assert client.closed
+    assert vision_service.backend._client is None
+
+
+def test_concurrent_identical_uploads_share_one_call(vision_service):
+    """Test: N identical uploads in flight at once produce one model call."""
+    client = vision_service.backend._get_client()
+    client.delay = 0.05
+    photo = make_photo()
+
+    async def upload_many():
+        return await asyncio.gather(
+            *(vision_service.analyze_mushroom_image(photo) for _ in range(5))
+        )
+
+    results = asyncio.run(upload_many())
+
+    assert results == [{"cap_color": "n"}] * 5
+    assert len(client.calls) == 1
+    assert vision_service._inflight == {}
+
+
+def test_cancelled_caller_does_not_cancel_shared_call(vision_service):
+    """Test: A caller giving up leaves the shared call running for the others."""
+    client = vision_service.backend._get_client()
+    client.delay = 0.05
+    photo = make_photo()
+
+    async def run():
+        impatient = asyncio.create_task(vision_service.analyze_mushroom_image(photo))
+        patient = asyncio.create_task(vision_service.analyze_mushroom_image(photo))
+        await asyncio.sleep(0.02)
+        impatient.cancel()
+        return await patient
+
+    assert asyncio.run(run()) == {"cap_color": "n"}
+    assert len(client.calls) == 1
+
+
+def test_targeted_prompt_and_schema(vision_service):
+    """Test: Only the requested attributes appear in the prompt and schema."""
+    client = vision_service.backend._get_client()
+    client.result = MushroomAttributes(cap_color="n", gill_color="k")
+
+    suggestions = asyncio.run(
+        vision_service.analyze_mushroom_image(make_photo(), {"gill_color", "odor"})
+    )
+
+    call = client.calls[0]
+    prompt = call["contents"][0]
+    schema = call["config"]["response_schema"]
+    assert "gill_color:" in prompt and "odor:" in prompt
+    assert "cap_color:" not in prompt
+    assert list(schema.model_fields) == ["odor", "gill_color"]
+    assert suggestions == {"gill_color": "k"}
+
+
+def test_targeted_prompt_and_schema_are_cached():
+    """Test: The same attribute set reuses one prompt string and one schema class."""
+    first = normalize_attributes(["odor", "cap_color"])
+    second = normalize_attributes({"cap_color", "odor", "not_an_attribute"})
+
+    assert first == second
+    assert build_analysis_prompt(first) is build_analysis_prompt(second)
+    assert build_response_schema(first) is build_response_schema(second)
+    assert build_response_schema(normalize_attributes(None)) is MushroomAttributes
+
+
+def test_no_open_attributes_skips_model(vision_service):
+    """Test: With nothing left to ask, the model is not called."""
+    assert asyncio.run(vision_service.analyze_mushroom_image(make_photo(), set())) == {}
+    assert vision_service.backend._get_client().calls == []
+
+
+def test_streaming_parser_handles_split_chunks():
+    """Test: Pairs are emitted once complete, however the text is split."""
+    parser = StreamingAttributeParser()
+
+    emitted = []
+    for chunk in ['{"cap_co', 'lor": "n', '", "odor": nu', 'll, "gill_color"', ': "k"}']:
+        emitted.append(parser.feed(chunk))
+
+    assert emitted == [[], [], [("cap_color", "n")], [], [("gill_color", "k")]]
+
+
+def test_streaming_yields_suggestions_before_response_completes(vision_service):
+    """Test: The first suggestion arrives while the stream is still running."""
+    client = vision_service.backend._get_client()
+    client.result = MushroomAttributes(cap_color="n", gill_color="not-a-code", habitat="w")
+    client.delay = 0.005
+    first_suggestion = LLM_LATENCY.labels("first_suggestion")
+    before = first_suggestion.count
+
+    async def collect():
+        return [item async for item in vision_service.stream_mushroom_image(make_photo())]
+
+    received = asyncio.run(collect())
+
+    # Response field order, with the invalid gill_color dropped
+    assert received == [("habitat", "w"), ("cap_color", "n")]
+    assert first_suggestion.count == before + 1
+    assert first_suggestion.sum < LLM_LATENCY.labels("analyze").sum
+
+
+def test_streamed_result_is_cached(vision_service):
+    """Test: A completed stream is cached and replayed without a model call."""
+    photo = make_photo()
+
+    async def stream_twice():
+        first = [item async for item in vision_service.stream_mushroom_image(photo)]
+        second = [item async for item in vision_service.stream_mushroom_image(photo)]
+        return first, second
+
+    first, second = asyncio.run(stream_twice())
+
+    assert first == second == [("cap_color", "n")]
+    assert len(vision_service.backend._get_client().calls) == 1
+
+
+def test_stopped_stream_leaves_waiters_a_full_result(vision_service):
+    """Test: A session joining a stream still gets every suggestion if the first stops."""
+    client = vision_service.backend._get_client()
+    client.result = MushroomAttributes(cap_color="n", habitat="w")
+    client.delay = 0.01
+    photo = make_photo()
+
+    async def collect():
+        return [item async for item in vision_service.stream_mushroom_image(photo)]
+
+    async def run():
+        first = asyncio.create_task(collect())
+        while not client.calls:
+            await asyncio.sleep(0.005)
+        second = asyncio.create_task(collect())
+        await asyncio.sleep(0.005)
+        # The first session resets before its stream has finished
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        received = await second
+        return received, await collect()
+
+    received, again = asyncio.run(run())
+
+    assert dict(received) == dict(again) == {"cap_color": "n", "habitat": "w"}
+    # The second session made the call itself, and the third was served from cache
+    assert len(client.calls) == 2
+    assert vision_service._inflight == {} and vision_service._waiters == {}
+
+
+def test_last_caller_leaving_cancels_call(vision_service):
+    """Test: Cancelling the only caller cancels the model call and frees its slot."""
+    client = vision_service.backend._get_client()
+    client.delay = 1
+    limiter = vision_service.limiter
+    cancelled = LLM_REQUESTS.labels("cancelled")
+    before = cancelled.get()
+
+    async def run():
+        caller = asyncio.create_task(vision_service.analyze_mushroom_image(make_photo()))
+        while not client.calls:
+            await asyncio.sleep(0.005)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+
+    assert cancelled.get() == before + 1
+    assert limiter._semaphore._value == limiter.max_concurrency
+    assert vision_service._inflight == {} and vision_service._waiters == {}
+
+
+def test_merge_suggestions_by_vote():
+    """Test: The most common value wins, ties go to the earliest photo."""
+    merged = merge_suggestions(
+        [
+            {"cap_color": "n", "gill_color": "k"},
+            {"cap_color": "w", "stalk_root": "b"},
+            {"cap_color": "w", "gill_color": "n"},
+        ]
+    )
+
+    assert merged == {"cap_color": "w", "gill_color": "k", "stalk_root": "b"}
+
+
+def test_multiple_photos_analyzed_concurrently(vision_service):
+    """Test: Photos are analyzed in parallel and their suggestions merged."""
+    client = vision_service.backend._get_client()
+    client.delay = 0.1
+    results = iter(
+        [
+            MushroomAttributes(cap_color="n"),
+            MushroomAttributes(cap_color="n", gill_color="k"),
+            MushroomAttributes(cap_color="w", habitat="w"),
+        ]
+    )
+    original = client.generate_content
+
+    async def varied_generate(**kwargs):
+        client.result = next(results)
+        return await original(**kwargs)
+
+    client.generate_content = varied_generate
+    photos = [make_photo(color=(80 * i, 10, 10)) for i in range(3)]
+
+    start = time.perf_counter()
+    merged = asyncio.run(vision_service.analyze_mushroom_images(photos))
+
+    assert time.perf_counter() - start < 0.25
+    assert merged == {"cap_color": "n", "gill_color": "k", "habitat": "w"}
+
+
+def test_multiple_photos_streamed_and_merged(vision_service):
+    """Test: Streaming several photos yields each merged attribute."""
+    photos = [make_photo(color=(80 * i, 10, 10)) for i in range(2)]
+
+    async def collect():
+        return [item async for item in vision_service.stream_mushroom_images(photos)]
+
+    assert asyncio.run(collect()) == [("cap_color", "n")]
+    assert len(vision_service.backend._get_client().calls) == 2
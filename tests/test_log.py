@@ -0,0 +1,66 @@
+import json
+import logging
+
+from app.log import DebugSamplingFilter, JsonFormatter, get_logger
+
+
+def make_record(level=logging.DEBUG, msg="message", args=(), **extra):
+    """Helper function to build a log record with extra fields."""
+    record = logging.LogRecord("app.test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_extra_fields():
+    """Test: Extra fields are emitted alongside the message."""
+    record = make_record(msg="Match found", target="edible", rule="edible_odor_a")
+    payload = json.loads(JsonFormatter().format(record))
+
+    assert payload["msg"] == "Match found"
+    assert payload["logger"] == "app.test"
+    assert payload["target"] == "edible"
+    assert payload["rule"] == "edible_odor_a"
+
+
+def test_sampling_drops_debug_only():
+    """Test: A zero sample rate drops DEBUG records but keeps INFO and above."""
+    sampling = DebugSamplingFilter(0.0)
+
+    assert not sampling.filter(make_record(logging.DEBUG))
+    assert sampling.filter(make_record(logging.INFO))
+    assert sampling.filter(make_record(logging.WARNING))
+
+
+def test_sampling_keeps_all_at_full_rate():
+    """Test: A sample rate of 1.0 keeps every DEBUG record."""
+    sampling = DebugSamplingFilter(1.0)
+
+    assert all(sampling.filter(make_record(logging.DEBUG)) for _ in range(100))
+
+
+def test_disabled_debug_does_not_format_arguments():
+    """Test: Debug arguments are never rendered when DEBUG is disabled."""
+
+    class Expensive:
+        rendered = 0
+
+        def __str__(self):
+            Expensive.rendered += 1
+            return "expensive"
+
+    logger = get_logger("engine")
+    previous = logger.level
+    logger.setLevel(logging.INFO)
+    try:
+        logger.debug("facts: %s", Expensive())
+    finally:
+        logger.setLevel(previous)
+
+    assert Expensive.rendered == 0
+
+
+def test_subsystem_loggers_share_app_namespace():
+    """Test: Subsystem loggers live under the app logger."""
+    assert get_logger("engine").name == "app.engine"
+    assert get_logger("state").name == "app.state"
+    assert get_logger("llm").name.startswith("app.")
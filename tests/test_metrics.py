@@ -0,0 +1,110 @@
+import asyncio
+import timeit
+
+import pytest
+from starlette.testclient import TestClient
+
+from app.api import api
+from app.metrics import (
+    ENGINE_LATENCY,
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+    timed,
+)
+
+
+@pytest.fixture
+def registry():
+    """Fixture to create an isolated metrics registry."""
+    return Registry()
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    """Test: Histogram buckets count observations less than or equal to the bound."""
+    histogram = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert histogram.labels().buckets() == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+    assert histogram.labels().count == 4
+    assert histogram.labels().sum == pytest.approx(2.65)
+
+
+def test_render_prometheus_text(registry):
+    """Test: Metrics render in the Prometheus text exposition format."""
+    counter = Counter("requests_total", "Requests.", ["outcome"], registry=registry)
+    gauge = Gauge("inflight", "In flight.", registry=registry)
+    histogram = Histogram("op_seconds", "Op.", ["op"], buckets=(1.0,), registry=registry)
+    counter.labels("success").inc(3)
+    gauge.set(2)
+    histogram.labels("check").observe(0.5)
+
+    text = registry.render()
+
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{outcome="success"} 3' in text
+    assert "inflight 2" in text
+    assert 'op_seconds_bucket{op="check",le="1"} 1' in text
+    assert 'op_seconds_bucket{op="check",le="+Inf"} 1' in text
+    assert 'op_seconds_count{op="check"} 1' in text
+
+
+def test_gauge_function_evaluated_at_scrape(registry):
+    """Test: Callback gauges report the value at render time."""
+    depth = [0]
+    gauge = Gauge("pool_depth", "Depth.", registry=registry)
+    gauge.set_function(lambda: depth[0])
+    depth[0] = 7
+
+    assert "pool_depth 7" in registry.render()
+
+
+def test_timed_records_sync_and_async_calls(registry):
+    """Test: The timed decorator records both sync and async calls."""
+    histogram = Histogram("call_seconds", "Calls.", ["kind"], registry=registry)
+
+    @timed(histogram.labels("sync"))
+    def sync_call():
+        return 1
+
+    @timed(histogram.labels("async"))
+    async def async_call():
+        return 2
+
+    assert sync_call() == 1
+    assert asyncio.run(async_call()) == 2
+    assert histogram.labels("sync").count == 1
+    assert histogram.labels("async").count == 1
+
+
+def test_labels_require_all_names(registry):
+    """Test: Labelled metrics reject the wrong number of label values."""
+    counter = Counter("labelled_total", "Labelled.", ["a", "b"], registry=registry)
+
+    with pytest.raises(ValueError):
+        counter.labels("only-one")
+
+
+@pytest.mark.benchmark
+def test_observe_overhead_under_one_microsecond(registry):
+    """Benchmark: Recording a histogram sample costs less than 1µs."""
+    child = Histogram("bench_seconds", "Bench.", ["op"], registry=registry).labels("x")
+    number = 100_000
+
+    best = min(timeit.repeat(lambda: child.observe(0.003), number=number, repeat=5))
+    per_sample_us = best / number * 1e6
+
+    assert per_sample_us < 1.0, f"observe() took {per_sample_us:.3f}µs per sample"
+
+
+def test_metrics_endpoint_serves_engine_latency():
+    """Test: The /metrics endpoint exposes engine latency histograms."""
+    ENGINE_LATENCY.labels("check_rules").observe(0.001)
+
+    response = TestClient(api).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'mushroom_engine_seconds_count{operation="check_rules"}' in response.text
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from app import profiling
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    """Fixture to send dumped profiles to a temporary directory."""
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(profiling, "PROFILE_MIN_MS", 0.0)
+    return tmp_path
+
+
+def test_disabled_profiling_returns_function_unchanged(monkeypatch):
+    """Test: With profiling off the decorator adds no wrapper at all."""
+    monkeypatch.setattr(profiling, "PROFILE_REQUESTS", False)
+    monkeypatch.setattr(profiling, "PROFILE_QUERY_FLAG", False)
+
+    def handler():
+        return 1
+
+    assert profiling.profiled("handler")(handler) is handler
+
+
+def test_profile_dumped_with_event_name_and_timing(profile_dir, monkeypatch):
+    """Test: Each profiled call writes a .prof file named after the event."""
+    monkeypatch.setattr(profiling, "PROFILE_REQUESTS", True)
+
+    @profiling.profiled("handle_image_upload")
+    def handler():
+        return sum(range(1000))
+
+    assert handler() == 499500
+
+    dumped = list(profile_dir.glob("*.prof"))
+    assert len(dumped) == 1
+    assert "-handle_image_upload-" in dumped[0].name
+    assert dumped[0].name.endswith("ms.prof")
+
+
+def test_async_handler_profiled(profile_dir, monkeypatch):
+    """Test: Async event handlers are profiled too."""
+    monkeypatch.setattr(profiling, "PROFILE_REQUESTS", True)
+
+    @profiling.profiled("handle_image_upload")
+    async def handler():
+        await asyncio.sleep(0)
+        return "done"
+
+    assert asyncio.run(handler()) == "done"
+    assert len(list(profile_dir.glob("*-handle_image_upload-*.prof"))) == 1
+
+
+def test_session_flag_opts_in_single_session(profile_dir, monkeypatch):
+    """Test: With the query flag enabled only opted-in sessions are profiled."""
+    monkeypatch.setattr(profiling, "PROFILE_REQUESTS", False)
+    monkeypatch.setattr(profiling, "PROFILE_QUERY_FLAG", True)
+
+    class FakeState:
+        def __init__(self, opted_in):
+            self._profile_requests = opted_in
+
+    @profiling.profiled("handle_image_upload")
+    def handler(state):
+        return state
+
+    handler(FakeState(False))
+    assert list(profile_dir.glob("*.prof")) == []
+
+    handler(FakeState(True))
+    assert len(list(profile_dir.glob("*.prof"))) == 1
+
+
+def test_nested_calls_share_one_profile(profile_dir, monkeypatch):
+    """Test: Engine calls inside a profiled handler do not start a second profiler."""
+    monkeypatch.setattr(profiling, "PROFILE_REQUESTS", True)
+
+    @profiling.profiled("engine.check_rules")
+    def engine_call():
+        return None
+
+    @profiling.profiled("handle_image_upload")
+    def handler():
+        engine_call()
+
+    handler()
+
+    dumped = list(profile_dir.glob("*.prof"))
+    assert len(dumped) == 1
+    assert "-handle_image_upload-" in dumped[0].name
+
+
+def test_query_parameter_parsing(monkeypatch):
+    """Test: ?profile=1 is only honoured when the query flag is enabled."""
+    monkeypatch.setattr(profiling, "PROFILE_QUERY_FLAG", False)
+    assert not profiling.session_requested_profiling({"profile": "1"})
+
+    monkeypatch.setattr(profiling, "PROFILE_QUERY_FLAG", True)
+    assert profiling.session_requested_profiling({"profile": "1"})
+    assert not profiling.session_requested_profiling({})
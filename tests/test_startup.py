@@ -0,0 +1,44 @@
+import subprocess
+import sys
+
+from app.startup import IMPORT_BUDGET_MS, PROJECT_ROOT, import_time_ms
+
+
+def run_python(code: str) -> str:
+    """Run code in a fresh interpreter and return its stdout."""
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=PROJECT_ROOT,
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip().splitlines()[-1]
+
+
+def test_cold_import_within_budget():
+    """Test: Cold import of the app package stays within the startup budget."""
+    elapsed = import_time_ms("app.app")
+
+    assert elapsed > 0
+    assert elapsed < IMPORT_BUDGET_MS, (
+        f"Cold import took {elapsed:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms). "
+        "Run `python -m app.startup` to see the slowest modules."
+    )
+
+
+def test_llm_stack_not_imported_at_startup():
+    """Test: Importing the app does not load the LLM vision service."""
+    loaded = run_python(
+        "import sys, app.app; print('app.services.llm_vision' in sys.modules)"
+    )
+    assert loaded == "False"
+
+
+def test_engine_not_built_at_startup():
+    """Test: Importing the app does not build the rules engine."""
+    built = run_python(
+        "import app.app; from app.engines import clips_engine; "
+        "print(clips_engine._rules_engine is not None)"
+    )
+    assert built == "False"
@@ -0,0 +1,332 @@
+import asyncio
+
+import pytest
+from reflex import constants
+from reflex.istate.data import RouterData
+from reflex.state import State
+
+from app.i18n import AVAILABLE_LANGUAGES, get_attribute_catalog, load_translations
+from app.metrics import HANDLER_LATENCY
+from app.services.llm_vision import MushroomAttributes
+from app.state import MushroomExpertState
+from tests.conftest import FakeUpload, make_photo
+
+
+@pytest.fixture
+def expert_state():
+    """Fixture to create a MushroomExpertState inside a fresh state tree."""
+    root = State(_reflex_internal_init=True)
+    state = root.get_substate(MushroomExpertState.get_full_name().split(".")[1:])
+    state.on_load()
+    return state
+
+
+def test_sync_answers_takes_browser_answers(expert_state):
+    """Test: Answers given in the browser reach the server before a photo analysis."""
+    MushroomExpertState.sync_answers.fn(expert_state, {"odor": "n", "stalk_root": "b"})
+
+    assert expert_state.answers == {"odor": "n", "stalk_root": "b"}
+
+
+def test_sync_answers_ignores_invalid_answers(expert_state):
+    """Test: Answers naming unknown attributes or codes are not taken over."""
+    MushroomExpertState.sync_answers.fn(expert_state, {"odor": "n"})
+    MushroomExpertState.sync_answers.fn(expert_state, {"odor": "zz"})
+
+    assert expert_state.answers == {"odor": "n"}
+
+
+def test_handlers_record_latency(expert_state):
+    """Test: Event handlers record their latency."""
+    before = HANDLER_LATENCY.labels("reset_form").count
+
+    MushroomExpertState.reset_form.fn(expert_state)
+
+    assert HANDLER_LATENCY.labels("reset_form").count == before + 1
+
+
+def test_reset_form_clears_upload_state(expert_state):
+    """Test: Starting over forgets the synced answers and the photo analysis."""
+    MushroomExpertState.sync_answers.fn(expert_state, {"odor": "n"})
+    expert_state.llm_suggestions = {"cap_color": "n"}
+    expert_state.image_uploaded = True
+
+    MushroomExpertState.reset_form.fn(expert_state)
+
+    assert expert_state.answers == {}
+    assert expert_state.llm_suggestions == {}
+    assert not expert_state.image_uploaded
+
+
+def test_reset_form_leaves_clean_vars_alone(expert_state):
+    """Test: Starting over from a fresh page sends no delta."""
+    root = expert_state.parent_state
+    root._clean()
+
+    MushroomExpertState.reset_form.fn(expert_state)
+
+    assert root.get_delta() == {}
+
+
+class BackgroundProxy:
+    """Stand-in for Reflex's StateProxy, recording suggestions on each update."""
+
+    def __init__(self, state):
+        object.__setattr__(self, "_state", state)
+        object.__setattr__(self, "updates", [])
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.updates.append(
+            (dict(self._state.llm_suggestions), dict(self._state.color_suggestions))
+        )
+
+    def __getattr__(self, name):
+        return getattr(self._state, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._state, name, value)
+
+
+def test_upload_streams_suggestions_in_background(expert_state, vision_service, monkeypatch):
+    """Test: Streaming mode pushes suggestions into the state one at a time."""
+    from app import state as state_module
+    from app.services import llm_vision
+
+    monkeypatch.setattr(llm_vision, "_llm_vision_service", vision_service)
+    vision_service.backend._get_client().result = MushroomAttributes(cap_color="n", habitat="w")
+
+    asyncio.run(
+        MushroomExpertState.handle_image_upload.fn(
+            expert_state, [FakeUpload(make_photo(color=(240, 240, 235)))]
+        )
+    )
+    assert expert_state.analyzing_image
+    assert expert_state.color_suggestions["cap_color"] == "w"
+    assert expert_state.llm_suggestions == {}
+    (upload_id,) = state_module._pending_uploads
+
+    proxy = BackgroundProxy(expert_state)
+    asyncio.run(MushroomExpertState.stream_image_analysis.fn(proxy, upload_id))
+
+    # Model suggestions arrive one at a time; each replaces the color estimate
+    # for its attribute, and the other estimates stay apart
+    assert [len(llm) for llm, _ in proxy.updates[:2]] == [1, 2]
+    assert expert_state.llm_suggestions == {"cap_color": "n", "habitat": "w"}
+    assert "cap_color" not in expert_state.color_suggestions
+    assert expert_state.color_suggestions["gill_color"] == "w"
+    assert expert_state.image_uploaded
+    assert not expert_state.analyzing_image
+    assert state_module._pending_uploads == {}
+
+
+def test_reset_cancels_streaming_analysis(expert_state, vision_service, monkeypatch):
+    """Test: Starting over cancels the running analysis and drops its results."""
+    from app import state as state_module
+    from app.services import llm_vision
+
+    monkeypatch.setattr(llm_vision, "_llm_vision_service", vision_service)
+    client = vision_service.backend._get_client()
+    client.result = MushroomAttributes(cap_color="n", habitat="w")
+    client.delay = 0.05
+
+    async def run():
+        await MushroomExpertState.handle_image_upload.fn(
+            expert_state, [FakeUpload(make_photo())]
+        )
+        (upload_id,) = state_module._pending_uploads
+        proxy = BackgroundProxy(expert_state)
+        streaming = asyncio.create_task(
+            MushroomExpertState.stream_image_analysis.fn(proxy, upload_id)
+        )
+        while not client.calls:
+            await asyncio.sleep(0.005)
+        MushroomExpertState.reset_form.fn(expert_state)
+        await streaming
+
+    asyncio.run(run())
+
+    limiter = vision_service.limiter
+    assert expert_state.llm_suggestions == {}
+    assert not expert_state.analyzing_image
+    assert state_module._analysis_tasks == {}
+    assert limiter._semaphore._value == limiter.max_concurrency
+
+
+def test_oversized_upload_is_rejected(expert_state, vision_service, monkeypatch):
+    """Test: An upload over the byte cap is refused without calling the model."""
+    from app.services import llm_vision
+
+    monkeypatch.setattr(llm_vision, "_llm_vision_service", vision_service)
+    too_large = FakeUpload(make_photo(), size=10**9)
+
+    asyncio.run(MushroomExpertState.handle_image_upload.fn(expert_state, [too_large]))
+
+    assert "limit" in expert_state.llm_error
+    assert not expert_state.analyzing_image
+    assert too_large.position == 0
+    assert vision_service.backend._get_client().calls == []
+
+
+def test_upload_shows_color_estimates_first(expert_state, vision_service, monkeypatch):
+    """Test: Color estimates are shown, apart from the model's suggestions, before it answers."""
+    from app import state as state_module
+    from app.services import llm_vision
+
+    monkeypatch.setattr(llm_vision, "_llm_vision_service", vision_service)
+
+    asyncio.run(
+        MushroomExpertState.handle_image_upload.fn(
+            expert_state, [FakeUpload(make_photo(color=(240, 240, 235)))]
+        )
+    )
+
+    assert expert_state.color_suggestions["cap_color"] == "w"
+    assert expert_state.llm_suggestions == {}
+    assert expert_state.image_uploaded
+    assert expert_state.analyzing_image
+    assert vision_service.backend._get_client().calls == []
+    state_module._pending_uploads.clear()
+
+
+def test_abandoned_uploads_are_swept(expert_state, vision_service, monkeypatch):
+    """Test: Uploads whose analysis never starts are closed once they expire."""
+    from app import state as state_module
+    from app.services import llm_vision
+
+    monkeypatch.setattr(llm_vision, "_llm_vision_service", vision_service)
+    monkeypatch.setattr(state_module, "_pending_uploads", {})
+
+    asyncio.run(
+        MushroomExpertState.handle_image_upload.fn(expert_state, [FakeUpload(make_photo())])
+    )
+    ((abandoned_id, (abandoned, *_)),) = state_module._pending_uploads.items()
+
+    monkeypatch.setattr(state_module, "PENDING_UPLOAD_TTL_SECONDS", 0)
+    asyncio.run(
+        MushroomExpertState.handle_image_upload.fn(expert_state, [FakeUpload(make_photo())])
+    )
+
+    assert all(image.closed for image in abandoned)
+    assert len(state_module._pending_uploads) == 1
+
+    # An analysis started too late tells the user instead of ending silently
+    proxy = BackgroundProxy(expert_state)
+    asyncio.run(MushroomExpertState.stream_image_analysis.fn(proxy, abandoned_id))
+    assert expert_state.llm_error == state_module.ANALYSIS_FAILED_MESSAGE
+    assert not expert_state.analyzing_image
+
+
+def test_upload_without_llm_uses_color_suggestions(expert_state, vision_service, monkeypatch):
+    """Test: With the model disabled, the color extractor is the only source."""
+    from app import state as state_module
+    from app.services import llm_vision
+
+    vision_service.enabled = False
+    monkeypatch.setattr(llm_vision, "_llm_vision_service", vision_service)
+
+    asyncio.run(
+        MushroomExpertState.handle_image_upload.fn(
+            expert_state, [FakeUpload(make_photo(color=(240, 240, 235)))]
+        )
+    )
+
+    assert expert_state.color_suggestions["gill_color"] == "w"
+    assert expert_state.llm_suggestions == {}
+    assert expert_state.image_uploaded
+    assert not expert_state.analyzing_image
+    assert state_module._pending_uploads == {}
+
+
+def test_set_locale_opens_the_locale_page(expert_state):
+    """Test: Switching language sets the locale and goes to that locale's page."""
+    event = MushroomExpertState.set_locale.fn(expert_state, "tr")
+
+    assert expert_state.locale == "tr"
+    assert '"/tr"' in str(event.args)
+
+
+def load_page(state, path, accept_language=""):
+    """Run on_load as if the browser opened ``path``."""
+    state.router = RouterData.from_router_data(
+        {
+            constants.RouteVar.HEADERS: {
+                "origin": "http://localhost:3000",
+                "accept_language": accept_language,
+            },
+            constants.RouteVar.ORIGIN: path,
+            constants.RouteVar.PATH: path,
+        }
+    )
+    return state.on_load()
+
+
+def test_root_page_negotiates_locale(expert_state):
+    """Test: The root page picks the browser's language and redirects to its page."""
+    event = load_page(expert_state, "/", "tr-TR,tr;q=0.9,en;q=0.5")
+
+    assert expert_state.locale == "tr"
+    assert '"/tr"' in str(event.args)
+    assert load_page(expert_state, "/", "de-DE") is None
+    assert expert_state.locale == "en"
+
+
+def test_locale_page_fixes_locale(expert_state):
+    """Test: A locale page uses its own locale whatever the browser prefers."""
+    assert load_page(expert_state, "/tr", "en-US") is None
+    assert expert_state.locale == "tr"
+
+
+def test_answers_in_url_seed_the_browser_flow(expert_state, monkeypatch):
+    """Test: With ANSWERS_IN_URL on, answers in the page URL become the starting answers."""
+    from app import state as state_module
+
+    monkeypatch.setattr(state_module, "ANSWERS_IN_URL", True)
+    event = load_page(expert_state, "/en?stalk_root=e&profile=1&odor=n", "en-US")
+
+    assert '["odor"] : "n"' in str(event.args)
+    assert '["stalk_root"] : "e"' in str(event.args)
+    assert load_page(expert_state, "/en?odor=zz", "en-US") is None
+
+
+def test_answers_in_url_are_ignored_by_default(expert_state):
+    """Test: Answers in the URL are only used when ANSWERS_IN_URL is on."""
+    assert load_page(expert_state, "/en?odor=n", "en-US") is None
+
+
+def test_locale_redirect_keeps_answers_in_url(expert_state):
+    """Test: Redirecting to the browser's locale page keeps the answers."""
+    event = load_page(expert_state, "/?odor=n", "tr-TR")
+
+    assert '"/tr?odor=n"' in str(event.args)
+
+
+def _delta_strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _delta_strings(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _delta_strings(item)
+
+
+def test_ui_text_stays_out_of_deltas():
+    """Test: UI text is compiled into the pages, so no delta of a UI event carries it."""
+    from app.delta_report import replay_session
+
+    deltas = replay_session()
+    events = [delta.event for delta in deltas]
+    translated = {
+        str(text) for locale in AVAILABLE_LANGUAGES for text in load_translations(locale).values()
+    }
+
+    assert {"sync_answers", "image_upload", "stream_update", "clear_suggestions"} <= set(events)
+    for delta in deltas:
+        assert translated.isdisjoint(_delta_strings(delta.delta)), delta.event
+    assert all(delta.vars <= 4 for delta in deltas if delta.event == "stream_update")
+    sync = next(delta for delta in deltas if delta.event == "sync_answers")
+    assert sync.vars == 1
@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+import pytest
+
+from app import tracing
+from tests.conftest import make_photo
+
+
+class CollectingExporter:
+    """Exporter that keeps finished spans in memory."""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+@pytest.fixture
+def exporter():
+    """Fixture to enable tracing with an in-memory exporter."""
+    collecting = CollectingExporter()
+    tracing.configure_tracing(collecting)
+    yield collecting
+    tracing.shutdown_tracing()
+
+
+def finished_spans(exporter):
+    """Flush the exporter thread and return spans keyed by name."""
+    tracing.shutdown_tracing()
+    return {s.name: s for s in exporter.spans}
+
+
+def test_disabled_tracing_returns_noop_span():
+    """Test: Without an exporter, span() is a shared no-op."""
+    tracing.shutdown_tracing()
+
+    with tracing.span("anything") as noop:
+        noop.set_attribute("key", "value")
+
+    assert not tracing.tracing_enabled()
+    assert tracing.current_span() is None
+
+
+def test_nested_spans_share_trace(exporter):
+    """Test: Child spans link to their parent and share its trace id."""
+    with tracing.span("state.handle_image_upload"):
+        with tracing.span("upload.read", bytes=10):
+            pass
+
+    spans = finished_spans(exporter)
+    parent = spans["state.handle_image_upload"]
+    child = spans["upload.read"]
+
+    assert child.parent_id == parent.span_id
+    assert child.trace_id == parent.trace_id
+    assert parent.parent_id is None
+    assert child.attributes == {"bytes": 10}
+
+
+def test_spans_propagate_across_await(exporter):
+    """Test: Spans opened after an await still nest under the handler span."""
+
+    @tracing.traced("engine.check_rules")
+    def check_rules():
+        return None
+
+    @tracing.traced("state.handle_image_upload")
+    async def handler():
+        await asyncio.sleep(0)
+        check_rules()
+
+    asyncio.run(handler())
+
+    spans = finished_spans(exporter)
+    assert spans["engine.check_rules"].parent_id == spans["state.handle_image_upload"].span_id
+
+
+def test_exception_recorded_on_span(exporter):
+    """Test: A span closed by an exception records the error."""
+    with pytest.raises(RuntimeError):
+        with tracing.span("llm.generate_content"):
+            raise RuntimeError("quota exceeded")
+
+    spans = finished_spans(exporter)
+    assert spans["llm.generate_content"].error == "RuntimeError: quota exceeded"
+
+
+def test_jsonl_exporter_writes_one_span_per_line(tmp_path):
+    """Test: The JSONL exporter appends one JSON object per span."""
+    path = tmp_path / "traces.jsonl"
+    tracing.configure_tracing(tracing.JsonlExporter(path))
+    with tracing.span("outer"):
+        with tracing.span("inner"):
+            pass
+    tracing.shutdown_tracing()
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["name"] for r in records] == ["inner", "outer"]
+    assert records[0]["parent_id"] == records[1]["span_id"]
+    assert records[1]["duration_ms"] >= records[0]["duration_ms"]
+
+
+def test_otlp_encoding_shape():
+    """Test: OTLP export payload follows the OTLP/JSON span layout."""
+    finished = tracing.Span("llm.analyze", {"model": "gemini", "bytes": 5})
+    with finished:
+        pass
+
+    payload = tracing.OtlpHttpExporter("http://localhost:4318/v1/traces")._encode(
+        [finished]
+    )
+    otlp_span = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+
+    assert otlp_span["name"] == "llm.analyze"
+    assert len(otlp_span["traceId"]) == 32
+    assert len(otlp_span["spanId"]) == 16
+    assert {"key": "bytes", "value": {"intValue": "5"}} in otlp_span["attributes"]
+    assert otlp_span["status"] == {"code": 1}
+
+
+def test_image_analysis_spans(exporter, vision_service):
+    """Test: Image analysis emits nested prompt, model call and validation spans."""
+    suggestions = asyncio.run(vision_service.analyze_mushroom_image(make_photo()))
+
+    assert suggestions == {"cap_color": "n"}
+    spans = finished_spans(exporter)
+    analyze = spans["llm.analyze"]
+    for name in ("llm.build_prompt", "llm.generate_content", "llm.validate"):
+        assert spans[name].parent_id == analyze.span_id
+    assert analyze.attributes["outcome"] == "success"
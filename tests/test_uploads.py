@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from app.services.image_preprocessing import prepare_image
+from app.services.uploads import UploadTooLargeError, spool_upload
+from tests.conftest import FakeUpload, make_photo
+
+
+def spool(data, **kwargs):
+    """Helper function to spool bytes through a fake upload."""
+    upload = FakeUpload(data)
+    return upload, asyncio.run(spool_upload(upload, **kwargs))
+
+
+def test_small_upload_stays_in_memory():
+    """Test: Uploads under the spool size are not written to disk."""
+    _, (spooled, size) = spool(b"x" * 1000, spool_bytes=4096)
+
+    assert size == 1000
+    assert not spooled._rolled
+    assert spooled.read() == b"x" * 1000
+    spooled.close()
+
+
+def test_large_upload_spills_to_disk():
+    """Test: Uploads over the spool size roll over to a temporary file."""
+    _, (spooled, size) = spool(b"x" * 200_000, spool_bytes=4096)
+
+    assert size == 200_000
+    assert spooled._rolled
+    spooled.close()
+
+
+def test_upload_over_cap_rejected_while_reading():
+    """Test: Reading stops as soon as the byte cap is crossed."""
+    upload = FakeUpload(b"x" * 1_000_000)
+
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(spool_upload(upload, max_bytes=100_000))
+
+    assert upload.position < 200_000
+
+
+def test_declared_size_over_cap_rejected_before_reading():
+    """Test: A declared size over the cap is refused without reading the body."""
+    upload = FakeUpload(b"x" * 10, size=10**9)
+
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(spool_upload(upload, max_bytes=1000))
+
+    assert upload.position == 0
+
+
+def test_preprocessing_reads_spooled_file():
+    """Test: Preprocessing decodes straight from the spooled upload."""
+    _, (spooled, size) = spool(make_photo(size=(800, 600)), spool_bytes=1024)
+
+    prepared = asyncio.run(prepare_image(spooled))
+
+    assert (prepared.width, prepared.height) == (800, 600)
+    assert prepared.mime_type == "image/jpeg"
+    spooled.close()
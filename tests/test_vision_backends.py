@@ -0,0 +1,121 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.loadtest import run_load_test
+from app.metrics import LLM_RETRIES
+from app.services.analysis_cache import AnalysisCache
+from app.services.fake_vision_server import FakeVisionConfig, create_app, fake_suggestions
+from app.services.llm_limits import LLMCallLimiter
+from app.services.llm_vision import LLMVisionService
+from app.services.vision_backends import GeminiBackend, HttpVisionBackend, backend_from_env
+from tests.conftest import make_photo
+
+
+def fake_service(**config):
+    """Helper function to build a vision service backed by an in-process fake server."""
+    app = create_app(FakeVisionConfig(latency_ms=5, chunk_delay_ms=0, seed=1, **config))
+    service = LLMVisionService(
+        HttpVisionBackend(url="http://fake", transport=httpx.ASGITransport(app=app))
+    )
+    service.limiter = LLMCallLimiter(rate_per_minute=60_000, max_concurrency=8, deadline=5)
+    service.cache = AnalysisCache(max_entries=0)
+    return service
+
+
+def test_backend_selected_from_env(monkeypatch):
+    """Test: LLM_VISION_BACKEND picks the backend implementation."""
+    monkeypatch.setenv("LLM_VISION_BACKEND", "http")
+    monkeypatch.setenv("LLM_VISION_BACKEND_URL", "http://127.0.0.1:9999")
+    backend = backend_from_env()
+    assert isinstance(backend, HttpVisionBackend)
+    assert backend.url == "http://127.0.0.1:9999"
+
+    monkeypatch.setenv("LLM_VISION_BACKEND", "gemini")
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    backend = backend_from_env()
+    assert isinstance(backend, GeminiBackend)
+    assert not backend.available
+
+    monkeypatch.setenv("LLM_VISION_BACKEND", "nope")
+    with pytest.raises(ValueError):
+        backend_from_env()
+
+
+def test_fake_suggestions_are_deterministic_and_valid():
+    """Test: The fake answers the same photo the same way, with valid codes."""
+    photo = make_photo()
+    attributes = ["cap_color", "gill_color", "odor"]
+
+    first = fake_suggestions(photo, attributes, fill_rate=1.0)
+
+    assert first == fake_suggestions(photo, attributes, fill_rate=1.0)
+    assert set(first) == set(attributes)
+    assert all(value is not None for value in first.values())
+
+
+def test_service_analyzes_through_fake_server():
+    """Test: The service returns validated suggestions from the http backend."""
+    service = fake_service(fill_rate=1.0)
+
+    suggestions = asyncio.run(
+        service.analyze_mushroom_image(make_photo(), {"cap_color", "gill_color"})
+    )
+
+    assert set(suggestions) == {"cap_color", "gill_color"}
+
+
+def test_service_streams_through_fake_server():
+    """Test: Streamed responses from the http backend are parsed incrementally."""
+    service = fake_service(fill_rate=1.0)
+
+    async def collect():
+        return dict(
+            [item async for item in service.stream_mushroom_image(make_photo(), {"odor"})]
+        )
+
+    assert set(asyncio.run(collect())) == {"odor"}
+
+
+def test_rate_limited_requests_are_retried_then_given_up():
+    """Test: HTTP 429 from the backend is retried up to the attempt limit."""
+    service = fake_service(rate_limit_rate=1.0)
+    service.limiter.max_attempts = 2
+    service.limiter.retrying = lambda: _fast_retrying(service.limiter)
+    retries_before = LLM_RETRIES.get()
+
+    assert asyncio.run(service.analyze_mushroom_image(make_photo())) == {}
+    assert LLM_RETRIES.get() == retries_before + 1
+
+
+def test_load_test_reports_latency_percentiles():
+    """Test: The load test drives all flows and reports throughput and percentiles."""
+    service = fake_service()
+
+    report = asyncio.run(run_load_test(service, flows=12, users=4))
+
+    assert report.flows == sum(report.outcomes.values()) == 12
+    assert report.throughput > 0
+    assert 0 < report.percentile(0.5) <= report.percentile(0.95) <= report.percentile(0.99)
+
+
+def test_load_test_reports_its_limiter(capsys):
+    """Test: The load test runs with a permissive limiter unless told otherwise."""
+    from app.loadtest import main
+
+    main(["--flows", "3", "--users", "3", "--latency-ms", "1"])
+    assert "Limiter (load test): 3 concurrent, no rate limit" in capsys.readouterr().out
+
+    main(["--flows", "2", "--users", "2", "--latency-ms", "1", "--rate", "600",
+          "--concurrency", "1"])
+    assert "Limiter (load test): 1 concurrent, 600/min, burst 1" in capsys.readouterr().out
+
+
+def _fast_retrying(limiter):
+    """Helper function to retry without real backoff sleeps."""
+    from tenacity import wait_none
+
+    retrying = LLMCallLimiter.retrying(limiter)
+    retrying.wait = wait_none()
+    return retrying